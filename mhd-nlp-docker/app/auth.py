@@ -2,6 +2,8 @@
 from datetime import datetime, timedelta, timezone
 import os
 import uuid
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Optional
 
 from fastapi import HTTPException, status, Request
@@ -11,6 +13,8 @@ from dotenv import load_dotenv
 from bson import ObjectId
 
 from .db import db, users  # <--- PyMongo sync collections
+from .db.mongo_async import users as users_async  # Motor, for the async login path
+from app.services.auth_cache import user_cache, revocations
 
 load_dotenv()
 
@@ -21,6 +25,11 @@ REFRESH_TOKEN_EXPIRE_DAYS = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 REFRESH_TOKEN_COOKIE = os.getenv("REFRESH_TOKEN_COOKIE", "mhd_refresh_token")
 COOKIE_SECURE = os.getenv("COOKIE_SECURE", "false").lower() == "true"
 
+# async login: bcrypt runs on its own small pool, logins in flight are capped
+BCRYPT_WORKERS = int(os.getenv("BCRYPT_WORKERS", "4"))
+LOGIN_MAX_CONCURRENCY = int(os.getenv("LOGIN_MAX_CONCURRENCY", "16"))
+LOGIN_QUEUE_TIMEOUT_S = float(os.getenv("LOGIN_QUEUE_TIMEOUT_S", "2"))
+
 pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 
 # Collections (PyMongo)
@@ -44,40 +53,23 @@ def get_user_by_login(login: str) -> Optional[dict]:
     This is written for PyMongo (sync). If at some point `users` becomes an
     async Motor collection, callers should wrap it, not this function.
     """
+    return users.find_one(_login_query(login))
+
+
+def _login_query(login: str) -> dict:
     login = (login or "").strip()
-    return users.find_one({
-        "$or": [
-            {"username": login},
-            {"email": login.lower()},
-        ]
-    })
+    return {"$or": [{"username": login}, {"email": login.lower()}]}
 
 
 # ---------- main auth helper (SYNC) ----------
 
 def authenticate_user(login: str, password: str) -> Optional[dict]:
     """
-    Synchronous: used by /auth/token
-
-    Also robust to the case where get_user_by_login (or its underlying collection)
-    accidentally returns a coroutine/Future instead of a dict.
+    Synchronous, for scripts and sync callers. Request handlers use
+    authenticate_user_async.
     """
-    import asyncio
-
     user = get_user_by_login(login)
-
-    # If somehow a coroutine/Future is returned, resolve it here
-    if asyncio.iscoroutine(user) or isinstance(user, asyncio.Future):
-        try:
-            loop = asyncio.get_event_loop()
-        except RuntimeError:
-            loop = asyncio.new_event_loop()
-            asyncio.set_event_loop(loop)
-            loop = asyncio.get_event_loop()
-        user = loop.run_until_complete(user)
-
-    # Now expect a dict (or None)
-    if not user or not isinstance(user, dict) or not user.get("password"):
+    if not user or not user.get("password"):
         return None
 
     if not verify_password(password, user["password"]):
@@ -86,6 +78,52 @@ def authenticate_user(login: str, password: str) -> Optional[dict]:
     return user
 
 
+# ---------- async login path ----------
+
+class LoginBusy(Exception):
+    """Raised when a login waited LOGIN_QUEUE_TIMEOUT_S without getting a slot."""
+
+
+_bcrypt_pool = ThreadPoolExecutor(max_workers=BCRYPT_WORKERS, thread_name_prefix="bcrypt")
+_login_slots: dict = {}  # event loop -> Semaphore (TestClient/reloads create new loops)
+
+
+def _login_semaphore() -> asyncio.Semaphore:
+    loop = asyncio.get_running_loop()
+    sem = _login_slots.get(loop)
+    if sem is None:
+        _login_slots.clear()
+        sem = _login_slots[loop] = asyncio.Semaphore(LOGIN_MAX_CONCURRENCY)
+    return sem
+
+
+async def verify_password_async(plain: str, hashed: str) -> bool:
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(_bcrypt_pool, pwd_context.verify, plain, hashed)
+
+
+async def authenticate_user_async(login: str, password: str) -> Optional[dict]:
+    """
+    Motor lookup + bcrypt on the bounded pool. At most LOGIN_MAX_CONCURRENCY
+    logins run at once; the rest wait up to LOGIN_QUEUE_TIMEOUT_S, then get
+    LoginBusy so a credential-stuffing burst can't tie up the worker.
+    """
+    sem = _login_semaphore()
+    try:
+        await asyncio.wait_for(sem.acquire(), timeout=LOGIN_QUEUE_TIMEOUT_S)
+    except asyncio.TimeoutError:
+        raise LoginBusy()
+    try:
+        user = await users_async.find_one(_login_query(login))
+        if not user or not user.get("password"):
+            return None
+        if not await verify_password_async(password, user["password"]):
+            return None
+        return user
+    finally:
+        sem.release()
+
+
 # ---------- JWT helpers ----------
 
 def _now_utc() -> datetime:
@@ -117,6 +155,8 @@ def create_refresh_token(sub: str) -> str:
             "jti": payload["jti"],
             "sub": payload["sub"],
             "exp": payload["exp"],
+            # Date copy of exp for the TTL index (app/jobs/retention.py)
+            "expires_at": datetime.fromtimestamp(payload["exp"], timezone.utc),
             "revoked": False,
             "created_at": _now_utc(),
         }},
@@ -134,14 +174,43 @@ def decode_token(raw: str) -> dict:
         )
 
 def is_revoked(jti: str) -> bool:
-    return revoked_tokens.find_one({"jti": jti}) is not None
+    # in-memory set + Bloom filter once loaded; Mongo lookup until then
+    return revocations.is_revoked(jti)
 
 def revoke_token(jti: str, sub: str, exp: int, reason: str = "logout") -> None:
     revoked_tokens.update_one(
         {"jti": jti},
-        {"$set": {"jti": jti, "sub": sub, "exp": exp, "reason": reason}},
+        {"$set": {
+            "jti": jti, "sub": sub, "exp": exp, "reason": reason,
+            "expires_at": datetime.fromtimestamp(exp, timezone.utc),
+        }},
         upsert=True,
     )
+    revocations.add(jti)
+
+
+def _user_profile(sub: str) -> Optional[dict]:
+    """Trimmed user profile for a token subject, served from user_cache."""
+    profile = user_cache.get(sub)
+    if profile is not None:
+        return profile
+
+    u = users.find_one({"_id": ObjectId(sub)})
+    if not u:
+        return None
+
+    # dashboard dispatcher dependencies
+    profile = {
+        "_id": str(u["_id"]),
+        "username": u.get("username"),
+        "role": u.get("role", "user"),
+        "email": u.get("email"),
+        "vertical": u.get("vertical"),
+        "org_id": u.get("org_id"),
+        "demo": u.get("demo", False)
+    }
+    user_cache.put(sub, profile)
+    return profile
 
 
 # ---------- dependencies for routes ----------
@@ -173,24 +242,15 @@ def get_current_user(request: Request) -> dict:
         raise HTTPException(status_code=401, detail="Token has been revoked")
     
     try:
-        u = users.find_one({"_id": ObjectId(payload["sub"])})
+        u = _user_profile(payload["sub"])
     except Exception:
         raise HTTPException(status_code=401, detail="Invalid subject")
     
     if not u:
         raise HTTPException(status_code=401, detail="User not found")
-    
 
-    # dashboard dispatcher dependencies
-    return {
-        "_id": str(u["_id"]),
-        "username": u.get("username"),
-        "role": u.get("role", "user"),
-        "email": u.get("email"),
-        "vertical": u.get("vertical"),
-        "org_id": u.get("org_id"),
-        "demo": u.get("demo", False)
-    }
+    # copy so callers can't mutate the cached profile
+    return dict(u)
 
 def get_current_user_optional(request: Request) -> Optional[dict]:
     """
@@ -212,18 +272,10 @@ def get_current_user_optional(request: Request) -> Optional[dict]:
         if is_revoked(payload["jti"]):
             return None
 
-        u = users.find_one({"_id": ObjectId(payload["sub"])})
+        u = _user_profile(payload["sub"])
         if not u:
             return None
 
-        return {
-            "_id": str(u["_id"]),
-            "username": u.get("username"),
-            "role": u.get("role", "user"),
-            "email": u.get("email"),
-            "vertical": u.get("vertical"),   # <-- added
-            "org_id": u.get("org_id"),       # <-- added
-            "demo": u.get("demo", False),
-        }
+        return dict(u)
     except Exception:
         return None
@@ -0,0 +1,290 @@
+# app/db/blob_cache.py
+# Read-through disk cache in front of app.db.storage. Entries are keyed by
+# sha256(backend/bucket/key/etag), so an overwritten object is a new entry
+# and the old one simply ages out of the LRU. Each <name>.blob has a
+# <name>.json sidecar (key, etag, size, sha256); both are written to a temp
+# file and renamed into place, so readers never see a partial entry.
+# Checksums are verified the first time an entry is used in this process,
+# sizes on every hit. Consumers get a path or a read-only mmap (zero-copy
+# for pandas / PyMuPDF). A caller that reads the path later fetches with
+# pin=True and calls release() when done; pinned entries are never evicted.
+import os
+import io
+import json
+import mmap
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, NamedTuple
+
+from app.db import storage
+
+BLOB_CACHE_ENABLED = os.getenv("BLOB_CACHE_ENABLED", "true").lower() == "true"
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", "/tmp/mhd-blob-cache")
+BLOB_CACHE_MAX_BYTES = int(os.getenv("BLOB_CACHE_MAX_BYTES", str(2 * 1024 ** 3)))
+
+
+class CachedBlob(NamedTuple):
+    path: str
+    size: int
+    sha256: str
+    etag: str
+    name: str
+
+
+def _stat(kind: str, key: str) -> Dict[str, Any]:
+    return storage.stat_raw(key) if kind == "raw" else storage.stat_processed(key)
+
+
+def _open(kind: str, key: str):
+    return storage.open_raw(key) if kind == "raw" else storage.open_processed(key)
+
+
+def _file_sha256(path: str) -> str:
+    h = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1024 * 1024), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _atomic_write_json(path: str, obj: Dict[str, Any]):
+    tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp, "w") as f:
+        json.dump(obj, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+class DiskBlobCache:
+    def __init__(self, root: str = BLOB_CACHE_DIR, max_bytes: int = BLOB_CACHE_MAX_BYTES,
+                 enabled: bool = BLOB_CACHE_ENABLED):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.enabled = enabled
+        self._lru: "OrderedDict[str, int]" = OrderedDict()  # name -> size, oldest first
+        self._bytes = 0
+        self._verified: set[str] = set()
+        self._lock = threading.Lock()
+        self._fill_locks: Dict[str, list] = {}  # name -> [lock, threads using it]
+        self._pins: Dict[str, int] = {}
+        self._scanned = False
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.bytes_fetched = 0
+        self.evictions = 0
+        self.corrupt = 0
+
+    # ---------- paths ----------
+
+    def _name(self, kind: str, key: str, etag: str) -> str:
+        raw = f"{storage.BACKEND}/{storage.bucket_name(kind)}/{key}/{etag}"
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _blob_path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], f"{name}.blob")
+
+    def _meta_path(self, name: str) -> str:
+        return os.path.join(self.root, name[:2], f"{name}.json")
+
+    # ---------- index ----------
+
+    def _scan(self):
+        """Rebuild the LRU from disk (oldest mtime first); drops temp files and orphans."""
+        with self._lock:
+            if self._scanned:
+                return
+            os.makedirs(self.root, exist_ok=True)
+            found = []
+            for d, _, files in os.walk(self.root):
+                for fn in files:
+                    p = os.path.join(d, fn)
+                    if fn.endswith(".tmp"):
+                        _unlink(p)
+                    elif fn.endswith(".blob"):
+                        name = fn[:-5]
+                        if not os.path.exists(self._meta_path(name)):
+                            _unlink(p)
+                            continue
+                        st = os.stat(p)
+                        found.append((st.st_mtime, name, st.st_size))
+            for _, name, size in sorted(found):
+                self._lru[name] = size
+                self._bytes += size
+            self._scanned = True
+            self._evict()
+
+    def _evict(self, keep: str = ""):
+        # caller holds self._lock; `keep` and pinned entries stay
+        for name in list(self._lru):
+            if self._bytes <= self.max_bytes:
+                break
+            if name == keep or self._pins.get(name):
+                continue
+            self._drop_locked(name)
+            self.evictions += 1
+
+    def _pin_locked(self, name: str):
+        self._pins[name] = self._pins.get(name, 0) + 1
+
+    def release(self, entry: CachedBlob):
+        """Unpin an entry fetched with pin=True."""
+        with self._lock:
+            n = self._pins.get(entry.name, 0) - 1
+            if n > 0:
+                self._pins[entry.name] = n
+                return
+            self._pins.pop(entry.name, None)
+            self._evict()  # catch up on anything the pin held back
+
+    def _drop_locked(self, name: str):
+        self._bytes -= self._lru.pop(name, 0)
+        self._verified.discard(name)
+        # open mmaps keep their pages; unlink only removes the directory entry
+        _unlink(self._blob_path(name))
+        _unlink(self._meta_path(name))
+
+    # ---------- read-through ----------
+
+    def _hit(self, name: str, size: int, pin: bool = False):
+        try:
+            with open(self._meta_path(name)) as f:
+                meta = json.load(f)
+            blob = self._blob_path(name)
+            ok = meta["size"] == size and os.path.getsize(blob) == size
+        except (OSError, ValueError, KeyError):
+            return None
+        if ok and name not in self._verified:
+            ok = _file_sha256(blob) == meta["sha256"]
+            if not ok:
+                self.corrupt += 1
+        with self._lock:
+            if not ok:
+                self._drop_locked(name)
+                return None
+            if not os.path.exists(blob):
+                return None  # evicted while we were checking it
+            self._verified.add(name)
+            self._bytes += size - self._lru.pop(name, 0)
+            self._lru[name] = size
+            if pin:
+                self._pin_locked(name)
+        try:
+            os.utime(blob, None)  # persist recency across restarts
+        except OSError:
+            pass
+        return CachedBlob(blob, size, meta["sha256"], meta["etag"], name)
+
+    def _fill(self, kind: str, key: str, etag: str, name: str, pin: bool = False) -> CachedBlob:
+        blob = self._blob_path(name)
+        os.makedirs(os.path.dirname(blob), exist_ok=True)
+        tmp = f"{blob}.{os.getpid()}.{threading.get_ident()}.tmp"
+        h = hashlib.sha256()
+        n = 0
+        try:
+            with open(tmp, "wb") as f:
+                for chunk in _open(kind, key):
+                    f.write(chunk)
+                    h.update(chunk)
+                    n += len(chunk)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(tmp, blob)
+        except BaseException:
+            _unlink(tmp)
+            raise
+        digest = h.hexdigest()
+        _atomic_write_json(self._meta_path(name), {"key": key, "etag": etag, "size": n, "sha256": digest})
+
+        with self._lock:
+            self._bytes += n - self._lru.pop(name, 0)
+            self._lru[name] = n
+            self._verified.add(name)
+            self.bytes_fetched += n
+            if pin:
+                self._pin_locked(name)
+            self._evict(keep=name)
+        return CachedBlob(blob, n, digest, etag, name)
+
+    def fetch(self, kind: str, key: str, pin: bool = False) -> CachedBlob:
+        """
+        Local copy of a storage object ("raw" or "processed"), downloading on
+        a miss. With pin=True the entry can't be evicted until release().
+        """
+        self._scan()
+        st = _stat(kind, key)
+        etag = st.get("etag") or ""
+        name = self._name(kind, key, etag)
+
+        with self._lock:
+            slot = self._fill_locks.setdefault(name, [threading.Lock(), 0])
+            slot[1] += 1
+        try:
+            with slot[0]:
+                # concurrent misses on one object download it once
+                entry = self._hit(name, st["size"], pin)
+                if entry is not None:
+                    with self._lock:
+                        self.hits += 1
+                        self.bytes_saved += entry.size
+                    return entry
+                with self._lock:
+                    self.misses += 1
+                return self._fill(kind, key, etag, name, pin)
+        finally:
+            with self._lock:
+                # the last thread out drops the lock; waiters keep sharing it
+                slot[1] -= 1
+                if not slot[1]:
+                    self._fill_locks.pop(name, None)
+
+    def open_mmap(self, kind: str, key: str):
+        """Read-only mmap of the cached object (file-like: read/seek/readline)."""
+        if not self.enabled:
+            data = storage.get_bytes_raw(key) if kind == "raw" else storage.get_bytes_processed(key)
+            return io.BytesIO(data)
+        entry = self.fetch(kind, key, pin=True)
+        try:
+            if entry.size == 0:
+                return io.BytesIO(b"")  # zero-length files can't be mapped
+            with open(entry.path, "rb") as f:
+                return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        finally:
+            self.release(entry)  # the mapping outlives the directory entry
+
+    def clear(self):
+        self._scan()
+        with self._lock:
+            for name in list(self._lru):
+                if not self._pins.get(name):
+                    self._drop_locked(name)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "dir": self.root,
+                "entries": len(self._lru),
+                "bytes": self._bytes,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+                "bytes_saved": self.bytes_saved,
+                "bytes_fetched": self.bytes_fetched,
+                "evictions": self.evictions,
+                "corrupt": self.corrupt,
+            }
+
+
+def _unlink(path: str):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+blob_cache = DiskBlobCache()
@@ -1,5 +1,16 @@
 import os
-from typing import Optional
+import io
+import re
+import mmap
+import time
+import hashlib
+import mimetypes
+import threading
+import queue
+import asyncio
+from abc import ABC, abstractmethod
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
+from typing import Any, AsyncIterator, BinaryIO, Callable, Dict, Iterable, Iterator, Optional, Tuple, Union
 
 BACKEND = os.getenv("STORAGE_BACKEND", "azure").lower()
 
@@ -23,14 +34,39 @@ S3_BUCKET_RAW = os.getenv("S3_BUCKET_RAW", "mhd-raw")
 S3_BUCKET_PROCESSED = os.getenv("S3_BUCKET_PROCESSED", "mhd-processed")
 
 s3 = None
+s3_stream = None  # same endpoint, with per-request retries for multipart parts
+
+# -------------------------
+# Local filesystem (STORAGE_BACKEND=localfs)
+# -------------------------
+STORAGE_LOCAL_ROOT = os.getenv("STORAGE_LOCAL_ROOT", "/tmp/mhd-storage")
+
+# -------------------------
+# Streaming uploads
+# -------------------------
+# multipart chunk size (S3/MinIO minimum part is 5 MiB) and parts in flight per upload
+STORAGE_PART_SIZE = int(os.getenv("STORAGE_PART_SIZE", str(8 * 1024 * 1024)))
+STORAGE_UPLOAD_CONCURRENCY = int(os.getenv("STORAGE_UPLOAD_CONCURRENCY", "4"))
+# chunk size for streaming reads (downloads, incremental CSV parsing)
+STORAGE_READ_CHUNK = int(os.getenv("STORAGE_READ_CHUNK", str(1024 * 1024)))
+
+# -------------------------
+# Bulk operations
+# -------------------------
+STORAGE_BULK_WORKERS = int(os.getenv("STORAGE_BULK_WORKERS", "8"))
+STORAGE_RETRIES = int(os.getenv("STORAGE_RETRIES", "3"))
+STORAGE_RETRY_BACKOFF_S = float(os.getenv("STORAGE_RETRY_BACKOFF_S", "0.2"))
+# HTTP connections kept per client: enough for bulk workers plus multipart parts
+STORAGE_POOL_SIZE = STORAGE_BULK_WORKERS + STORAGE_UPLOAD_CONCURRENCY
 
 
 def storage_startup() -> None:
     """
-    Initialize storage clients (Azure Blob or S3).
+    Initialize storage clients (Azure Blob, S3, or the offline memory/localfs
+    backends).
     IMPORTANT: call this from FastAPI startup event.
     """
-    global blob_service, ContentSettings, s3
+    global blob_service, ContentSettings, s3, s3_stream
 
     if BACKEND == "azure":
         # Import here so import-time doesn't crash the app in environments
@@ -41,18 +77,60 @@ def storage_startup() -> None:
             raise RuntimeError("AZURE_BLOB_CONN_STR not set")
 
         ContentSettings = _ContentSettings
-        blob_service = BlobServiceClient.from_connection_string(AZURE_BLOB_CONN_STR)
+        import requests
+        from azure.core.pipeline.transport import RequestsTransport
+
+        # one pooled session shared by every request, sized for bulk workers
+        session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_connections=1, pool_maxsize=STORAGE_POOL_SIZE)
+        session.mount("https://", adapter)
+        session.mount("http://", adapter)
+
+        # streams larger than one part are sent as staged blocks of this size;
+        # transient errors are retried once, by _retry, not by the SDK as well
+        blob_service = BlobServiceClient.from_connection_string(
+            AZURE_BLOB_CONN_STR,
+            transport=RequestsTransport(session=session, session_owner=False),
+            retry_total=0,
+            max_block_size=STORAGE_PART_SIZE,
+            max_single_put_size=STORAGE_PART_SIZE,
+            max_chunk_get_size=STORAGE_READ_CHUNK,
+        )
 
     elif BACKEND == "s3":
+        import certifi
+        import urllib3
         from minio import Minio
 
-        s3 = Minio(
-            endpoint=S3_ENDPOINT.replace("http://", "").replace("https://", ""),
-            access_key=S3_ACCESS_KEY,
-            secret_key=S3_SECRET_KEY,
-            secure=S3_ENDPOINT.startswith("https"),
-        )
-    else:
+        def _client(retries):
+            # MinIO's default pool holds 10 connections; bulk calls would churn past that
+            http_client = urllib3.PoolManager(
+                maxsize=STORAGE_POOL_SIZE,
+                timeout=urllib3.Timeout(connect=10, read=300),
+                cert_reqs="CERT_REQUIRED",
+                ca_certs=certifi.where(),
+                retries=retries,
+            )
+            return Minio(
+                endpoint=S3_ENDPOINT.replace("http://", "").replace("https://", ""),
+                access_key=S3_ACCESS_KEY,
+                secret_key=S3_SECRET_KEY,
+                secure=S3_ENDPOINT.startswith("https"),
+                http_client=http_client,
+            )
+
+        # whole calls are retried by _retry; a streamed body can't be replayed,
+        # so multipart uploads retry each (in-memory) part request instead
+        s3 = _client(False)
+        s3_stream = _client(urllib3.Retry(
+            total=STORAGE_RETRIES,
+            backoff_factor=STORAGE_RETRY_BACKOFF_S,
+            status_forcelist=sorted(_TRANSIENT_STATUS),
+            raise_on_status=False,
+        ))
+    elif BACKEND == "localfs":
+        os.makedirs(STORAGE_LOCAL_ROOT, exist_ok=True)
+    elif BACKEND not in _BACKENDS:
         raise RuntimeError(f"Unknown STORAGE_BACKEND: {BACKEND}")
 
 
@@ -72,6 +150,23 @@ def _azure_put(container: str, key: str, data: bytes, content_type: Optional[str
     bc.upload_blob(data, overwrite=True, **kwargs)
 
 
+def _azure_put_stream(container: str, key: str, stream: BinaryIO, content_type: Optional[str] = None,
+                      length: Optional[int] = None):
+    if blob_service is None:
+        raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
+
+    bc = blob_service.get_blob_client(container=container, blob=key)
+
+    kwargs = {}
+    if content_type and ContentSettings is not None:
+        kwargs["content_settings"] = ContentSettings(content_type=content_type)
+
+    # the client has SDK retries off (see _retry); a stream can't be replayed
+    # as a whole, so each staged block gets its own retries here
+    bc.upload_blob(stream, length=length, overwrite=True, max_concurrency=STORAGE_UPLOAD_CONCURRENCY,
+                   retry_total=STORAGE_RETRIES, retry_backoff_factor=STORAGE_RETRY_BACKOFF_S, **kwargs)
+
+
 def _azure_get(container: str, key: str) -> bytes:
     if blob_service is None:
         raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
@@ -80,6 +175,36 @@ def _azure_get(container: str, key: str) -> bytes:
     return bc.download_blob().readall()
 
 
+def _azure_open(container: str, key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    if blob_service is None:
+        raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
+
+    bc = blob_service.get_blob_client(container=container, blob=key)
+    # the request is issued here, so a missing blob raises before iteration starts
+    downloader = bc.download_blob(offset=offset, length=length)
+    return downloader.chunks()
+
+
+def _azure_delete(container: str, key: str):
+    if blob_service is None:
+        raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
+
+    blob_service.get_blob_client(container=container, blob=key).delete_blob()
+
+
+def _azure_stat(container: str, key: str) -> Dict[str, Any]:
+    if blob_service is None:
+        raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
+
+    props = blob_service.get_blob_client(container=container, blob=key).get_blob_properties()
+    cs = props.content_settings
+    return {
+        "size": props.size,
+        "etag": (props.etag or "").strip('"'),
+        "content_type": cs.content_type if cs else None,
+    }
+
+
 # -------------------------
 # S3 helpers
 # -------------------------
@@ -96,6 +221,23 @@ def _s3_put(bucket: str, key: str, data: bytes, content_type: Optional[str] = No
     )
 
 
+def _s3_put_stream(bucket: str, key: str, stream: BinaryIO, content_type: Optional[str] = None,
+                   length: Optional[int] = None):
+    if s3_stream is None:
+        raise RuntimeError("S3 client not initialized (call storage_startup)")
+
+    # length=-1 lets MinIO cut the stream into part_size multipart chunks
+    s3_stream.put_object(
+        bucket_name=bucket,
+        object_name=key,
+        data=stream,
+        length=length if length is not None else -1,
+        part_size=STORAGE_PART_SIZE,
+        num_parallel_uploads=STORAGE_UPLOAD_CONCURRENCY,
+        content_type=content_type or "application/octet-stream",
+    )
+
+
 def _s3_get(bucket: str, key: str) -> bytes:
     if s3 is None:
         raise RuntimeError("S3 client not initialized (call storage_startup)")
@@ -108,20 +250,94 @@ def _s3_get(bucket: str, key: str) -> bytes:
         resp.release_conn()
 
 
-def ensure_buckets():
+def _s3_open(bucket: str, key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    if s3 is None:
+        raise RuntimeError("S3 client not initialized (call storage_startup)")
+
+    resp = s3.get_object(bucket, key, offset=offset, length=length or 0)
+
+    def _chunks():
+        try:
+            yield from resp.stream(STORAGE_READ_CHUNK)
+        finally:
+            resp.close()
+            resp.release_conn()
+
+    return _chunks()
+
+
+def _s3_delete(bucket: str, key: str):
+    if s3 is None:
+        raise RuntimeError("S3 client not initialized (call storage_startup)")
+
+    s3.remove_object(bucket, key)
+
+
+def _s3_stat(bucket: str, key: str) -> Dict[str, Any]:
+    if s3 is None:
+        raise RuntimeError("S3 client not initialized (call storage_startup)")
+
+    st = s3.stat_object(bucket, key)
+    return {"size": st.size, "etag": (st.etag or "").strip('"'), "content_type": st.content_type}
+
+
+# -------------------------
+# Backends
+# -------------------------
+class ObjectNotFound(FileNotFoundError):
+    code = "NoSuchKey"
+
+
+class StorageBackend(ABC):
     """
-    Create containers/buckets used by the app + MLflow artifacts.
-    Call this on application startup (not on import).
+    What the public API needs from a store. Buckets are the raw/processed
+    container names; objects are flat keys (slashes allowed). Every method is
+    abstract, so a backend missing one fails when it is instantiated.
     """
-    if BACKEND == "s3":
-        for b in (S3_BUCKET_RAW, S3_BUCKET_PROCESSED, "mhd-mlflow-artifacts"):
-            if not s3.bucket_exists(b):
-                s3.make_bucket(b)
-    else:
+
+    @abstractmethod
+    def put(self, bucket: str, key: str, data: bytes, content_type: Optional[str] = None):
+        ...
+
+    @abstractmethod
+    def put_stream(self, bucket: str, key: str, stream: BinaryIO, content_type: Optional[str] = None,
+                   length: Optional[int] = None):
+        ...
+
+    @abstractmethod
+    def get(self, bucket: str, key: str) -> bytes:
+        ...
+
+    @abstractmethod
+    def open(self, bucket: str, key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        ...
+
+    @abstractmethod
+    def stat(self, bucket: str, key: str) -> Dict[str, Any]:
+        ...
+
+    @abstractmethod
+    def delete(self, bucket: str, key: str):
+        ...
+
+    @abstractmethod
+    def ensure(self, buckets: Iterable[str]):
+        ...
+
+
+class AzureBackend(StorageBackend):
+    put = staticmethod(_azure_put)
+    put_stream = staticmethod(_azure_put_stream)
+    get = staticmethod(_azure_get)
+    open = staticmethod(_azure_open)
+    stat = staticmethod(_azure_stat)
+    delete = staticmethod(_azure_delete)
+
+    def ensure(self, buckets: Iterable[str]):
         if blob_service is None:
             raise RuntimeError("Azure blob_service not initialized (call storage_startup)")
 
-        for c in (AZURE_CONTAINER_RAW, AZURE_CONTAINER_PROCESSED, "mhd-mlflow-artifacts"):
+        for c in buckets:
             try:
                 blob_service.create_container(c)
             except Exception:
@@ -129,19 +345,215 @@ def ensure_buckets():
                 pass
 
 
+class S3Backend(StorageBackend):
+    put = staticmethod(_s3_put)
+    put_stream = staticmethod(_s3_put_stream)
+    get = staticmethod(_s3_get)
+    open = staticmethod(_s3_open)
+    stat = staticmethod(_s3_stat)
+    delete = staticmethod(_s3_delete)
+
+    def ensure(self, buckets: Iterable[str]):
+        for b in buckets:
+            if not s3.bucket_exists(b):
+                s3.make_bucket(b)
+
+
+def _read_parts(stream: BinaryIO) -> Iterator[bytes]:
+    return iter(lambda: stream.read(STORAGE_PART_SIZE), b"")
+
+
+class MemoryBackend(StorageBackend):
+    """Process-local dict store: tests and offline benchmarks, no durability."""
+
+    def __init__(self):
+        self._objects: Dict[Tuple[str, str], Tuple[bytes, Optional[str], str]] = {}
+        self._lock = threading.Lock()
+
+    def put(self, bucket: str, key: str, data: bytes, content_type: Optional[str] = None):
+        data = bytes(data)
+        with self._lock:
+            self._objects[(bucket, key)] = (data, content_type, hashlib.md5(data).hexdigest())
+
+    def put_stream(self, bucket: str, key: str, stream: BinaryIO, content_type: Optional[str] = None,
+                   length: Optional[int] = None):
+        self.put(bucket, key, b"".join(_read_parts(stream)), content_type)
+
+    def _obj(self, bucket: str, key: str):
+        try:
+            return self._objects[(bucket, key)]
+        except KeyError:
+            raise ObjectNotFound(f"{bucket}/{key}") from None
+
+    def get(self, bucket: str, key: str) -> bytes:
+        return self._obj(bucket, key)[0]
+
+    def open(self, bucket: str, key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        view = memoryview(self._obj(bucket, key)[0])
+        end = len(view) if length is None else min(len(view), offset + length)
+        return (bytes(view[i:min(i + STORAGE_READ_CHUNK, end)]) for i in range(offset, end, STORAGE_READ_CHUNK))
+
+    def stat(self, bucket: str, key: str) -> Dict[str, Any]:
+        data, content_type, etag = self._obj(bucket, key)
+        return {"size": len(data), "etag": etag, "content_type": content_type}
+
+    def delete(self, bucket: str, key: str):
+        with self._lock:
+            self._objects.pop((bucket, key), None)
+
+    def ensure(self, buckets: Iterable[str]):
+        pass
+
+    def clear(self):
+        with self._lock:
+            self._objects.clear()
+
+
+class LocalFSBackend(StorageBackend):
+    """
+    One file per object under <root>/<bucket>/<key>. Writes go to a temp file
+    and are renamed into place; reads are served from an mmap of the file.
+    """
+
+    def __init__(self, root: Optional[str] = None):
+        self._root = root
+
+    @property
+    def root(self) -> str:
+        return self._root or STORAGE_LOCAL_ROOT
+
+    def _path(self, bucket: str, key: str) -> str:
+        # resolve both sides, so relative roots and symlinks compare correctly
+        base = os.path.realpath(os.path.join(self.root, bucket))
+        path = os.path.realpath(os.path.join(base, key))
+        if not path.startswith(base + os.sep):
+            raise ValueError(f"invalid key: {key}")
+        return path
+
+    def _write(self, path: str, parts: Iterable[bytes]):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        try:
+            with open(tmp, "wb") as f:
+                for part in parts:
+                    f.write(part)
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.remove(tmp)
+            except OSError:
+                pass
+            raise
+
+    def put(self, bucket: str, key: str, data: bytes, content_type: Optional[str] = None):
+        self._write(self._path(bucket, key), [data])
+
+    def put_stream(self, bucket: str, key: str, stream: BinaryIO, content_type: Optional[str] = None,
+                   length: Optional[int] = None):
+        self._write(self._path(bucket, key), _read_parts(stream))
+
+    def _map(self, bucket: str, key: str):
+        try:
+            f = open(self._path(bucket, key), "rb")
+        except FileNotFoundError:
+            raise ObjectNotFound(f"{bucket}/{key}") from None
+        with f:
+            if os.fstat(f.fileno()).st_size == 0:
+                return None
+            return mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+
+    def get(self, bucket: str, key: str) -> bytes:
+        m = self._map(bucket, key)
+        if m is None:
+            return b""
+        with m:
+            return m[:]
+
+    def open(self, bucket: str, key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+        m = self._map(bucket, key)
+        if m is None:
+            return iter(())
+
+        def _chunks():
+            with m:
+                end = len(m) if length is None else min(len(m), offset + length)
+                for i in range(offset, end, STORAGE_READ_CHUNK):
+                    yield m[i:min(i + STORAGE_READ_CHUNK, end)]
+
+        return _chunks()
+
+    def stat(self, bucket: str, key: str) -> Dict[str, Any]:
+        try:
+            st = os.stat(self._path(bucket, key))
+        except FileNotFoundError:
+            raise ObjectNotFound(f"{bucket}/{key}") from None
+        # content type isn't stored; guess it from the key like a static file server
+        return {
+            "size": st.st_size,
+            "etag": f"{st.st_mtime_ns:x}-{st.st_size:x}",
+            "content_type": mimetypes.guess_type(key)[0],
+        }
+
+    def delete(self, bucket: str, key: str):
+        try:
+            os.remove(self._path(bucket, key))
+        except FileNotFoundError:
+            pass
+
+    def ensure(self, buckets: Iterable[str]):
+        for b in buckets:
+            os.makedirs(os.path.join(self.root, b), exist_ok=True)
+
+
+_BACKENDS: Dict[str, StorageBackend] = {
+    "azure": AzureBackend(),
+    "s3": S3Backend(),
+    "memory": MemoryBackend(),
+    "localfs": LocalFSBackend(),
+}
+
+
+def register_backend(name: str, backend: StorageBackend):
+    """Make a custom backend selectable via STORAGE_BACKEND=<name>."""
+    _BACKENDS[name] = backend
+
+
+def get_backend() -> StorageBackend:
+    try:
+        return _BACKENDS[BACKEND]
+    except KeyError:
+        raise RuntimeError(f"Unknown STORAGE_BACKEND: {BACKEND}") from None
+
+
+def bucket_name(kind: str) -> str:
+    """Container/bucket for "raw" or "processed" on the active backend."""
+    if BACKEND == "azure":
+        return AZURE_CONTAINER_RAW if kind == "raw" else AZURE_CONTAINER_PROCESSED
+    return S3_BUCKET_RAW if kind == "raw" else S3_BUCKET_PROCESSED
+
+
+def ensure_buckets():
+    """
+    Create containers/buckets used by the app + MLflow artifacts.
+    Call this on application startup (not on import).
+    """
+    get_backend().ensure((bucket_name("raw"), bucket_name("processed"), "mhd-mlflow-artifacts"))
+
+
 # -------------------------
 # Public API (used by app)
 # -------------------------
+def _call(op: str, kind: str, *args, retries: Optional[int] = None):
+    # single-object calls, retried on transient errors (see _retry)
+    return _retry(getattr(get_backend(), op), bucket_name(kind), *args, retries=retries)
+
+
 def put_raw(key: str, data: bytes, content_type: Optional[str] = None):
-    if BACKEND == "s3":
-        return _s3_put(S3_BUCKET_RAW, key, data, content_type)
-    return _azure_put(AZURE_CONTAINER_RAW, key, data, content_type)
+    return _call("put", "raw", key, data, content_type)
 
 
 def put_processed(key: str, data: bytes, content_type: Optional[str] = None):
-    if BACKEND == "s3":
-        return _s3_put(S3_BUCKET_PROCESSED, key, data, content_type)
-    return _azure_put(AZURE_CONTAINER_PROCESSED, key, data, content_type)
+    return _call("put", "processed", key, data, content_type)
 
 
 def get_bytes_raw(key: str) -> bytes:
@@ -149,15 +561,336 @@ def get_bytes_raw(key: str) -> bytes:
     Fetch raw bytes from the RAW storage container/bucket.
     This is what pipeline_ingest imports.
     """
-    if BACKEND == "s3":
-        return _s3_get(S3_BUCKET_RAW, key)
-    return _azure_get(AZURE_CONTAINER_RAW, key)
+    return _call("get", "raw", key)
 
 
 def get_bytes_processed(key: str) -> bytes:
     """
     Fetch bytes from the PROCESSED storage container/bucket.
     """
-    if BACKEND == "s3":
-        return _s3_get(S3_BUCKET_PROCESSED, key)
-    return _azure_get(AZURE_CONTAINER_PROCESSED, key)
+    return _call("get", "processed", key)
+
+
+# -------------------------
+# Streaming / ranged reads
+# -------------------------
+def open_raw(key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    """
+    Iterate the RAW object (or the byte range [offset, offset+length)) in
+    STORAGE_READ_CHUNK pieces. The request is made on call, so missing keys
+    raise here; the connection is released when the iterator is exhausted
+    or closed.
+    """
+    return _call("open", "raw", key, offset, length)
+
+
+def open_processed(key: str, offset: int = 0, length: Optional[int] = None) -> Iterator[bytes]:
+    return _call("open", "processed", key, offset, length)
+
+
+def stat_raw(key: str) -> Dict[str, Any]:
+    """{size, etag, content_type} of a RAW object."""
+    return _call("stat", "raw", key)
+
+
+def stat_processed(key: str) -> Dict[str, Any]:
+    return _call("stat", "processed", key)
+
+
+def delete_raw(key: str):
+    return _call("delete", "raw", key)
+
+
+def delete_processed(key: str):
+    return _call("delete", "processed", key)
+
+
+def open_raw_file(key: str) -> BinaryIO:
+    """Buffered file object over open_raw, e.g. for pd.read_csv."""
+    return io.BufferedReader(_IterReader(open_raw(key)), buffer_size=STORAGE_READ_CHUNK)
+
+
+_RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+def parse_range(header: Optional[str], size: int) -> Optional[Tuple[int, int]]:
+    """
+    Single-range HTTP Range header -> inclusive (start, end), or None for the
+    whole object (no header, or a form we don't serve, e.g. multi-range).
+    Raises ValueError when the range is unsatisfiable.
+    """
+    if not header:
+        return None
+    m = _RANGE_RE.match(header.strip())
+    if not m or m.groups() == ("", ""):
+        return None
+    first, last = m.groups()
+    if first == "":
+        # suffix range: the last N bytes
+        n = int(last)
+        if n == 0:
+            raise ValueError("unsatisfiable range")
+        return max(size - n, 0), size - 1
+    start = int(first)
+    end = min(int(last), size - 1) if last else size - 1
+    if start >= size or end < start:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+
+# -------------------------
+# Streaming puts
+# -------------------------
+class _IterReader(io.RawIOBase):
+    """File-like read() over an iterator of byte chunks."""
+
+    def __init__(self, chunks: Iterable[bytes]):
+        self._it = iter(chunks)
+        self._buf = b""
+
+    def readable(self) -> bool:
+        return True
+
+    def readinto(self, b) -> int:
+        data = self.read(len(b))
+        b[:len(data)] = data
+        return len(data)
+
+    def close(self):
+        # releases the underlying HTTP connection for generator sources
+        close = getattr(self._it, "close", None)
+        if close is not None:
+            close()
+        super().close()
+
+    def read(self, n: int = -1) -> bytes:
+        while n < 0 or len(self._buf) < n:
+            try:
+                self._buf += next(self._it)
+            except StopIteration:
+                break
+        if n < 0:
+            out, self._buf = self._buf, b""
+        else:
+            out, self._buf = self._buf[:n], self._buf[n:]
+        return out
+
+
+def _as_stream(data: Union[BinaryIO, Iterable[bytes]]) -> Any:
+    return data if hasattr(data, "read") else _IterReader(data)
+
+
+def put_raw_stream(key: str, data: Union[BinaryIO, Iterable[bytes]], content_type: Optional[str] = None,
+                   length: Optional[int] = None):
+    """
+    Upload a file-like object or an iterator of byte chunks without holding
+    it in memory: multipart/staged blocks of STORAGE_PART_SIZE, at most
+    STORAGE_UPLOAD_CONCURRENCY parts in flight. Blocking; call from a thread
+    in async code (or use aput_raw_stream).
+    """
+    return get_backend().put_stream(bucket_name("raw"), key, _as_stream(data), content_type, length)
+
+
+def put_processed_stream(key: str, data: Union[BinaryIO, Iterable[bytes]], content_type: Optional[str] = None,
+                         length: Optional[int] = None):
+    return get_backend().put_stream(bucket_name("processed"), key, _as_stream(data), content_type, length)
+
+
+_EOF = object()
+_HANDOFF_POLL_S = 0.1
+
+
+async def _aput_stream(put, key: str, chunks: AsyncIterator[bytes], content_type: Optional[str],
+                       length: Optional[int]):
+    # bounded hand-off: the event loop produces chunks, a worker thread uploads them.
+    # Neither side blocks on the queue for good: the producer stops offering once
+    # the uploader has exited, and the uploader gives up once the producer fails.
+    q: "queue.Queue[Any]" = queue.Queue(maxsize=STORAGE_UPLOAD_CONCURRENCY * 2)
+    finished = threading.Event()
+    aborted = threading.Event()
+
+    def _chunks():
+        while True:
+            try:
+                c = q.get(timeout=_HANDOFF_POLL_S)
+            except queue.Empty:
+                if aborted.is_set():
+                    raise IOError(f"upload of {key} aborted: source stream failed")
+                continue
+            if c is _EOF:
+                return
+            yield c
+
+    def _upload():
+        try:
+            return put(key, _chunks(), content_type, length)
+        finally:
+            finished.set()
+
+    def _offer(item) -> bool:
+        while not finished.is_set():
+            try:
+                q.put(item, timeout=_HANDOFF_POLL_S)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    upload = asyncio.ensure_future(asyncio.to_thread(_upload))
+    try:
+        async for c in chunks:
+            if not await asyncio.to_thread(_offer, c):
+                break  # uploader exited early; surface its error below
+    except BaseException:
+        aborted.set()
+        upload.add_done_callback(lambda f: f.cancelled() or f.exception())
+        raise
+    await asyncio.to_thread(_offer, _EOF)
+    return await upload
+
+
+async def aput_raw_stream(key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None,
+                          length: Optional[int] = None):
+    """put_raw_stream for an async iterator of byte chunks."""
+    return await _aput_stream(put_raw_stream, key, chunks, content_type, length)
+
+
+async def aput_processed_stream(key: str, chunks: AsyncIterator[bytes], content_type: Optional[str] = None,
+                                length: Optional[int] = None):
+    return await _aput_stream(put_processed_stream, key, chunks, content_type, length)
+
+
+
+# -------------------------
+# Bulk operations
+# -------------------------
+_NOT_FOUND_CODES = {"NoSuchKey", "NoSuchBucket", "NoSuchObject", "BlobNotFound", "ContainerNotFound"}
+
+
+def _is_not_found(e: Exception) -> bool:
+    code = getattr(e, "code", None) or getattr(e, "error_code", None)
+    return code in _NOT_FOUND_CODES or getattr(e, "status_code", None) == 404
+
+
+# dropped/timed-out connections and throttling or server-side failures; client
+# errors (bad request, auth, missing object) fail the same way every time
+_TRANSIENT_STATUS = {408, 429, 500, 502, 503, 504}
+_TRANSIENT_CODES = {"InternalError", "ServiceUnavailable", "SlowDown", "RequestTimeout", "ServerBusy",
+                    "OperationTimedOut"}
+_TRANSIENT_TYPES = {"ProtocolError", "NewConnectionError", "ConnectTimeoutError", "ReadTimeoutError",
+                    "MaxRetryError", "ServerError", "ServiceRequestError", "ServiceResponseError",
+                    "ChunkedEncodingError", "ConnectionError", "Timeout"}
+
+
+def _is_transient(e: Exception) -> bool:
+    if isinstance(e, (ConnectionError, TimeoutError)):
+        return True
+    resp = getattr(e, "response", None)
+    status = getattr(e, "status_code", None) or getattr(resp, "status", None) or getattr(resp, "status_code", None)
+    if status in _TRANSIENT_STATUS:
+        return True
+    code = getattr(e, "code", None) or getattr(e, "error_code", None)
+    if code in _TRANSIENT_CODES:
+        return True
+    # SDK/transport errors, matched by name so no optional client is imported
+    return any(t.__name__ in _TRANSIENT_TYPES for t in type(e).__mro__)
+
+
+def _retry(fn: Callable, *args, retries: Optional[int] = None):
+    """Call fn, retrying transient failures with exponential backoff; anything else raises at once."""
+    retries = STORAGE_RETRIES if retries is None else retries
+    for attempt in range(retries + 1):
+        try:
+            return fn(*args)
+        except Exception as e:
+            if attempt == retries or not _is_transient(e):
+                raise
+            time.sleep(STORAGE_RETRY_BACKOFF_S * (2 ** attempt))
+
+
+def _bulk(op: Callable[[Any], Tuple[Any, int]], items: Iterable, workers: Optional[int]) -> Dict[str, Any]:
+    """
+    Run op over items on a bounded pool. At most 2x workers are in flight, so a
+    generator of payloads is never fully materialized. Per-key errors land in
+    "failed" instead of aborting the batch.
+    """
+    workers = max(1, workers or STORAGE_BULK_WORKERS)
+    results: Dict[str, Any] = {}
+    failed: Dict[str, str] = {}
+    nbytes = 0
+    t0 = time.perf_counter()
+
+    with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="storage-bulk") as ex:
+        pending: Dict[Any, str] = {}
+
+        def _collect(done):
+            nonlocal nbytes
+            for f in done:
+                key = pending.pop(f)
+                try:
+                    value, n = f.result()
+                except Exception as e:
+                    failed[key] = f"{type(e).__name__}: {e}"
+                    continue
+                results[key] = value
+                nbytes += n
+
+        for item in items:
+            key = item[0] if isinstance(item, tuple) else item
+            pending[ex.submit(op, item)] = key
+            if len(pending) >= workers * 2:
+                _collect(wait(pending, return_when=FIRST_COMPLETED)[0])
+        _collect(wait(pending)[0])
+
+    secs = time.perf_counter() - t0
+    ops = len(results) + len(failed)
+    return {
+        "results": results,
+        "failed": failed,
+        "ops": ops,
+        "bytes": nbytes,
+        "seconds": round(secs, 4),
+        "ops_per_s": round(ops / secs, 2) if secs else 0.0,
+        "mb_per_s": round(nbytes / 1e6 / secs, 2) if secs else 0.0,
+    }
+
+
+def put_many(items: Iterable[tuple], kind: str = "raw", workers: Optional[int] = None,
+             retries: Optional[int] = None) -> Dict[str, Any]:
+    """
+    Upload (key, data) or (key, data, content_type) tuples in parallel.
+    Returns {"results": {key: True}, "failed": {key: error}, "ops", "bytes",
+    "seconds", "ops_per_s", "mb_per_s"}.
+    """
+    def op(item):
+        key, data, *rest = item
+        _call("put", kind, key, data, rest[0] if rest else None, retries=retries)
+        return True, len(data)
+
+    return _bulk(op, items, workers)
+
+
+def get_many(keys: Iterable[str], kind: str = "raw", workers: Optional[int] = None,
+             retries: Optional[int] = None) -> Dict[str, Any]:
+    """Fetch many objects in parallel; results maps key -> bytes."""
+    def op(key):
+        data = _call("get", kind, key, retries=retries)
+        return data, len(data)
+
+    return _bulk(op, keys, workers)
+
+
+def exists_many(keys: Iterable[str], kind: str = "raw", workers: Optional[int] = None,
+                retries: Optional[int] = None) -> Dict[str, Any]:
+    """HEAD many objects in parallel; results maps key -> bool."""
+    def op(key):
+        try:
+            _call("stat", kind, key, retries=retries)
+        except Exception as e:
+            if _is_not_found(e):
+                return False, 0
+            raise
+        return True, 0
+
+    return _bulk(op, keys, workers)
@@ -3,6 +3,7 @@ from app.db import db
 def ensure_indexes():
     # uploads / shares
     db.uploads.create_index([("username", 1), ("upload_date", -1)])
+    db.uploads.create_index("sha256")
     db.shared_links.create_index("token", unique=True)
     db.shared_links.create_index("expires_at")
 
@@ -1,24 +1,28 @@
 from datetime import datetime, timedelta, timezone
-from typing import Dict, Any, List
+from typing import Dict, Any, List, Optional
 import pandas as pd
 import numpy as np
+from pymongo import UpdateOne
 from app.db import db
 
-def build_injury_risk_features(version="risk_v1", lookbacks=(7,28), now=None) -> int:
+def build_injury_risk_features(version="risk_v1", lookbacks=(7,28), now=None,
+                               athlete_ids: Optional[List[Any]] = None) -> int:
     """
     1) pull recent sessions, vitals, injuries
     2) compute rolling aggs per athlete
     3) convert nlp metadata (topics & sentiment) to numeric features
     4) upsert into 'features' with 'verstion'
+    athlete_ids restricts the build to one shard (app.jobs.sharded)
     returns count written
     """
 
     now = now or datetime.now(timezone.utc)
     since = now - timedelta(days=max(lookbacks)+2)
 
-    sess = list(db.sessions.find({"ts": {"$gte": since}}))
-    vit = list(db.vitals.find({"ts": {"$gte": since}}))
-    inj = list(db.injuries.find({"onset_date": {"$gte": since - timedelta(days=90)}}))
+    only = {"athlete_id": {"$in": list(athlete_ids)}} if athlete_ids is not None else {}
+    sess = list(db.sessions.find({"ts": {"$gte": since}, **only}))
+    vit = list(db.vitals.find({"ts": {"$gte": since}, **only}))
+    inj = list(db.injuries.find({"onset_date": {"$gte": since - timedelta(days=90)}, **only}))
 
     if not sess: return 0
 
@@ -52,12 +56,12 @@ def build_injury_risk_features(version="risk_v1", lookbacks=(7,28), now=None) ->
         r7 = sub.rolling(7, min_periods=1).agg({"volume":"sum", "intensity":"mean", "adherence":"mean", "sentiment":"mean"})
         r28 = sub.rolling(28, min_periods=1).agg({"volume":"sum"})
 
-        #topic counts last 7d
-        t7 = {}
+        #topic counts last 7d (always present, so output doesn't depend on which athletes are in the batch)
+        common = ["knee","back","shoulder","fatigue","sleep","soreness"]
+        t7 = {f"nlp_topic_{c}_7d": 0.0 for c in common}
         if not tdf.empty:
             tt = tdf[tdf["athlete_id"]==aid].groupby(["topic","date"]).size().unstack(fill_value=0).rolling(7, min_periods=1, axis=1).sum()
             # for each last date, take counts of a few common topics:
-            common = ["knee","back","shoulder","fatigue","sleep","soreness"]
             latest_date = sub.index.max()
             for c in common:
                 t7[f"nlp_topic_{c}_7d"] = float(tt.loc[c, latest_date]) if (c in tt.index and latest_date in tt.columns) else 0.0
@@ -84,11 +88,10 @@ def build_injury_risk_features(version="risk_v1", lookbacks=(7,28), now=None) ->
         })
 
     if out_docs:
-        for d in out_docs:
-            db.features.update_one(
-                {"athlete_id": d["athlete_id"], "ts": d["ts"], "version": version},
-                {"$set": d},
-                upsert=True
-            )
+        db.features.bulk_write([
+            UpdateOne({"athlete_id": d["athlete_id"], "ts": d["ts"], "version": version},
+                      {"$set": d}, upsert=True)
+            for d in out_docs
+        ], ordered=False)
     return len(out_docs)
 
@@ -1,24 +1,40 @@
+import datetime as dt
 import numpy as np
 import pandas as pd
 from app.db import db
+from app.monitoring.drift import compare_windows
 
 drift = db["drift_metrics"]; drift.create_index("ts")
+drift.create_index([("use_case", 1), ("feature", 1), ("ts", -1)])
 
 def psi(expected: np.ndarray, actual: np.ndarray, bins: int = 10) -> float:
     x_e = pd.cut(expected, bins=bins, retbins=True)[1]
     e = np.histogram(expected, bins=x_e)[0] / len(expected)
     a = np.histogram(actual, bins=x_e)[0] / len(actual)
-    e = np.where(e==0, 1e-6, e); a = np.where(a==0, 1e-66, a)
+    e = np.where(e==0, 1e-6, e); a = np.where(a==0, 1e-6, a)
     return float(np.sum((a - e) * np.log(a / e)))
 
-def compute_daily_drift(feature="rpe", ref_days=7, cur_days=1):
-    # pull past ref_days as baseline, and current day
-    # assume you store features of prediction in risk_predictions_feature
-    coll = db["risk_predictions_features"] # keep inputs you served on
-    ref = pd.DataFrame(list(coll.find().sort("ts", -1).limit(24*ref_days*60)))  # heuristic
-    cur = pd.DataFrame(list(coll.find().sort("ts", -1).limit(24*cur_days*60)))
-    if ref.empty or cur.empty or feature_name not in ref or feature_name not in cur:
-        return None
-    score = psi(ref[feature_name].values, cur[feature_name].values)
-    drift.insert_one({"ts": pd.Timestamp.utcnow(), "feature": feature_name, "psi": score})
-    return score 
\ No newline at end of file
+def compute_daily_drift(feature=None, ref_days=7, cur_days=1, use_case="session_quality", today=None):
+    """
+    PSI/KS of the last cur_days (ending today) against the ref_days before
+    them, from the streaming histograms in app.monitoring.drift. The windows
+    don't overlap. feature=None scores every tracked feature.
+    Returns {feature: {psi, ks, n_ref, n_cur}}.
+    """
+    if isinstance(today, str):
+        today = dt.date.fromisoformat(today)  # job params arrive as JSON
+    end = (today or dt.datetime.now(dt.timezone.utc).date()) + dt.timedelta(days=1)
+    cur_start = end - dt.timedelta(days=cur_days)
+    ref_start = cur_start - dt.timedelta(days=ref_days)
+    scores = compare_windows(use_case, (ref_start, cur_start), (cur_start, end),
+                             [feature] if feature else None)
+
+    now = dt.datetime.now(dt.timezone.utc)
+    docs = [
+        {"ts": now, "use_case": use_case, "feature": f, **s,
+         "ref": [ref_start.isoformat(), cur_start.isoformat()], "cur": [cur_start.isoformat(), end.isoformat()]}
+        for f, s in scores.items() if s["psi"] is not None
+    ]
+    if docs:
+        drift.insert_many(docs)
+    return scores
@@ -1,45 +1,146 @@
-from datetime import datetime, timedelta, timezone
+# app/jobs/metrics_rollup.py
+# Daily model-quality rollups (precision@K), computed incrementally.
+#
+# A day's predictions are ranked by a $group on (use_case, ts) -> best score
+# per athlete, and labelled by one indexed query on injuries for the ranked
+# athletes. Every K is read off a single cumulative sum of the ranked labels.
+# A day is final once its label horizon has passed; rollup_state keeps the
+# last final day per use case, so each run only touches newer days, and a
+# backlog is backfilled on a thread pool.
+import os
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Sequence
+
 import numpy as np
-import pandas as pd
+
 from app.db import db
 
-pred = db["risk_predictions"]   #{ts, athlete_id, p, model_run_id}
-inj  = db["injuries"]           #{athlete_id, start_ts, end_ts?}
+ROLLUP_KS = [int(k) for k in os.getenv("ROLLUP_KS", "5,10,20,50").split(",") if k]
+ROLLUP_K_PCTS = [float(k) for k in os.getenv("ROLLUP_K_PCTS", "0.05,0.10").split(",") if k]
+ROLLUP_WORKERS = int(os.getenv("ROLLUP_WORKERS", "4"))
+HORIZON_DAYS = 7
+MAX_ROLLUP_DAYS_PER_RUN = 400
+
+pred = db["risk_predictions"]   #{ts, use_case, athlete_id, score, run_id}
+inj  = db["injuries"]           #{athlete_id, onset_date}
 met  = db["model_daily_metrics"]# outputs
+state = db["rollup_state"]
 
-met.create_index([(day, 1)], unique=True)
+pred.create_index([("use_case", 1), ("ts", 1)])
+inj.create_index([("athlete_id", 1), ("onset_date", 1)])
+met.create_index([("day", 1), ("use_case", 1)], unique=True)
 
-def compute_precision_at_k(day: datetime, k_pct: float = 0.10):
-    day = day.replace(hour=0, minute=0, second=0, microsecond=0, tzinfo=timezone.utc)
+
+def _day_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def ranked_labels(day: datetime, use_case: str = "injury_risk", horizon_days: int = HORIZON_DAYS):
+    """Athletes predicted on `day`, best score first, and whether each got injured within the horizon."""
     next_day = day + timedelta(days=1)
+    rows = list(pred.aggregate([
+        {"$match": {"use_case": use_case, "ts": {"$gte": day, "$lt": next_day}}},
+        {"$group": {"_id": "$athlete_id", "score": {"$max": "$score"}}},
+        {"$sort": {"score": -1, "_id": 1}},
+    ]))
+    ids = [r["_id"] for r in rows]
+    injured = set(inj.distinct("athlete_id", {
+        "athlete_id": {"$in": ids},
+        "onset_date": {"$gte": next_day, "$lt": next_day + timedelta(days=horizon_days)},
+    })) if ids else set()
+    labels = np.fromiter((a in injured for a in ids), dtype=np.int64, count=len(ids))
+    return ids, labels
+
+
+def precision_at(labels: np.ndarray, ks: Sequence[int] = (), k_pcts: Sequence[float] = ()) -> Dict[str, Any]:
+    """precision@K for absolute Ks and fractions of n, all from one cumsum."""
+    n = len(labels)
+    out: Dict[str, Any] = {}
+    if not n:
+        return out
+    hits = np.cumsum(labels)
+    for k in ks:
+        kk = min(int(k), n)
+        out[f"p@{k}"] = float(hits[kk - 1] / kk)
+    for f in k_pcts:
+        kk = max(1, int(np.ceil(n * f)))
+        out[f"p@{f:g}"] = float(hits[kk - 1] / kk)
+    return out
 
-    # predictions generated on 'day' for horizon next 7d
-    rows = list(pred.find({"ts": {"$gte": day, "$lt": next_day}}))
-    if not rows:
+
+def rollup_day(day: datetime, use_case: str = "injury_risk", ks: Sequence[int] = ROLLUP_KS,
+               k_pcts: Sequence[float] = ROLLUP_K_PCTS) -> Optional[Dict[str, Any]]:
+    """(Re)compute one day's metrics; idempotent. None if there were no predictions."""
+    day = _day_start(day)
+    ids, labels = ranked_labels(day, use_case)
+    if not ids:
+        return None
+    precision = precision_at(labels, ks, k_pcts)
+    k = max(1, int(np.ceil(len(ids) * 0.10)))
+    doc = {
+        "day": day,
+        "use_case": use_case,
+        "n": len(ids),
+        "positives": int(labels.sum()),
+        "precision": precision,
+        # single-K fields read by /dashboard/trainer/metrics
+        "k_pct": 0.10,
+        "k": k,
+        "precision_at_k": float(labels[:k].mean()),
+    }
+    met.update_one({"day": day, "use_case": use_case}, {"$set": doc}, upsert=True)
+    # fill the precision slot of the daily aggregate (app/monitoring/aggregate.py)
+    if "p@10" in precision:
+        db.metric_aggregates.update_one(
+            {"date": day.date().isoformat(), "use_case": use_case},
+            {"$set": {"topk": {"k": 10, "precision": precision["p@10"]}}},
+            upsert=True,
+        )
+    return doc
+
+
+def compute_precision_at_k(day: datetime, k_pct: float = 0.10):
+    doc = rollup_day(day, k_pcts=sorted({*ROLLUP_K_PCTS, k_pct}))
+    if doc is None:
         return None
-    
-    df = pd.DataFrame(rows)
-
-    # label = did injury occur within next 7 days?
-
-    horizon_end = next_day + timedelta(days=7)
-    inj_map = set([r["athlete_id"] for r in inj.find(["star_ts": {"$gte": next_day, "$lt": horizon_end}])])
-    df["label"] = df["athlete_id"].map(lambda a: 1 if a in inj_map else 0)
-
-    k = max(1, int(np.ceil(len(df) * k_pct)))
-    topk = df.sort_values("p", ascending=False).head(k)
-    precision_at_k = topk["label"].mean() if k else 0.0
-
-    met.update_one(
-        {"day": day},
-        {"$set": {
-            "day": day,
-            "n": int(len(df)),
-            "k_pct": float(k_pct),
-            "k": int(k),
-            "precision_at_k": float(precision_at_k),
-
-        }},
-        upsert=True
-    )
-    return precision_at_k
\ No newline at end of file
+    return doc["precision"][f"p@{k_pct:g}"]
+
+
+def run_precision_rollups(use_case: str = "injury_risk", now: Optional[datetime] = None,
+                          workers: int = ROLLUP_WORKERS) -> Dict[str, Any]:
+    """Roll up every day whose label horizon has passed and isn't rolled up yet."""
+    now = now or datetime.utcnow()
+    # a day is final once next_day + horizon is in the past
+    last_final = _day_start(now) - timedelta(days=HORIZON_DAYS + 1)
+    key = f"precision:{use_case}"
+    s = state.find_one({"_id": key}) or {}
+    start = s.get("rolled_through")
+    if start is None:
+        first = pred.find_one({"use_case": use_case}, sort=[("ts", 1)])
+        if not first:
+            return {"days": 0, "rolled_through": None}
+        start = _day_start(first["ts"])
+    else:
+        start = start + timedelta(days=1)
+
+    days: List[datetime] = []
+    while start <= last_final and len(days) < MAX_ROLLUP_DAYS_PER_RUN:
+        days.append(start)
+        start += timedelta(days=1)
+    if not days:
+        return {"days": 0, "rolled_through": s.get("rolled_through")}
+
+    with ThreadPoolExecutor(max_workers=max(1, min(workers, len(days)))) as ex:
+        futures = [ex.submit(rollup_day, d, use_case) for d in days]
+    # the watermark only moves over the contiguous prefix that succeeded
+    through = s.get("rolled_through")
+    done = 0
+    for d, f in zip(days, futures):
+        if f.exception() is not None:
+            break
+        through = d
+        done += 1
+    if through is not None:
+        state.update_one({"_id": key}, {"$set": {"rolled_through": through}}, upsert=True)
+    return {"days": done, "rolled_through": through, "failed": len(days) - done}
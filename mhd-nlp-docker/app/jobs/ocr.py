@@ -0,0 +1,50 @@
+# app/jobs/ocr.py
+# Re-OCR of a stored upload, run as an "ocr" job. Reads the local copy when
+# this replica has it, otherwise the blob through the disk cache.
+import os
+from datetime import datetime, timezone
+
+from bson import ObjectId
+
+from app.db import db
+from app.db.blob_cache import blob_cache
+from app.jobs.progress import report_progress
+from app.utils.ocr import extract_text_from_pdf_or_ocr, ocr_image_path
+
+IMAGE_EXTS = {".png", ".jpg", ".jpeg", ".tif", ".tiff"}
+
+
+def _local_path(doc: dict):
+    """(path, pinned cache entry or None); release the entry once done with the path."""
+    path = doc.get("local_path") or os.path.join("uploads", doc["filename"])
+    if os.path.exists(path) or not doc.get("storage_key"):
+        return path, None
+    entry = blob_cache.fetch("raw", doc["storage_key"], pin=True)
+    return entry.path, entry
+
+
+def ocr_upload(upload_id: str) -> dict:
+    doc = db.uploads.find_one({"_id": ObjectId(upload_id)})
+    if not doc:
+        raise ValueError(f"upload {upload_id} not found")
+
+    ext = os.path.splitext(doc["filename"])[1].lower()
+    report_progress(0.1, "fetching")
+    path, entry = _local_path(doc)
+    try:
+        report_progress(0.3, "ocr")
+        if ext == ".pdf":
+            text = extract_text_from_pdf_or_ocr(path)
+        elif ext in IMAGE_EXTS:
+            text = ocr_image_path(path)
+        else:
+            raise ValueError(f"not an OCR type: {ext}")
+    finally:
+        if entry is not None:
+            blob_cache.release(entry)
+
+    db.uploads.update_one(
+        {"_id": doc["_id"]},
+        {"$set": {"ocr_text": text, "ocr_at": datetime.now(timezone.utc)}},
+    )
+    return {"upload_id": upload_id, "chars": len(text)}
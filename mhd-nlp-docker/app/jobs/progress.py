@@ -0,0 +1,45 @@
+# app/jobs/progress.py
+# Progress reporting for code running inside a job. Kept free of the job
+# registry's imports so pipeline steps can call it without import cycles.
+import threading
+import datetime as dt
+from typing import Any, Dict, NamedTuple, Optional
+
+from app.db import db
+
+jobs = db["jobs"]
+
+_local = threading.local()
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class JobContext(NamedTuple):
+    jid: str
+    worker: str
+    cancel: threading.Event
+
+
+def current_job() -> Optional[JobContext]:
+    return getattr(_local, "ctx", None)
+
+
+def set_current_job(ctx: Optional[JobContext]):
+    _local.ctx = ctx
+
+
+def report_progress(pct: Optional[float] = None, message: Optional[str] = None):
+    """Record progress from inside a job; a no-op when not running as one."""
+    ctx = current_job()
+    if ctx is None:
+        return
+    if ctx.cancel.is_set():
+        raise JobCancelled(ctx.jid)
+    fields: Dict[str, Any] = {"progress.updated_at": dt.datetime.utcnow()}
+    if pct is not None:
+        fields["progress.pct"] = float(pct)
+    if message is not None:
+        fields["progress.message"] = message
+    jobs.update_one({"_id": ctx.jid, "worker": ctx.worker}, {"$set": fields})
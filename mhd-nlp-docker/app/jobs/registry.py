@@ -1,21 +1,75 @@
+# app/jobs/registry.py
+# One job system for everything that must not run on a request thread.
+#
+# A job is a row in `jobs` (kind, params, priority, attempts, progress,
+# result). Workers claim the highest-priority runnable row with a lease and
+# keep renewing it from a heartbeat thread; a job whose lease lapses (worker
+# died) is retried, and failures back off exponentially up to the kind's
+# max_attempts. Workers are threads started with the app (opt-in via
+# JOBS_INPROCESS_WORKERS), `python -m app.jobs.worker` containers, or RQ
+# workers executing run_job(jid) when JOBS_DISPATCH=rq. All of them go
+# through the same claim, so a job runs once whichever picks it up.
 import os
+import json
 import uuid
+import time
+import socket
+import logging
+import threading
 import traceback
 import datetime as dt
+from typing import Any, Callable, Dict, Iterable, List, NamedTuple, Optional
+
+from pymongo import ReturnDocument
 
 from app.db import db
-from app.pipelines.orchestrator import run_training_job
+from app.jobs.progress import JobCancelled, JobContext, set_current_job
+
+log = logging.getLogger(__name__)
+
+JOB_LEASE_S = float(os.getenv("JOB_LEASE_S", "60"))
+JOB_POLL_S = float(os.getenv("JOB_POLL_S", "1.0"))
+JOB_BACKOFF_S = float(os.getenv("JOB_BACKOFF_S", "10"))
+JOBS_DISPATCH = os.getenv("JOBS_DISPATCH", "mongo").lower()
+JOBS_INPROCESS_WORKERS = int(os.getenv("JOBS_INPROCESS_WORKERS", "0"))
 
 jobs = db["jobs"]
+jobs.create_index([("status", 1), ("priority", -1), ("created_at", 1)])
+jobs.create_index([("status", 1), ("lease_until", 1)])
+jobs.create_index([("kind", 1), ("created_at", -1)])
+
+
+class JobKind(NamedTuple):
+    fn: Callable[..., Any]
+    priority: int
+    max_attempts: int
+
+
+KINDS: Dict[str, JobKind] = {}
+
+
+def register_kind(name: str, fn: Callable[..., Any], priority: int = 5, max_attempts: int = 3):
+    """fn(**params) runs the job; higher priority runs first."""
+    KINDS[name] = JobKind(fn, priority, max_attempts)
 
 
+def _now():
+    return dt.datetime.utcnow()
+
+
+def _worker_name(prefix: str = "w") -> str:
+    return f"{prefix}:{socket.gethostname()}:{os.getpid()}:{threading.get_ident()}"
+
+
+# ---------- rows ----------
+
 def create_job(doc: dict) -> str:
     jid = str(uuid.uuid4())
     doc.update(
         {
             "_id": jid,
             "status": "queued",
-            "created_at": dt.datetime.utcnow(),
+            "created_at": _now(),
         }
     )
     jobs.insert_one(doc)
@@ -26,34 +80,266 @@ def mark(jid: str, **fields):
     jobs.update_one({"_id": jid}, {"$set": fields})
 
 
-def _train_and_record(jid: str):
-    """
-    Runs the training job and updates job status.
-    Intended to be called in a background task.
-    """
-    try:
-        mark(jid, status="running", started_at=dt.datetime.utcnow())
-        job_id = run_training_job()
-        mark(
-            jid,
-            status="succeeded",
-            finished_at=dt.datetime.utcnow(),
-            result={"job_id": job_id},
-        )
-    except Exception as e:
-        mark(
-            jid,
-            status="failed",
-            finished_at=dt.datetime.utcnow(),
-            error=str(e),
-            traceback=traceback.format_exc(),
+def enqueue(kind: str, params: Optional[dict] = None, priority: Optional[int] = None,
+            created_by: Optional[str] = None) -> str:
+    if kind not in KINDS:
+        raise ValueError(f"Unknown job kind: {kind}")
+    spec = KINDS[kind]
+    jid = create_job({
+        "kind": kind,
+        "params": params or {},
+        "priority": spec.priority if priority is None else priority,
+        "attempts": 0,
+        "max_attempts": spec.max_attempts,
+        "run_after": _now(),
+        "progress": {"pct": 0.0, "message": None},
+        "created_by": created_by,
+    })
+    if JOBS_DISPATCH == "rq":
+        # immediate pickup by an RQ worker; pollers still cover retries
+        from app.jobs.queue import q
+        q.enqueue(run_job, jid, job_timeout=-1)
+    return jid
+
+
+def enqueue_unique(kind: str, params: Optional[dict] = None, created_by: Optional[str] = None) -> str:
+    """enqueue unless a job of this kind is already queued or running (periodic work from many replicas)."""
+    pending = jobs.find_one({"kind": kind, "status": {"$in": ["queued", "running"]}}, {"_id": 1})
+    if pending is not None:
+        return pending["_id"]
+    return enqueue(kind, params, created_by=created_by)
+
+
+def get_job(jid: str) -> Optional[dict]:
+    return jobs.find_one({"_id": jid}, {"traceback": 0})
+
+
+def list_jobs(kind: Optional[str] = None, status: Optional[str] = None, limit: int = 50) -> List[dict]:
+    q = {k: v for k, v in (("kind", kind), ("status", status)) if v}
+    return list(jobs.find(q, {"traceback": 0}).sort("created_at", -1).limit(limit))
+
+
+def cancel(jid: str) -> bool:
+    """Queued jobs stop at once; running ones at their next report_progress()."""
+    r = jobs.update_one({"_id": jid, "status": "queued"},
+                        {"$set": {"status": "cancelled", "finished_at": _now()}})
+    if r.modified_count:
+        return True
+    r = jobs.update_one({"_id": jid, "status": "running"}, {"$set": {"cancel_requested": True}})
+    return bool(r.modified_count)
+
+
+# ---------- claim / lease ----------
+
+def claim(worker: str, kinds: Optional[Iterable[str]] = None, jid: Optional[str] = None) -> Optional[dict]:
+    now = _now()
+    q: Dict[str, Any] = {"status": "queued", "run_after": {"$lte": now}}
+    if kinds:
+        q["kind"] = {"$in": list(kinds)}
+    if jid:
+        q["_id"] = jid
+    return jobs.find_one_and_update(
+        q,
+        {
+            "$set": {
+                "status": "running",
+                "worker": worker,
+                "started_at": now,
+                "heartbeat_at": now,
+                "lease_until": now + dt.timedelta(seconds=JOB_LEASE_S),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", -1), ("created_at", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _fail_or_retry(job: dict, error: str, tb: Optional[str] = None, guard: Optional[dict] = None):
+    now = _now()
+    q = {"_id": job["_id"], **(guard or {"status": "running", "worker": job.get("worker")})}
+    if job.get("attempts", 1) < job.get("max_attempts", 1):
+        delay = JOB_BACKOFF_S * (2 ** (job.get("attempts", 1) - 1))
+        jobs.update_one(q, {
+            "$set": {"status": "queued", "run_after": now + dt.timedelta(seconds=delay),
+                     "error": error, "traceback": tb},
+            "$unset": {"lease_until": "", "worker": ""},
+        })
+    else:
+        jobs.update_one(q, {
+            "$set": {"status": "failed", "finished_at": now, "error": error, "traceback": tb},
+            "$unset": {"lease_until": ""},
+        })
+
+
+def reap_expired() -> int:
+    """Requeue (or fail) running jobs whose worker stopped heartbeating."""
+    n = 0
+    for job in jobs.find({"status": "running", "lease_until": {"$lt": _now()}}):
+        _fail_or_retry(job, "lease expired (worker lost)",
+                       guard={"status": "running", "lease_until": job["lease_until"]})
+        n += 1
+    return n
+
+
+# ---------- execution ----------
+
+def _heartbeat(ctx: JobContext, stop: threading.Event):
+    while not stop.wait(JOB_LEASE_S / 3):
+        now = _now()
+        doc = jobs.find_one_and_update(
+            {"_id": ctx.jid, "worker": ctx.worker, "status": "running"},
+            {"$set": {"heartbeat_at": now, "lease_until": now + dt.timedelta(seconds=JOB_LEASE_S)}},
+            projection={"cancel_requested": 1},
         )
+        # lost the lease (reaped) or asked to stop
+        if doc is None or doc.get("cancel_requested"):
+            ctx.cancel.set()
 
 
-def launch_train_job(background_tasks, payload: dict | None = None) -> str:
-    """
-    Create a job row and enqueue background run (using FastAPI BackgroundTasks).
-    """
-    jid = create_job({"type": "train", "params": payload or {}})
-    background_tasks.add_task(_train_and_record, jid)
-    return jid
+def _storable(result: Any) -> Any:
+    # numpy scalars, datetimes etc. -> plain JSON types
+    return json.loads(json.dumps(result, default=str))
+
+
+def execute(job: dict, worker: str):
+    """Run a claimed job to a terminal (or retry) state."""
+    spec = KINDS.get(job["kind"])
+    if spec is None:
+        _fail_or_retry({**job, "attempts": job.get("max_attempts", 1)}, f"Unknown job kind: {job['kind']}")
+        return
+
+    ctx = JobContext(job["_id"], worker, threading.Event())
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(ctx, stop), name=f"job-hb-{job['_id'][:8]}", daemon=True).start()
+    set_current_job(ctx)
+    guard = {"status": "running", "worker": worker}
+    try:
+        try:
+            result = spec.fn(**(job.get("params") or {}))
+            stored = _storable(result if isinstance(result, dict) else {"value": result})
+        except JobCancelled:
+            jobs.update_one({"_id": job["_id"], **guard},
+                            {"$set": {"status": "cancelled", "finished_at": _now()}, "$unset": {"lease_until": ""}})
+            return
+        except Exception as e:
+            _fail_or_retry(job, str(e), traceback.format_exc(), guard=guard)
+            return
+        finally:
+            set_current_job(None)
+        # the job has run: a failed write here must not send it round again, so
+        # retry the write itself (the heartbeat keeps the lease meanwhile)
+        _record_success(job["_id"], guard, stored)
+    finally:
+        stop.set()
+
+
+def _record_success(jid: str, guard: dict, result: dict, attempts: int = 5):
+    for attempt in range(attempts):
+        try:
+            jobs.update_one({"_id": jid, **guard}, {
+                "$set": {"status": "succeeded", "finished_at": _now(), "result": result, "progress.pct": 1.0},
+                "$unset": {"lease_until": "", "error": ""},
+            })
+            return
+        except Exception:
+            if attempt == attempts - 1:
+                raise
+            time.sleep(min(JOB_POLL_S * (2 ** attempt), JOB_LEASE_S / 3))
+
+
+def run_job(jid: str) -> Optional[dict]:
+    """RQ entrypoint: run one specific job if it is still claimable."""
+    worker = _worker_name("rq")
+    job = claim(worker, jid=jid)
+    if job is not None:
+        execute(job, worker)
+    return get_job(jid)
+
+
+class JobWorker:
+    """Polling worker threads; kinds=None takes every kind."""
+
+    def __init__(self, concurrency: int = 1, kinds: Optional[Iterable[str]] = None, poll_s: float = JOB_POLL_S):
+        self.concurrency = concurrency
+        self.kinds = list(kinds) if kinds else None
+        self.poll_s = poll_s
+        self._stop = threading.Event()
+        self._threads: List[threading.Thread] = []
+
+    def _loop(self):
+        worker = _worker_name()
+        while not self._stop.is_set():
+            try:
+                reap_expired()
+                job = claim(worker, self.kinds)
+            except Exception:
+                job = None  # Mongo blip; try again next tick
+            if job is None:
+                self._stop.wait(self.poll_s)
+                continue
+            try:
+                execute(job, worker)
+            except Exception:
+                # state writes failed (Mongo down); the lease lapses and the
+                # reaper takes it from there. Keep this thread consuming.
+                log.exception("job %s: could not record its outcome", job.get("_id"))
+                self._stop.wait(self.poll_s)
+
+    def start(self):
+        if self._threads:
+            return
+        self._stop.clear()
+        for i in range(self.concurrency):
+            t = threading.Thread(target=self._loop, name=f"job-worker-{i}", daemon=True)
+            t.start()
+            self._threads.append(t)
+
+    def stop(self, timeout: float = 5.0):
+        self._stop.set()
+        for t in self._threads:
+            t.join(timeout)
+        self._threads = []
+
+
+inprocess_workers = JobWorker(JOBS_INPROCESS_WORKERS)
+
+
+def start_workers():
+    if JOBS_INPROCESS_WORKERS > 0:
+        inprocess_workers.start()
+
+
+def launch_train_job(payload: dict | None = None, created_by: Optional[str] = None) -> str:
+    return enqueue("train", payload, created_by=created_by)
+
+
+# ---------- built-in kinds ----------
+
+def _register_builtin():
+    from app.pipelines.orchestrator import (
+        run_training_job, run_injury_risk_training, run_session_quality_training,
+    )
+    from app.features.injury_risk import build_injury_risk_features
+    from app.labeling.injury_risk import build_injury_labels
+    from app.jobs.retention import run_rollups
+    from app.jobs.ocr import ocr_upload
+    from app.jobs.sharded import map_reduce
+    from app.jobs.drift import compute_daily_drift
+    from app.jobs.metrics_rollup import run_precision_rollups
+    from app.monitoring.aggregate import aggregate_datily
+
+    register_kind("train", run_training_job, priority=5, max_attempts=2)
+    register_kind("train_injury", run_injury_risk_training, priority=5, max_attempts=2)
+    register_kind("train_session", run_session_quality_training, priority=5, max_attempts=2)
+    register_kind("features", build_injury_risk_features, priority=6)
+    register_kind("labels", build_injury_labels, priority=6)
+    register_kind("sharded", map_reduce, priority=6, max_attempts=2)
+    register_kind("ocr", ocr_upload, priority=7)
+    register_kind("rollups", run_rollups, priority=1)
+    register_kind("drift", compute_daily_drift, priority=1)
+    register_kind("precision_rollups", run_precision_rollups, priority=1)
+    register_kind("aggregates", aggregate_datily, priority=1)
+
+
+_register_builtin()
@@ -0,0 +1,172 @@
+# app/jobs/retention.py
+# Retention for high-volume log/token collections:
+#   - one TTL index per collection (days configurable via RETENTION_<NAME>_DAYS,
+#     0 keeps documents forever and leaves a plain index on the field)
+#   - token collections expire at their JWT exp (expires_at, expireAfterSeconds=0)
+#   - optional daily roll-ups into <name>_daily, written before the raw rows expire
+import os
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Optional
+
+from pymongo import UpdateOne
+
+from app.db import db
+
+RETENTION_ROLLUP_ENABLED = os.getenv("RETENTION_ROLLUP_ENABLED", "true").lower() == "true"
+RETENTION_INTERVAL_S = int(os.getenv("RETENTION_INTERVAL_S", "3600"))
+MAX_ROLLUP_DAYS_PER_RUN = 400
+
+# collection -> (timestamp field, default retention days); None = expire at the field's time
+POLICIES: Dict[str, tuple] = {
+    "api_metrics": ("ts", 30),
+    "activity_logs": ("timestamp", 180),
+    "audits": ("ts", 365),
+    "audit_events": ("ts", 365),
+    "revoked_tokens": ("expires_at", None),
+    "refresh_tokens": ("expires_at", None),
+    "password_resets": ("created_at", 1),
+}
+
+# roll-up spec: group keys + accumulators per day
+ROLLUPS: Dict[str, Dict[str, Any]] = {
+    "api_metrics": {
+        "group": {
+            "path": {"$ifNull": ["$path", "$endpoint"]},
+            "method": "$method",
+            "status": "$status",
+        },
+        "acc": {
+            "n": {"$sum": 1},
+            "latency_ms_avg": {"$avg": "$latency_ms"},
+            "latency_ms_max": {"$max": "$latency_ms"},
+        },
+    },
+    "activity_logs": {"group": {"action": "$action"}, "acc": {"n": {"$sum": 1}}},
+    "audits": {"group": {"action": "$action"}, "acc": {"n": {"$sum": 1}}},
+    "audit_events": {"group": {"action": "$action", "ok": "$ok"}, "acc": {"n": {"$sum": 1}}},
+}
+
+state = db["retention_state"]
+
+
+def ttl_seconds(name: str) -> Optional[int]:
+    """expireAfterSeconds for a collection, or None to keep forever."""
+    _, default_days = POLICIES[name]
+    if default_days is None:
+        return 0
+    days = float(os.getenv(f"RETENTION_{name.upper()}_DAYS", default_days))
+    return int(days * 86400) if days > 0 else None
+
+
+def _ensure_index(coll, field: str, seconds: Optional[int]) -> str:
+    for name, info in coll.index_information().items():
+        if [(k, int(v)) for k, v in info["key"]] != [(field, 1)]:
+            continue
+        current = info.get("expireAfterSeconds")
+        if current is not None:
+            current = int(current)
+        if current == seconds:
+            return "ok"
+        if current is not None and seconds is not None:
+            coll.database.command("collMod", coll.name, index={"name": name, "expireAfterSeconds": seconds})
+            return "updated"
+        # TTL can't be added to / removed from an existing index in place
+        coll.drop_index(name)
+        break
+
+    if seconds is None:
+        coll.create_index([(field, 1)])
+        return "plain"
+    coll.create_index([(field, 1)], expireAfterSeconds=seconds)
+    return "created"
+
+
+def ensure_retention_indexes() -> Dict[str, str]:
+    """Create or reconcile the TTL index of every policy collection."""
+    out = {}
+    for name, (field, _) in POLICIES.items():
+        try:
+            out[name] = _ensure_index(db[name], field, ttl_seconds(name))
+        except Exception as e:
+            out[name] = f"error: {e}"
+    return out
+
+
+# ---------- roll-ups ----------
+
+def _day_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def rollup_day(name: str, day: datetime) -> int:
+    """(Re)compute the daily aggregates of one UTC day; idempotent."""
+    field, _ = POLICIES[name]
+    spec = ROLLUPS[name]
+    day = _day_start(day)
+    rows = db[name].aggregate([
+        {"$match": {field: {"$gte": day, "$lt": day + timedelta(days=1)}}},
+        {"$group": {"_id": spec["group"], **spec["acc"]}},
+    ])
+    ops = []
+    for r in rows:
+        key = {"day": day, **(r.pop("_id") or {})}
+        ops.append(UpdateOne(key, {"$set": {**key, **r}}, upsert=True))
+    if ops:
+        db[f"{name}_daily"].bulk_write(ops, ordered=False)
+    return len(ops)
+
+
+def run_rollups(now: Optional[datetime] = None) -> Dict[str, int]:
+    """Roll up every complete day not yet rolled up, per collection."""
+    today = _day_start(now or datetime.utcnow())
+    done: Dict[str, int] = {}
+    for name in ROLLUPS:
+        field, _ = POLICIES[name]
+        db[f"{name}_daily"].create_index([("day", -1)])
+        s = state.find_one({"_id": name}) or {}
+        day = s.get("rolled_through")
+        if day is None:
+            first = db[name].find_one({field: {"$ne": None}}, sort=[(field, 1)])
+            if not first or not isinstance(first.get(field), datetime):
+                continue
+            day = _day_start(first[field])
+        else:
+            day = day + timedelta(days=1)
+
+        n = 0
+        while day < today and n < MAX_ROLLUP_DAYS_PER_RUN:
+            rollup_day(name, day)
+            state.update_one({"_id": name}, {"$set": {"rolled_through": day}}, upsert=True)
+            day += timedelta(days=1)
+            n += 1
+        done[name] = n
+    return done
+
+
+# periodic work runs as jobs on the worker services, not on the API replica
+# hosting this thread; every kind resumes from its own watermark
+SCHEDULED_KINDS = ("rollups", "aggregates", "precision_rollups")
+
+
+def _loop(interval_s: int):
+    from app.jobs.registry import enqueue_unique
+    while True:
+        for kind in SCHEDULED_KINDS:
+            try:
+                enqueue_unique(kind, created_by="retention")
+            except Exception:
+                # keep the loop alive; the next tick enqueues it again
+                pass
+        time.sleep(interval_s)
+
+
+def start_retention(interval_s: int = RETENTION_INTERVAL_S) -> Optional[threading.Thread]:
+    """Reconcile TTL indexes and start the thread that schedules roll-up jobs (if enabled)."""
+    ensure_retention_indexes()
+    if not RETENTION_ROLLUP_ENABLED:
+        return None
+    t = threading.Thread(target=_loop, args=(interval_s,), name="retention-rollup", daemon=True)
+    t.start()
+    return t
@@ -0,0 +1,250 @@
+# app/jobs/sharded.py
+# Map-reduce feature/label builds across RQ workers.
+#
+# map_reduce() splits athletes into FEATURE_SHARDS stable hash shards, writes
+# one shard_runs row per shard (athlete ids + params) and enqueues
+# run_shard(run_id, shard) on FEATURE_QUEUE for each. A shard row is claimed
+# before it runs, so an RQ retry, a second worker or the coordinator itself
+# (which works through unclaimed shards while it waits) never build the same
+# shard twice. Claims hold a short lease renewed by a heartbeat while the
+# shard runs, so a shard whose worker died is re-claimed within
+# SHARD_LEASE_S rather than after the whole run's timeout. The reduce step waits for every shard, then checks the output
+# collections cover every athlete. Throughput scales with the number of
+# rq-worker containers (`docker compose up --scale rq-worker=N`).
+import os
+import time
+import uuid
+import socket
+import hashlib
+import threading
+import datetime as dt
+from typing import Any, Callable, Dict, List, Optional
+
+from pymongo import ReturnDocument
+
+from app.db import db
+from app.features.injury_risk import build_injury_risk_features
+from app.labeling.injury_risk import build_injury_labels
+from app.jobs.progress import report_progress
+
+FEATURE_SHARDS = int(os.getenv("FEATURE_SHARDS", "0"))  # 0 = single-process builds
+FEATURE_QUEUE = os.getenv("FEATURE_QUEUE", "mhd_features")
+SHARD_DISPATCH = os.getenv("SHARD_DISPATCH", "rq").lower()  # rq | inline
+SHARD_ATTEMPTS = int(os.getenv("SHARD_ATTEMPTS", "3"))
+SHARD_TIMEOUT_S = int(os.getenv("SHARD_TIMEOUT_S", "3600"))
+SHARD_LEASE_S = float(os.getenv("SHARD_LEASE_S", "60"))
+SHARD_POLL_S = float(os.getenv("SHARD_POLL_S", "1.0"))
+
+shard_runs = db["shard_runs"]
+shard_runs.create_index([("run_id", 1), ("shard", 1)], unique=True)
+shard_runs.create_index([("run_id", 1), ("status", 1)])
+
+TASKS: Dict[str, Callable[..., int]] = {
+    "features": build_injury_risk_features,
+    "labels": build_injury_labels,
+}
+
+
+def _now():
+    return dt.datetime.utcnow()
+
+
+def shard_of(athlete_id: Any, n_shards: int) -> int:
+    # stable across processes (unlike hash())
+    h = hashlib.sha1(str(athlete_id).encode("utf-8")).hexdigest()
+    return int(h[:8], 16) % n_shards
+
+
+def partition(athlete_ids: List[Any], n_shards: int) -> List[List[Any]]:
+    shards: List[List[Any]] = [[] for _ in range(n_shards)]
+    for aid in athlete_ids:
+        shards[shard_of(aid, n_shards)].append(aid)
+    return shards
+
+
+def _athletes(task: str, params: Dict[str, Any]) -> List[Any]:
+    if task == "features":
+        since = params["now"] - dt.timedelta(days=max(params.get("lookbacks", (7, 28))) + 2)
+        return db.sessions.distinct("athlete_id", {"ts": {"$gte": since}})
+    return db.features.distinct("athlete_id", {"version": "risk_v1"})
+
+
+# ---------- map ----------
+
+def _claim(run_id: str, shard: Optional[int] = None) -> Optional[dict]:
+    now = _now()
+    q: Dict[str, Any] = {
+        "run_id": run_id,
+        "attempts": {"$lt": SHARD_ATTEMPTS},
+        "$or": [
+            {"status": {"$in": ["queued", "failed"]}},
+            {"status": "running", "lease_until": {"$lt": now}},  # worker died mid-shard
+        ],
+    }
+    if shard is not None:
+        q["shard"] = shard
+    return shard_runs.find_one_and_update(
+        q,
+        {
+            "$set": {
+                "status": "running",
+                "worker": f"{socket.gethostname()}:{os.getpid()}",
+                "lease": uuid.uuid4().hex,
+                "started_at": now,
+                "lease_until": now + dt.timedelta(seconds=SHARD_LEASE_S),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("shard", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def _heartbeat(key: dict, stop: threading.Event):
+    while not stop.wait(SHARD_LEASE_S / 3):
+        try:
+            held = shard_runs.update_one(
+                key, {"$set": {"lease_until": _now() + dt.timedelta(seconds=SHARD_LEASE_S)}}).matched_count
+        except Exception:
+            continue  # Mongo blip; the next beat tries again before the lease runs out
+        if not held:
+            return  # re-claimed elsewhere; our final write won't match either
+
+
+def _run_claimed(row: dict) -> int:
+    key = {"_id": row["_id"], "status": "running", "lease": row["lease"]}
+    stop = threading.Event()
+    threading.Thread(target=_heartbeat, args=(key, stop), name=f"shard-hb-{row['shard']}", daemon=True).start()
+    t0 = time.perf_counter()
+    try:
+        written = TASKS[row["task"]](athlete_ids=row["athlete_ids"], **row["params"])
+    except Exception as e:
+        shard_runs.update_one(key, {"$set": {"status": "failed", "error": str(e)}, "$unset": {"lease_until": ""}})
+        raise
+    finally:
+        stop.set()
+    shard_runs.update_one(key, {
+        "$set": {"status": "done", "written": int(written), "seconds": round(time.perf_counter() - t0, 3),
+                 "finished_at": _now()},
+        "$unset": {"lease_until": "", "error": ""},
+    })
+    return int(written)
+
+
+def run_shard(run_id: str, shard: int) -> Optional[int]:
+    """RQ entrypoint: build one shard if nobody else has (None = already taken)."""
+    row = _claim(run_id, shard)
+    if row is None:
+        return None
+    return _run_claimed(row)
+
+
+def _dispatch(run_id: str, n: int):
+    from rq import Queue, Retry
+    from app.jobs.queue import redis
+
+    q = Queue(FEATURE_QUEUE, connection=redis)
+    retry = Retry(max=SHARD_ATTEMPTS - 1, interval=10) if SHARD_ATTEMPTS > 1 else None
+    for shard in range(n):
+        q.enqueue(run_shard, run_id, shard, job_timeout=SHARD_TIMEOUT_S, retry=retry)
+
+
+# ---------- reduce ----------
+
+def _wait(run_id: str, n: int, timeout_s: float):
+    deadline = time.monotonic() + timeout_s
+    while True:
+        dead = shard_runs.find_one({"run_id": run_id, "status": "failed", "attempts": {"$gte": SHARD_ATTEMPTS}})
+        if dead is not None:
+            raise RuntimeError(f"shard {dead['shard']} failed {dead['attempts']} times: {dead.get('error')}")
+        # help out: unclaimed shards run here too, so a busy queue can't stall us
+        row = _claim(run_id)
+        if row is not None:
+            try:
+                _run_claimed(row)
+            except Exception:
+                pass  # recorded on the row; retried by the next claimer
+            continue
+        done = shard_runs.count_documents({"run_id": run_id, "status": "done"})
+        report_progress(0.05 + 0.85 * done / n, f"{done}/{n} shards")
+        if done == n:
+            return
+        if time.monotonic() > deadline:
+            raise TimeoutError(f"{n - done} of {n} shards unfinished after {timeout_s}s")
+        time.sleep(SHARD_POLL_S)
+
+
+def _verify(task: str, shards: List[List[Any]], params: Dict[str, Any]) -> List[int]:
+    """Shard numbers whose output doesn't cover their athletes."""
+    bad = []
+    for i, ids in enumerate(shards):
+        only = {"athlete_id": {"$in": ids}}
+        if task == "features":
+            # every athlete with sessions in the window gets a feature row
+            covered = len(db.features.distinct("athlete_id", {**only, "version": params.get("version", "risk_v1")}))
+            ok = covered == len(ids)
+        else:
+            # every feature row gets a label row
+            n_feats = db.features.count_documents({**only, "version": "risk_v1"})
+            n_labels = db.labels.count_documents({**only, "horizon_days": params.get("horizon_days", 14)})
+            ok = n_labels >= n_feats
+        if not ok:
+            bad.append(i)
+    return bad
+
+
+def map_reduce(task: str, n_shards: Optional[int] = None, dispatch: Optional[str] = None,
+               timeout_s: float = SHARD_TIMEOUT_S, **params) -> Dict[str, Any]:
+    """
+    Run a TASKS build sharded by athlete. params go to the build function
+    (e.g. version, lookbacks for features; horizon_days for labels).
+    """
+    if task not in TASKS:
+        raise ValueError(f"Unknown sharded task: {task}")
+    n_shards = max(int(n_shards or FEATURE_SHARDS or 1), 1)
+    dispatch = (dispatch or SHARD_DISPATCH).lower()
+    if task == "features":
+        # every shard must use the same windows
+        now = params.get("now") or dt.datetime.now(dt.timezone.utc)
+        if isinstance(now, str):
+            now = dt.datetime.fromisoformat(now)  # job params arrive as JSON
+        params["now"] = now
+    t0 = time.perf_counter()
+
+    ids = _athletes(task, params)
+    shards = partition(ids, n_shards)
+    run_id = str(uuid.uuid4())
+    shard_runs.insert_many([
+        {"run_id": run_id, "shard": i, "task": task, "params": params, "athlete_ids": s,
+         "status": "queued", "attempts": 0, "created_at": _now()}
+        for i, s in enumerate(shards)
+    ])
+    report_progress(0.05, f"{len(ids)} athletes in {n_shards} shards")
+    if dispatch == "rq":
+        _dispatch(run_id, n_shards)
+    _wait(run_id, n_shards, timeout_s)
+
+    report_progress(0.95, "verifying")
+    bad = _verify(task, shards, params)
+    if bad:
+        raise RuntimeError(f"incomplete {task} output for shards {bad}")
+
+    rows = list(shard_runs.find({"run_id": run_id}, {"written": 1, "seconds": 1, "worker": 1}))
+    return {
+        "run_id": run_id,
+        "task": task,
+        "shards": n_shards,
+        "athletes": len(ids),
+        "written": sum(r.get("written", 0) for r in rows),
+        "workers": len({r.get("worker") for r in rows}),
+        "shard_seconds_max": max((r.get("seconds", 0.0) for r in rows), default=0.0),
+        "seconds": round(time.perf_counter() - t0, 3),
+    }
+
+
+def build_features_sharded(version="risk_v1", lookbacks=(7, 28), now=None) -> int:
+    return map_reduce("features", version=version, lookbacks=list(lookbacks), now=now)["written"]
+
+
+def build_labels_sharded(horizon_days=14) -> int:
+    return map_reduce("labels", horizon_days=horizon_days)["written"]
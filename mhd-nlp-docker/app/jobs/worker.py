@@ -0,0 +1,32 @@
+"""
+Standalone job worker: polls the `jobs` collection and runs claimed jobs.
+
+Run:
+    python -m app.jobs.worker
+    python -m app.jobs.worker --concurrency 4 --kinds features labels
+"""
+import argparse
+import signal
+import threading
+
+from app.jobs.registry import JobWorker
+
+
+def main():
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--concurrency", type=int, default=2)
+    ap.add_argument("--kinds", nargs="*", default=None)
+    args = ap.parse_args()
+
+    worker = JobWorker(args.concurrency, args.kinds)
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+    signal.signal(signal.SIGINT, lambda *_: done.set())
+    worker.start()
+    done.wait()
+    # running jobs finish or lose their lease and get retried elsewhere
+    worker.stop()
+
+
+if __name__ == "__main__":
+    main()
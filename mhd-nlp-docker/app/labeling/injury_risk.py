@@ -1,21 +1,25 @@
 from datetime import datetime, timedelta, timezone
+from typing import Any, List, Optional
 import pandas as pd
+from pymongo import UpdateOne
 from app.db import db
 
-def build_injury_labels(horizon_days=14) -> int:
-    feats = list(db.features.find({"version":"risk_v1"}))
+def build_injury_labels(horizon_days=14, athlete_ids: Optional[List[Any]] = None) -> int:
+    # athlete_ids restricts the build to one shard (app.jobs.sharded)
+    only = {"athlete_id": {"$in": list(athlete_ids)}} if athlete_ids is not None else {}
+    feats = list(db.features.find({"version":"risk_v1", **only}))
     if not feats: return 0
     fdf = pd.DataFrame(feats)
     fdf["ts"] = pd.to_datetime(fdf["ts"])
 
-    inj = list(db.injuries.find())
+    inj = list(db.injuries.find(only))
     idf = pd.DataFrame(inj)
     if not idf.empty:
         idf["onset_date"] = pd.to_datetime(idf["onset_date"])
     else:
         idf = pd.DataFrame(columns=["athlete_id","onset_date"])
 
-    c=0
+    ops=[]
     for _, row in fdf.iterrows():
         aid = row["athlete_id"]; ts = row["ts"]
         window_end = ts + timedelta(days=horizon_days)
@@ -26,10 +30,11 @@ def build_injury_labels(horizon_days=14) -> int:
             "horizon_days": horizon_days,
             "y": 1 if future_injury else 0
         }
-        db.labels.update_one(
+        ops.append(UpdateOne(
             {"athlete_id": aid, "ts": ts, "horizon_days": horizon_days},
             {"$set": lab},
             upsert = True
-        )
-        c+=1
-    return c
\ No newline at end of file
+        ))
+    if ops:
+        db.labels.bulk_write(ops, ordered=False)
+    return len(ops)
@@ -39,12 +39,29 @@ from app.routes.models import router as models_router
 from app.monitoring.middleware import APIMetricsMiddleware
 
 from app.db.storage import storage_startup, ensure_buckets
+from app.serving.pool import model_pool
+from app.services.auth_cache import revocations
+from app.jobs.retention import start_retention
+from app.utils.audit_pipeline import audit_pipeline
+from app.jobs.registry import start_workers, inprocess_workers
 
 app = FastAPI()
 @app.on_event("startup")
 def _startup():
     storage_startup()
     ensure_buckets()
+    model_pool.start_preload()
+    revocations.start()
+    start_retention()
+    audit_pipeline.start()
+    start_workers()
+
+
+@app.on_event("shutdown")
+def _shutdown():
+    # drain buffered audit/activity events before the process exits
+    audit_pipeline.stop()
+    inprocess_workers.stop()
 
 
 
@@ -1,30 +1,79 @@
-from datetime import datetime, timedelta, timezone
+# app/monitoring/aggregate.py
+# Daily prediction aggregates in metric_aggregates, maintained incrementally.
+# Each day's doc carries agg_through, the newest prediction ts already
+# counted; a run $groups only (agg_through, now - lag] on the (use_case, ts)
+# index and folds the counts in with the same compare-and-set update, so
+# rows are counted once even when runs overlap. precision@10 is filled in by
+# app/jobs/metrics_rollup.py once the day's labels are final.
+import os
+from datetime import datetime, timedelta
+from typing import Dict, Optional
+
+from pymongo.errors import DuplicateKeyError
+
 from app.db import db
-import numpy as np
-
-def aggregate_datily():
-    now = datetime.now(timezone.utc)
-    day_start = now.replace(hour=0, minute=0, second=0, microsecond=0)
-    preds = list(db.predictions.find({"ts": {"$gte": day_start}}))
-    if not preds: return
-
-    # risk buckets
-    risk = [p["score"] for p in preds if p["use_case"]=="injury_risk"]
-    low = sum(1 for r in risk if r<0.33); med = sum(1 for r in risk if 0.33<=r<0.66); high = sum(1 for r in risk if r>=0.66)
-
-    # precision@K (requires labels - you can compute yesterday's P@10 retrosprectively)
-    # For now, simple placeholder:
-    precision_at_10 = None
-
-    doc = {
-        "date": day_start.date().isoformat(),
-        "use_case": "injury_risk",
-        "risk_buckets": {"low":low,"medium":med,"high":high},
-        "topk": {"k":10, "precision": precision_at_10},
-        "latency_ms_avg": None,
-        "error_rate": 0.0
-    }
-    db.metric_aggregates.update_one(
-        {"date": doc["date"], "use_case":"injury_risk"},
-        {"$set": doc}, upsert=True
-    )
\ No newline at end of file
+
+AGG_LAG_S = float(os.getenv("AGG_LAG_S", "5"))  # rows younger than this may still be in flight
+TICK = timedelta(microseconds=1)
+
+aggs = db["metric_aggregates"]
+aggs.create_index([("date", 1), ("use_case", 1)], unique=True)
+db.predictions.create_index([("use_case", 1), ("ts", -1)])
+
+BUCKET = {"$switch": {
+    "branches": [
+        {"case": {"$gte": ["$score", 0.66]}, "then": "high"},
+        {"case": {"$gte": ["$score", 0.33]}, "then": "medium"},
+    ],
+    "default": "low",
+}}
+
+
+def _day_start(ts: datetime) -> datetime:
+    return datetime(ts.year, ts.month, ts.day)
+
+
+def _bucket_counts(since: datetime, until: datetime, use_case: str) -> Dict[str, int]:
+    counts = {"low": 0, "medium": 0, "high": 0}
+    for r in db.predictions.aggregate([
+        {"$match": {"use_case": use_case, "ts": {"$gt": since, "$lte": until}}},
+        {"$group": {"_id": BUCKET, "n": {"$sum": 1}}},
+    ]):
+        counts[r["_id"]] = r["n"]
+    return counts
+
+
+def aggregate_day(day: datetime, upto: datetime, use_case: str = "injury_risk") -> int:
+    """Fold predictions of `day` up to `upto` into its aggregate; returns rows added."""
+    key = {"date": day.date().isoformat(), "use_case": use_case}
+    prev = (aggs.find_one(key, {"agg_through": 1}) or {}).get("agg_through")
+    since = prev or day - TICK
+    until = min(upto, day + timedelta(days=1) - TICK)
+    if until <= since:
+        return 0
+    counts = _bucket_counts(since, until, use_case)
+    if prev is None:
+        # first incremental pass over this day (or a doc from a full recompute)
+        change = {"$set": {"risk_buckets": counts, "agg_through": until}}
+    else:
+        change = {"$inc": {f"risk_buckets.{b}": n for b, n in counts.items()},
+                  "$set": {"agg_through": until}}
+    change["$setOnInsert"] = {"topk": {"k": 10, "precision": None}, "latency_ms_avg": None, "error_rate": 0.0}
+    try:
+        r = aggs.update_one({**key, "agg_through": prev}, change, upsert=True)
+    except DuplicateKeyError:
+        return 0  # a concurrent run moved agg_through first
+    return sum(counts.values()) if (r.modified_count or r.upserted_id is not None) else 0
+
+
+def aggregate_datily(now: Optional[datetime] = None, use_case: str = "injury_risk") -> int:
+    """Catch up every day from the last watermark through today."""
+    now = now or datetime.utcnow()
+    upto = now - timedelta(seconds=AGG_LAG_S)
+    last = aggs.find_one({"use_case": use_case, "agg_through": {"$ne": None}}, sort=[("agg_through", -1)])
+    day = _day_start(last["agg_through"]) if last else _day_start(now)
+    n = 0
+    while day <= upto:
+        n += aggregate_day(day, upto, use_case)
+        day += timedelta(days=1)
+    return n
@@ -0,0 +1,156 @@
+# app/monitoring/drift.py
+# Streaming drift histograms. Every logged prediction batch adds its inputs
+# (and the score) to fixed-bin histograms, one document per (use_case, day):
+#   {use_case, day: "YYYY-MM-DD", spec, n: {feature: rows}, h: {feature: {bin: count}}}
+# with a single $inc upsert per batch. Bins are equal-width over a declared
+# range plus an underflow (0) and overflow (nbins+1) bin, so histograms from
+# different days line up and PSI/KS between any two windows comes from
+# summing stored counts; raw predictions are never re-read.
+import os
+import json
+import hashlib
+import datetime as dt
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+from app.db import db
+
+DRIFT_NBINS = int(os.getenv("DRIFT_NBINS", "20"))
+DRIFT_EPS = 1e-6
+
+drift_hist = db["drift_hist"]
+drift_hist.create_index([("use_case", 1), ("spec", 1), ("day", 1)], unique=True)
+
+# use_case -> feature -> (lo, hi); ranges follow app/schemas/predict.py
+FEATURE_RANGES: Dict[str, Dict[str, Tuple[float, float]]] = {
+    "injury_risk": {
+        "age": (10.0, 100.0),
+        "bp": (60.0, 200.0),
+        "hr": (30.0, 200.0),
+        "score": (0.0, 1.0),
+    },
+    "session_quality": {
+        "sets": (0.0, 10.0),
+        "reps": (0.0, 30.0),
+        "rpe": (0.0, 10.0),
+        "rest_s": (0.0, 300.0),
+        "completed_pct": (0.0, 100.0),
+        "nlp_fatigue": (0.0, 1.0),
+        "nlp_pain_any": (0.0, 1.0),
+        "nlp_sleep_poor": (0.0, 1.0),
+        "nlp_mood_neg": (0.0, 1.0),
+        "nlp_compliance_issues": (0.0, 1.0),
+        "score": (0.0, 5.0),
+    },
+}
+
+
+def register_feature(use_case: str, feature: str, lo: float, hi: float):
+    """Track another input; changes the use case's spec, so new histograms start fresh."""
+    FEATURE_RANGES.setdefault(use_case, {})[feature] = (float(lo), float(hi))
+
+
+def spec_version(use_case: str) -> str:
+    spec = {"nbins": DRIFT_NBINS, "ranges": FEATURE_RANGES.get(use_case, {})}
+    return hashlib.sha1(json.dumps(spec, sort_keys=True).encode("utf-8")).hexdigest()[:12]
+
+
+def edges(use_case: str, feature: str) -> np.ndarray:
+    lo, hi = FEATURE_RANGES[use_case][feature]
+    return np.linspace(lo, hi, DRIFT_NBINS + 1)
+
+
+def day_key(ts: dt.datetime) -> str:
+    return ts.date().isoformat()
+
+
+# ---------- write path ----------
+
+def bin_counts(use_case: str, feature: str, values: Sequence[Any]) -> np.ndarray:
+    """Counts over nbins + 2 bins (under, ..., over); non-numeric values are skipped."""
+    v = np.asarray([x for x in values if isinstance(x, (int, float)) and not isinstance(x, bool)], dtype=float)
+    v = v[np.isfinite(v)]
+    idx = np.searchsorted(edges(use_case, feature), v, side="right")
+    return np.bincount(idx, minlength=DRIFT_NBINS + 2)
+
+
+def observe(use_case: str, rows: Iterable[Dict[str, Any]], scores: Optional[Sequence[float]] = None,
+            ts: Optional[dt.datetime] = None) -> int:
+    """Add one logged batch to today's histograms; returns rows counted."""
+    ranges = FEATURE_RANGES.get(use_case)
+    rows = list(rows)
+    if not ranges or not rows:
+        return 0
+    cols: Dict[str, List[Any]] = {f: [r.get(f) for r in rows] for f in ranges if f != "score"}
+    if scores is not None and "score" in ranges:
+        cols["score"] = [float(s) for s in scores]
+
+    inc: Dict[str, int] = {}
+    for f, values in cols.items():
+        counts = bin_counts(use_case, f, values)
+        total = int(counts.sum())
+        if not total:
+            continue
+        inc[f"n.{f}"] = total
+        for b in np.flatnonzero(counts):
+            inc[f"h.{f}.{int(b)}"] = int(counts[b])
+    if not inc:
+        return 0
+
+    day = day_key(ts or dt.datetime.now(dt.timezone.utc))
+    drift_hist.update_one(
+        {"use_case": use_case, "spec": spec_version(use_case), "day": day},
+        {"$inc": inc, "$setOnInsert": {"nbins": DRIFT_NBINS, "ranges": FEATURE_RANGES[use_case]}},
+        upsert=True,
+    )
+    return len(rows)
+
+
+# ---------- read path ----------
+
+def window_hist(use_case: str, start: dt.date, end: dt.date) -> Dict[str, np.ndarray]:
+    """Summed histograms for days in [start, end), every tracked feature."""
+    out: Dict[str, np.ndarray] = {}
+    docs = drift_hist.find(
+        {"use_case": use_case, "spec": spec_version(use_case),
+         "day": {"$gte": start.isoformat(), "$lt": end.isoformat()}},
+        {"h": 1},
+    )
+    for d in docs:
+        for f, bins in (d.get("h") or {}).items():
+            acc = out.setdefault(f, np.zeros(DRIFT_NBINS + 2))
+            for b, c in bins.items():
+                acc[int(b)] += c
+    return out
+
+
+def psi_from_counts(ref: np.ndarray, cur: np.ndarray) -> float:
+    e = ref / ref.sum()
+    a = cur / cur.sum()
+    e = np.where(e == 0, DRIFT_EPS, e)
+    a = np.where(a == 0, DRIFT_EPS, a)
+    return float(np.sum((a - e) * np.log(a / e)))
+
+
+def ks_from_counts(ref: np.ndarray, cur: np.ndarray) -> float:
+    # exact at bin edges; a lower bound on the sample KS statistic
+    return float(np.max(np.abs(np.cumsum(ref) / ref.sum() - np.cumsum(cur) / cur.sum())))
+
+
+def compare_windows(use_case: str, ref: Tuple[dt.date, dt.date], cur: Tuple[dt.date, dt.date],
+                    features: Optional[Iterable[str]] = None) -> Dict[str, Dict[str, Any]]:
+    """PSI/KS per feature between two [start, end) day windows."""
+    h_ref = window_hist(use_case, *ref)
+    h_cur = window_hist(use_case, *cur)
+    wanted = set(features) if features else set(h_ref) | set(h_cur)
+    out: Dict[str, Dict[str, Any]] = {}
+    for f in sorted(wanted):
+        r, c = h_ref.get(f), h_cur.get(f)
+        n_ref = int(r.sum()) if r is not None else 0
+        n_cur = int(c.sum()) if c is not None else 0
+        if not n_ref or not n_cur:
+            out[f] = {"psi": None, "ks": None, "n_ref": n_ref, "n_cur": n_cur}
+            continue
+        out[f] = {"psi": psi_from_counts(r, c), "ks": ks_from_counts(r, c), "n_ref": n_ref, "n_cur": n_cur}
+    return out
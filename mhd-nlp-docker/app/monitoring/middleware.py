@@ -4,8 +4,7 @@ from starlette.middleware.base import BaseHTTPMiddleware
 from starlette.requests import Request
 from app.db import db
 
-metrics = db["api_metrics"]
-metrics.create_index("ts")
+metrics = db["api_metrics"]  # ts (TTL) index: app/jobs/retention.py
 
 
 class APIMetricsMiddleware(BaseHTTPMiddleware):
@@ -0,0 +1,185 @@
+# app/pipelines/cache.py
+# Step-level memoization for the orchestrator.
+#
+# A step's cache key is sha256(step name + code version + input fingerprints + params).
+# The code version covers the step's module and every app.* module it reaches
+# through its imports, so editing a helper the step calls invalidates it too.
+# Results are pickled into the PROCESSED bucket under pipeline-cache/<step>/<key>.pkl
+# and indexed in Mongo, so a re-run on unchanged inputs just reloads the artifact.
+import os
+import io
+import sys
+import json
+import pickle
+import hashlib
+import inspect
+import functools
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, NamedTuple, Optional
+
+import pandas as pd
+
+from app.db import db
+from app.db.storage import put_processed, get_bytes_processed
+from app.jobs.progress import report_progress
+
+CACHE_ENABLED = os.getenv("PIPELINE_CACHE_ENABLED", "true").lower() == "true"
+CODE_VERSION = os.getenv("CODE_VERSION", os.getenv("GIT_SHA", "dev"))
+CACHE_PREFIX = "pipeline-cache"
+APP_PACKAGE = "app"
+
+step_cache = db["pipeline_step_cache"]
+step_cache.create_index("key", unique=True)
+step_cache.create_index([("step", 1), ("created_at", -1)])
+
+
+class StepResult(NamedTuple):
+    value: Any
+    key: str
+    hit: bool
+
+
+# ---------- fingerprints ----------
+
+def _sha256(obj: Any) -> str:
+    raw = json.dumps(obj, sort_keys=True, default=str).encode("utf-8")
+    return hashlib.sha256(raw).hexdigest()
+
+
+def fingerprint_df(df: pd.DataFrame) -> str:
+    """
+    Content hash of a DataFrame: column names/dtypes + per-row hashes
+    (pandas hashes the whole frame in C, no per-cell Python calls).
+    """
+    h = hashlib.sha256()
+    h.update(json.dumps([[str(c), str(t)] for c, t in df.dtypes.items()]).encode("utf-8"))
+    h.update(pd.util.hash_pandas_object(df, index=True).values.tobytes())
+    return h.hexdigest()
+
+
+def fingerprint_collection(name: str, query: Optional[dict] = None, ts_field: str = "ts") -> str:
+    """
+    Cheap fingerprint of a Mongo collection slice: count + newest _id + newest ts.
+    Catches appends (the normal case for sessions/vitals/injuries); in-place edits
+    that don't touch ts are not detected, use force=True after a backfill.
+    """
+    coll = db[name]
+    query = query or {}
+    newest = coll.find_one(query, {"_id": 1}, sort=[("_id", -1)])
+    latest = coll.find_one(query, {ts_field: 1}, sort=[(ts_field, -1)])
+    return _sha256({
+        "collection": name,
+        "query": query,
+        "count": coll.count_documents(query),
+        "newest_id": str(newest["_id"]) if newest else None,
+        "latest_ts": (latest or {}).get(ts_field),
+    })
+
+
+def _local_module(obj: Any) -> Optional[str]:
+    name = obj.__name__ if inspect.ismodule(obj) else getattr(obj, "__module__", None)
+    if isinstance(name, str) and (name == APP_PACKAGE or name.startswith(APP_PACKAGE + ".")):
+        return name
+    return None
+
+
+@functools.lru_cache(maxsize=None)
+def module_closure_hash(root: str) -> str:
+    """
+    Hash of the source of `root` and every project module reachable from its
+    globals (imported modules, functions and classes), transitively.
+    """
+    seen, todo = set(), [root]
+    while todo:
+        name = todo.pop()
+        mod = sys.modules.get(name)
+        if name in seen or mod is None:
+            continue
+        seen.add(name)
+        for v in list(vars(mod).values()):
+            dep = _local_module(v)
+            if dep and dep not in seen:
+                todo.append(dep)
+    h = hashlib.sha256()
+    for name in sorted(seen):
+        try:
+            src = inspect.getsource(sys.modules[name])
+        except (OSError, TypeError):
+            src = ""
+        h.update(name.encode("utf-8"))
+        h.update(hashlib.sha256(src.encode("utf-8")).digest())
+    return h.hexdigest()
+
+
+def code_version(fn: Callable) -> str:
+    """Hash of the step function, the project code it can reach, and the deployed CODE_VERSION."""
+    try:
+        src = inspect.getsource(fn)
+    except (OSError, TypeError):
+        src = getattr(fn, "__qualname__", repr(fn))
+    module = getattr(fn, "__module__", None)
+    deps = module_closure_hash(module) if module else ""
+    return _sha256({"src": src, "deps": deps, "code_version": CODE_VERSION})
+
+
+# ---------- artifact I/O ----------
+
+def _artifact_key(step: str, key: str) -> str:
+    return f"{CACHE_PREFIX}/{step}/{key}.pkl"
+
+
+def _load(key: str) -> Any:
+    doc = step_cache.find_one({"key": key})
+    if not doc:
+        raise KeyError(key)
+    return pickle.load(io.BytesIO(get_bytes_processed(doc["artifact"])))
+
+
+def _store(step: str, key: str, inputs: Dict[str, Any], value: Any) -> None:
+    artifact = _artifact_key(step, key)
+    put_processed(artifact, pickle.dumps(value), content_type="application/octet-stream")
+    step_cache.update_one(
+        {"key": key},
+        {"$set": {
+            "key": key,
+            "step": step,
+            "inputs": inputs,
+            "artifact": artifact,
+            "code_version": CODE_VERSION,
+            "created_at": datetime.now(timezone.utc),
+        }},
+        upsert=True,
+    )
+
+
+# ---------- main entry ----------
+
+def run_step(step: str, fn: Callable, inputs: Dict[str, Any], *args, force: bool = False, **params) -> StepResult:
+    """
+    Run fn(*args, **params) unless an artifact for the same (code, inputs, params) exists.
+
+    `inputs` are fingerprints (strings) of everything the step reads: data
+    fingerprints for positional data args (DataFrames are never hashed from args)
+    and collections, or the keys of upstream steps, so a change anywhere upstream
+    invalidates everything downstream. Keyword params must be JSON-able.
+
+    Cache errors (storage down, stale manifest) never fail the pipeline: a failed
+    load is a miss and a failed store just means the next run recomputes.
+    """
+    key = _sha256({"step": step, "code": code_version(fn), "inputs": inputs, "params": params})
+    report_progress(message=step)
+
+    if CACHE_ENABLED and not force:
+        try:
+            return StepResult(_load(key), key, True)
+        except Exception:
+            pass
+
+    value = fn(*args, **params)
+
+    if CACHE_ENABLED:
+        try:
+            _store(step, key, inputs, value)
+        except Exception:
+            pass
+    return StepResult(value, key, False)
@@ -2,17 +2,18 @@ import os
 import json
 import mlflow
 
-DEPLOYED_PATH = "/app/.registry/deployed.json"
+REGISTRY_DIR = "/app/.registry"
+DEPLOYED_PATH = os.path.join(REGISTRY_DIR, "deployed.json")
 
-def load_latest_or_production(model_name: str = None):
+def load_latest_or_production(model_name: str = None, manifest_path: str = DEPLOYED_PATH):
     """
     Unified loader:
-    - If deployed.json exists, load that exact run
+    - If the manifest (default deployed.json) exists, load that exact run
     - Else fallback to MLflow Registry Production stage
     """
     # 1 Manifest mode (your primary flow)
-    if os.path.exists(DEPLOYED_PATH):
-        with open(DEPLOYED_PATH) as f:
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
             manifest = json.load(f)
 
         
@@ -30,11 +31,16 @@ def load_latest_or_production(model_name: str = None):
     if not model_name:
         raise ValueError("model_name required when no manifest exists.")
     
-    uri = f"models:/{model_name}/Production"
+    # pin the concrete version so callers can tell deployments apart
+    vers = mlflow.tracking.MlflowClient().get_latest_versions(model_name, stages=["Production"])
+    if not vers:
+        raise RuntimeError(f"No Production version for {model_name}")
+    v = max(vers, key=lambda mv: int(mv.version))
+    uri = f"models:/{model_name}/{v.version}"
     model = mlflow.pyfunc.load_model(uri)
 
     return model, {
-        "run_id": "registry",
+        "run_id": v.run_id,
         "model_uri": uri,
-        "model_version": "Production"
+        "model_version": v.version
     }
\ No newline at end of file
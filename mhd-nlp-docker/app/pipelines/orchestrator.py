@@ -1,10 +1,11 @@
 # app/pipelines/orchestrator.py
 import os, uuid
+from datetime import datetime, timezone
 import pandas as pd, numpy as np
 import mlflow
 
 from .steps.deid import deidentify
-from .steps.quality import basic_schema_check, session_schema_check
+from .steps.quality import basic_schema_check, session_schema_check, log_quality_report
 from .steps.deploy import promote, promote_to_registry
 from .steps.validate import validate_metrics
 from .steps.train import train_basic
@@ -12,33 +13,41 @@ from .steps.train import train_basic
 from app.features.session_v1 import build_session_dataset
 from app.features.injury_risk import build_injury_risk_features
 from app.labeling.injury_risk import build_injury_labels
-from app.pipelines.steps.train_injury import train_injury
-from app.pipelines.steps.train_session import train_session
+from app.jobs.sharded import FEATURE_SHARDS, build_features_sharded, build_labels_sharded
+from app.pipelines.steps.train_injury import train_injury, MODEL_NAME as INJURY_MODEL_NAME
+from app.pipelines.steps.train_session import train_session, MODEL_NAME as SESSION_MODEL_NAME
+from app.pipelines.cache import run_step, fingerprint_df, fingerprint_collection
 
 mlflow.set_tracking_uri(os.getenv("MLFLOW_TRACKING_URI", "http://mlflow:5000"))
 PROMOTE_AUC = float(os.getenv("PROMOTE_MIN_AUC", "0.75"))
+PROMOTE_SPEARMAN = float(os.getenv("PROMOTE_MIN_SPEARMAN", "0.3"))
+# fixed seed so the synthetic dataset is stable between runs (and cacheable)
+SYNTHETIC_SEED = int(os.getenv("SYNTHETIC_SEED", "42"))
 
 
 
 
 
-def run_training_job() -> str:
+def run_training_job(force: bool = False) -> str:
     job_id = str(uuid.uuid4())
+    rng = np.random.default_rng(SYNTHETIC_SEED)
     X = pd.DataFrame({
-        "age": np.random.randint(18, 80, 500),
-        "bp":  np.random.normal(120, 15, 500),
-        "hr":  np.random.normal(72, 10, 500),
+        "age": rng.integers(18, 80, 500),
+        "bp":  rng.normal(120, 15, 500),
+        "hr":  rng.normal(72, 10, 500),
     })
     y = ((X["age"] > 50) & (X["bp"] > 130)).astype(int)
     df = X.copy()
     df["target"] = y
 
-    df = deidentify(df)
-    checks = basic_schema_check(df)
+    deid = run_step("deidentify", deidentify, {"raw": fingerprint_df(df)}, df, force=force)
+    df = deid.value
+    checks = run_step("basic_schema_check", basic_schema_check, {"deid": deid.key}, df, force=force).value
     if not checks["ok"]:
         with mlflow.start_run(run_name="dq_failed"):
             mlflow.log_param("dq_failed", "true")
             mlflow.log_text("\n".join(checks["issues"]), "dq_issues.txt")
+            log_quality_report(checks["report"])
         raise ValueError(f"Data quality failed: {checks['issues']}")
     
     # -- clean categorical values ==
@@ -59,24 +68,60 @@ def run_training_job() -> str:
     df = df.dropna()
 
 
-    metrics = train_basic(df)
-    if validate_metrics(metrics) and float(metrics.get("val_auc", 0.0)) >= PROMOTE_AUC:
+    trained = run_step("train_basic", train_basic, {"clean": fingerprint_df(df)}, df, force=force)
+    metrics = trained.value
+    if not trained.hit:
+        # attach the report to the training run it describes (cache hits already have it)
+        with mlflow.start_run(run_id=metrics["run_id"]):
+            log_quality_report(checks["report"])
+    # a cache hit is a run that was already validated/registered the first time round
+    if not trained.hit and validate_metrics(metrics) and float(metrics.get("val_auc", 0.0)) >= PROMOTE_AUC:
         promote_to_registry(metrics["run_id"], stage="Production")
     promote({"metrics": metrics, "run_id": metrics["run_id"], "model_uri": metrics["model_uri"]})
     return job_id
 
-def run_injury_risk_training():
+def run_injury_risk_training(force: bool = False):
     v = "risk_v1"
-    n = build_injury_risk_features(version=v)
-    l = build_injury_labels(horizon_days=14)
-    metrics = train_injury(version=v, horizon_days=14)
+    horizon = 14
+    as_of = datetime.now(timezone.utc).date().isoformat()
 
-    if validate_metrics(metrics) and metrics["val_auc"] >= PROMOTE_AUC:
-        promote_to_registry(metrics["run_id"], stage="Production")
-    promote({"metrics": metrics, "run_id": metrics["run_id"], "model_uri": metrics["model_uri"]})
-    return {"features_built": n, "labels_built": l, **metrics}
+    raw = {
+        "sessions": fingerprint_collection("sessions"),
+        "vitals": fingerprint_collection("vitals"),
+        "injuries": fingerprint_collection("injuries", ts_field="onset_date"),
+    }
+    # FEATURE_SHARDS > 0 fans the builds out over RQ workers (app.jobs.sharded)
+    build_feats = build_features_sharded if FEATURE_SHARDS > 0 else build_injury_risk_features
+    build_labels = build_labels_sharded if FEATURE_SHARDS > 0 else build_injury_labels
+    # feature windows are relative to "now", so the build date is part of the input
+    feats = run_step("build_injury_risk_features", build_feats,
+                     {**raw, "as_of": as_of}, force=force, version=v)
+    labels = run_step("build_injury_labels", build_labels,
+                      {"features": feats.key, "injuries": raw["injuries"]}, force=force, horizon_days=horizon)
+    trained = run_step("train_injury", train_injury,
+                       {"features": feats.key, "labels": labels.key}, force=force, version=v, horizon_days=horizon)
+    metrics = trained.value
 
-def run_session_quality_training():
-    metrics = train_session(version="session_v1")
-    promote({"metrics": metrics, "run_id": metrics["run_id"], "model_uri": metrics["model_uri"]})
+    if not trained.hit and validate_metrics(metrics) and metrics["val_auc"] >= PROMOTE_AUC:
+        promote_to_registry(metrics["run_id"], stage="Production", model_name=INJURY_MODEL_NAME)
+    promote({"metrics": metrics, "run_id": metrics["run_id"], "model_uri": metrics["model_uri"]},
+            use_case="injury_risk")
+    return {
+        "features_built": feats.value,
+        "labels_built": labels.value,
+        "cache": {"features": feats.hit, "labels": labels.hit, "train": trained.hit},
+        **metrics,
+    }
+
+def run_session_quality_training(force: bool = False):
+    v = "session_v1"
+    trained = run_step("train_session", train_session, {
+        "features": fingerprint_collection("features", {"version": v}),
+        "sessions": fingerprint_collection("sessions"),
+    }, force=force, version=v)
+    metrics = trained.value
+    if not trained.hit and metrics.get("val_spearman", 0.0) >= PROMOTE_SPEARMAN:
+        promote_to_registry(metrics["run_id"], stage="Production", model_name=SESSION_MODEL_NAME)
+    promote({"metrics": metrics, "run_id": metrics["run_id"], "model_uri": metrics["model_uri"]},
+            use_case="session_quality")
     return metrics
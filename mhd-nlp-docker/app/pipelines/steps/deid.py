@@ -1,25 +1,96 @@
-import pandas as pd
+import os
+import hmac
 import hashlib
+from typing import IO, Iterable, Iterator, Optional
+
+import numpy as np
+import pandas as pd
 
 
 PII_COLUMNS = {"name", "email", "phone", "address", "ssn"}
+# identifiers we keep joinable but pseudonymize with a keyed hash
+PSEUDONYM_COLUMNS = {"athlete_id", "patient_id", "mrn"}
+
+AGE_BINS = [0, 18, 30, 45, 60, 120]
+AGE_LABELS = ["<18", "18-29", "30-44", "45-59", "60+"]
+
+# HMAC key: without it a sha256 of a low-entropy id (jersey no., mrn) is trivially
+# reversible. Dedicated and required: pseudonyms must survive SECRET_KEY rotation.
+DEID_SALT = os.getenv("DEID_SALT", "")
+DEID_CHUNK_ROWS = int(os.getenv("DEID_CHUNK_ROWS", "50000"))
+
+
+def _key(salt: Optional[str]) -> bytes:
+    key = DEID_SALT if salt is None else salt
+    if not key:
+        raise RuntimeError("DEID_SALT is not set; refusing to pseudonymize with an empty key")
+    return key.encode("utf-8")
+
+
+def hash_value(v: str, salt: Optional[str] = None) -> str:
+    return hmac.new(_key(salt), str(v).encode("utf-8"), hashlib.sha256).hexdigest()
+
 
-def hash_value(v: str) -> str:
-    return hashlib.sha256(str(v).encode("utf-8")).hexdigest()
+def hash_column(s: pd.Series, salt: Optional[str] = None) -> pd.Series:
+    """
+    Keyed-hash a whole column. Values are factorized first, so HMAC runs once per
+    distinct value (ids repeat on every session row) and the result is scattered
+    back with a single NumPy take. Nulls stay null.
+    """
+    key = _key(salt)
+    codes, uniques = pd.factorize(s, use_na_sentinel=True)
+    digests = np.array([hmac.new(key, str(u).encode("utf-8"), hashlib.sha256).hexdigest() for u in uniques]
+                       + [None], dtype=object)
+    # code -1 (null) indexes the trailing None
+    return pd.Series(digests[codes], index=s.index, name=s.name)
+
+
+def deidentify(
+    df: pd.DataFrame,
+    hash_columns: Optional[Iterable[str]] = None,
+    inplace: bool = False,
+    salt: Optional[str] = None,
+) -> pd.DataFrame:
+    """
+    Drop direct identifiers, pseudonymize id columns and coarsen zip/age.
+
+    Only columns are added or removed, never values written into existing
+    blocks, so the non-inplace path uses a shallow copy instead of
+    duplicating the whole frame.
+    """
+    if not inplace:
+        df = df.copy(deep=False)
 
-def deidentify(df: pd.DataFrame) -> pd.DataFrame:
-    df = df.copy()
     #drop direct identifiers
     for c in PII_COLUMNS & set(df.columns):
-        df.drop(columns=[c], inplace=True)
+        del df[c]
+
+    cols = PSEUDONYM_COLUMNS if hash_columns is None else set(hash_columns)
+    for c in cols & set(df.columns):
+        df[c] = hash_column(df[c], salt)
 
     #example: coarse=grain location/age if present
     if "zip" in df.columns:
         df["zip3"] = df["zip"].astype(str).str[:3]
-        df.drop(columns=["zip"], inplace=True)
-    
+        del df["zip"]
+
     if "age" in df.columns:
-        df["age_band"] = pd.cut(df["age"], bins=[0,18,30,45,60,120], labels=["<18","18-29","30-44","45-59","60+"])
+        df["age_band"] = pd.cut(df["age"], bins=AGE_BINS, labels=AGE_LABELS)
         # keep raw age only if necessary; else drop
         # df.drop(columns=["age"], inplace=True)
     return df
+
+
+def deidentify_chunks(chunks: Iterable[pd.DataFrame], **kwargs) -> Iterator[pd.DataFrame]:
+    """De-identify an iterator of frames lazily (each chunk is modified in place)."""
+    kwargs.setdefault("inplace", True)
+    for chunk in chunks:
+        yield deidentify(chunk, **kwargs)
+
+
+def deidentify_csv(fp: IO, chunksize: int = DEID_CHUNK_ROWS, **kwargs) -> Iterator[pd.DataFrame]:
+    """
+    Stream a CSV (path or file-like, e.g. a storage download stream) through
+    deidentify without materializing the whole file.
+    """
+    return deidentify_chunks(pd.read_csv(fp, chunksize=chunksize), **kwargs)
@@ -8,29 +8,37 @@ os.makedirs(REGISTRY_DIR, exist_ok=True)
 
 MODEL_NAME = os.getenv("MODEL_NAME", "mhd_logreg")
 
-def promote_to_registry(run_id: str, stage: str = "Production", archive_existing: bool = True):
+def promote_to_registry(run_id: str, stage: str = "Production", archive_existing: bool = True,
+                        model_name: str = None):
     """
-    Register the run's 'model' artifact and transition it to the given stage.
+    Transition the run's 'model' artifact to the given stage under model_name
+    (default MODEL_NAME), registering it first unless training already did.
     """
+    name = model_name or MODEL_NAME
     client = mlflow.tracking.MlflowClient()
     model_uri = f"runs:/{run_id}/model"
 
     # Ensure the registered model exists (idempotent)
     try:
-        client.get_registered_model(MODEL_NAME)
+        client.get_registered_model(name)
     except Exception:
-        client.create_registered_model(MODEL_NAME)
+        client.create_registered_model(name)
 
-    mv = client.create_model_version(name=MODEL_NAME, source=model_uri, run_id=run_id)
+    # log_model(registered_model_name=...) may have created the version already
+    existing = client.search_model_versions(f"name='{name}' and run_id='{run_id}'")
+    mv = existing[0] if existing else client.create_model_version(name=name, source=model_uri, run_id=run_id)
     client.transition_model_version_stage(
-        name=MODEL_NAME,
+        name=name,
         version=mv.version,
         stage=stage,
         archive_existing_versions=archive_existing,
     )
-    return {"name": MODEL_NAME, "version": mv.version, "stage": stage}
+    return {"name": name, "version": mv.version, "stage": stage}
 
-def promote(run_info: dict):
-    with open(os.path.join(REGISTRY_DIR, "deployed.json"), "w") as f:
-        json.dump(run_info, f)
+def promote(run_info: dict, use_case: str = None):
+    """Write the manifest: deployed.json, plus deployed_<use_case>.json for the serving pool."""
+    names = ["deployed.json"] + ([f"deployed_{use_case}.json"] if use_case else [])
+    for n in names:
+        with open(os.path.join(REGISTRY_DIR, n), "w") as f:
+            json.dump(run_info, f)
     return True
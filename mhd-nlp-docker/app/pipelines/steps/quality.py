@@ -1,43 +1,118 @@
+import json
+import numpy as np
 import pandas as pd
-from pydantic import BaseModel, Field, ValidationError
-from typing import List, Dict, Any
+import mlflow
+from pydantic import BaseModel
+from typing import List, Dict, Any, Optional
 
-REQUIRED = ["age", "bp", "hr", "target"]
+SAMPLE_ROWS = 5
+
+# ---------- declarative column constraints ----------
+
+class ColumnRule(BaseModel):
+    """
+    One column's constraints, same vocabulary as pydantic's Field(ge=, le=).
+    Evaluated as whole-column NumPy masks by validate_frame, never per row.
+    """
+    column: str
+    required: bool = True
+    nullable: bool = True
+    ge: Optional[float] = None
+    le: Optional[float] = None
+    allowed: Optional[List[Any]] = None
+
+
+def _violation(rule: str, column: str, mask: np.ndarray, df: pd.DataFrame, sample_rows: int) -> Dict[str, Any]:
+    idx = np.flatnonzero(mask)
+    return {
+        "rule": rule,
+        "column": column,
+        "violations": int(idx.size),
+        "sample": df.iloc[idx[:sample_rows]].to_dict(orient="records"),
+    }
+
+
+def validate_frame(df: pd.DataFrame, rules: List[ColumnRule], sample_rows: int = SAMPLE_ROWS) -> Dict[str, Any]:
+    """
+    Check every row of df against rules. Returns
+        {"ok", "issues": [str], "results": [{rule, column, violations, sample}], "n_rows"}
+    where results only lists rules with at least one violation.
+    """
+    results: List[Dict[str, Any]] = []
+    for r in rules:
+        if r.column not in df.columns:
+            if r.required:
+                results.append({"rule": "required", "column": r.column, "violations": len(df), "sample": []})
+            continue
+
+        col = df[r.column]
+        null = col.isna().to_numpy()
+        if not r.nullable and null.any():
+            results.append(_violation("not_null", r.column, null, df, sample_rows))
+
+        if r.ge is not None or r.le is not None:
+            vals = pd.to_numeric(col, errors="coerce").to_numpy(dtype="float64")
+            bad = np.zeros(len(vals), dtype=bool)
+            # non-numeric values coerce to NaN: flag them unless they were null already
+            bad |= np.isnan(vals) & ~null
+            with np.errstate(invalid="ignore"):
+                if r.ge is not None:
+                    bad |= vals < r.ge
+                if r.le is not None:
+                    bad |= vals > r.le
+            if bad.any():
+                results.append(_violation("range", r.column, bad, df, sample_rows))
+
+        if r.allowed is not None:
+            bad = ~col.isin(r.allowed).to_numpy() & ~null
+            if bad.any():
+                results.append(_violation("allowed", r.column, bad, df, sample_rows))
+
+    issues = [f"{v['column']}: {v['violations']} rows fail {v['rule']}" for v in results]
+    return {"ok": not results, "issues": issues, "results": results, "n_rows": int(len(df))}
+
+
+def log_quality_report(report: Dict[str, Any], name: str = "dq") -> None:
+    """Log violation counts (and the full report) to the active MLflow run; no-op without one."""
+    if not mlflow.active_run():
+        return
+    mlflow.log_metric(f"{name}_rows", report["n_rows"])
+    mlflow.log_metric(f"{name}_failed_rules", len(report["results"]))
+    for v in report["results"]:
+        mlflow.log_metric(f"{name}_{v['column']}_{v['rule']}", v["violations"])
+    # samples can hold Timestamps/ObjectIds; stringify for the JSON artifact
+    mlflow.log_dict(json.loads(json.dumps(report, default=str)), f"{name}_report.json")
+
+
+# ---------- dataset checks ----------
+
+BASIC_RULES = [
+    ColumnRule(column="age", ge=0, le=120),
+    ColumnRule(column="bp"),
+    ColumnRule(column="hr"),
+    ColumnRule(column="target", allowed=[0, 1]),
+]
 
 def basic_schema_check(df: pd.DataFrame) -> dict:
-    ok, issues = True, []
-    for c in REQUIRED:
-        if c not in df.columns:
-            ok = False; issues.append(f"missing column: {c}")
-    if "age" in df and ((df["age"] < 0) | (df["age"] > 120)).any():
-        ok = False; issues.append("age out of plausible bounds")
-    return {"ok": ok, "issues": issues}
-
-class SessionRow(BaseModel):
-    sets: float = Field(ge=0)
-    reps: float = Field(ge=0)
-    rpe:  float = Field(ge=0, le=10)
-    completed_pct: float = Field(ge=0, le=100)
-    volume: float = Field(ge=0)
-    density: float = Field(ge=0)
-    intensity: float = Field(ge=0, le=10)
-    nlp_fatigue: float = Field(ge=0)
-    nlp_pain_any: float = Field(ge=0)
-    nlp_sleep_poor: float = Field(ge=0)
-    nlp_mood_neg: float = Field(ge=0)
-    nlp_compliance_issues: float = Field(ge=0)
+    report = validate_frame(df, BASIC_RULES)
+    return {"ok": report["ok"], "issues": report["issues"], "report": report}
+
+# whole-frame bounds for session rows
+SESSION_RULES = [
+    ColumnRule(column="sets", nullable=False, ge=0),
+    ColumnRule(column="reps", nullable=False, ge=0),
+    ColumnRule(column="rpe", nullable=False, ge=0, le=10),
+    ColumnRule(column="completed_pct", nullable=False, ge=0, le=100),
+    ColumnRule(column="volume", nullable=False, ge=0),
+    ColumnRule(column="density", nullable=False, ge=0),
+    ColumnRule(column="intensity", nullable=False, ge=0, le=10),
+    ColumnRule(column="nlp_fatigue", nullable=False, ge=0),
+    ColumnRule(column="nlp_pain_any", nullable=False, ge=0),
+    ColumnRule(column="nlp_sleep_poor", nullable=False, ge=0),
+    ColumnRule(column="nlp_mood_neg", nullable=False, ge=0),
+    ColumnRule(column="nlp_compliance_issues", nullable=False, ge=0),
+]
 
 def session_schema_check(df) -> Dict[str, Any]:
-    issues: List[str] = []
-    sample = df[[
-        "sets","reps","rpe","completed_pct","volume","density","intensity",
-        "nlp_fatigue","nlp_pain_any","nlp_sleep_poor","nlp_mood_neg","nlp_compliance_issiues"
-    ]].head(100).to_dict(orient="records")
-    for i, row in enumerate(sample):
-        try:
-            SessionRow(**row)
-        except ValidationError as e:
-            issues.append(f"row {i}: {e.errors()!r}")
-            if len(issues) > 10:
-                break
-    return {"ok": not issues, "issues": issues}
\ No newline at end of file
+    report = validate_frame(df, SESSION_RULES)
+    return {"ok": report["ok"], "issues": report["issues"], "report": report}
@@ -39,7 +39,8 @@ def train_injury(version="risk_v1", horizon_days=14):
         mlflow.log_metric("val_pr_auc", pr)
 
         # log the model artifact under folder "model"
-        mlflow.sklearn.log_model(model, artifact_path="model", registered_model_name=os.getenv("MODEL_NAME","mhd_logreg"))
+        mlflow.sklearn.log_model(model, artifact_path="model", registered_model_name=MODEL_NAME)
 
         run_id = mlflow.active_run().info.run_id
-        return {"run_id": run_id, "val_auc": float(auc), "val_pr_auc": float(pr), "model_uri": f"runs:/{run_id}/model"}
+        return {"run_id": run_id, "val_auc": float(auc), "val_pr_auc": float(pr), "model_uri": f"runs:/{run_id}/model",
+                "model_name": MODEL_NAME}
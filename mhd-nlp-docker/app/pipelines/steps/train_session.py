@@ -43,6 +43,7 @@ def train_session(version="session_v1"):
         mlflow.sklearn.log_model(model, artifact_path="model", registered_model_name=MODEL_NAME)
 
         run_id = mlflow.active_run().info.run_id
-        return {"run_id": run_id, "val_mae": float(mae), "val_spearman": sp, "model_uri": f"runs:/{run_id}/model"}
+        return {"run_id": run_id, "val_mae": float(mae), "val_spearman": sp, "model_uri": f"runs:/{run_id}/model",
+                "model_name": MODEL_NAME}
 
 
@@ -6,10 +6,12 @@ from datetime import datetime, timezone
 from authlib.integrations.starlette_client import OAuth
 from starlette.config import Config
 import os, uuid
+import asyncio
 
 from app.db import users, db
 from app.auth import (
-    authenticate_user,
+    authenticate_user_async,
+    LoginBusy,
     get_password_hash,
     create_access_token,
     create_refresh_token,
@@ -18,6 +20,7 @@ from app.auth import (
     REFRESH_TOKEN_COOKIE,
 )
 from app.utils.logger import log_activity
+from app.services.auth_cache import user_cache
 
 router = APIRouter(prefix="/auth", tags=["auth"])
 
@@ -59,17 +62,21 @@ def signup(username: str = Form(...), password: str = Form(...), email: str = Fo
 
 # ---------- Username/Password Login ----------
 @router.post("/token")
-def login(form_data: OAuth2PasswordRequestForm = Depends()):
-    # authenticate_user is sync
-    user = authenticate_user(form_data.username, form_data.password)
+async def login(form_data: OAuth2PasswordRequestForm = Depends()):
+    # Motor lookup + bcrypt off the event loop, concurrency-limited
+    try:
+        user = await authenticate_user_async(form_data.username, form_data.password)
+    except LoginBusy:
+        raise HTTPException(status_code=503, detail="Too many login attempts, retry shortly",
+                            headers={"Retry-After": "1"})
     if not user:
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
     sub = str(user["_id"])
     access_token = create_access_token(sub)
-    refresh_token = create_refresh_token(sub)
-
-    log_activity(user_id=user["username"], action="login_password", metadata={})
+    # these two still write through the sync client
+    refresh_token = await asyncio.to_thread(create_refresh_token, sub)
+    await asyncio.to_thread(log_activity, user_id=user["username"], action="login_password", metadata={})
 
     resp = JSONResponse({
         "access_token": access_token,
@@ -183,6 +190,7 @@ def reset_password(token: str = Form(...), new_password: str = Form(...)):
         {"email": reset["email"]},
         {"$set": {"password": get_password_hash(new_password)}},
     )
+    user_cache.invalidate(email=reset["email"])
     db["password_resets"].delete_one({"_id": reset["_id"]})
 
     return {"message": "Password updated successfully"}
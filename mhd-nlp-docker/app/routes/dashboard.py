@@ -1,5 +1,4 @@
 from datetime import datetime, timezone
-import pandas as pd
 
 from fastapi import APIRouter, Request, Depends
 from fastapi.responses import HTMLResponse, RedirectResponse
@@ -8,36 +7,18 @@ from fastapi.templating import Jinja2Templates
 from app.auth import get_current_user
 from app.authz import require_role
 from app.db import db
+from app.services.risk_latest import top_risk as latest_top_risk
+from app.services.dashboard_cache import dashboard_cache, user_key, org_key
+from app.services import dashboard_data
 
 from collections import defaultdict
 
 router = APIRouter(prefix="/dashboard", tags=["dashboard"])
 templates = Jinja2Templates(directory="app/templates")
 
-# ---- Core MHD collections ----
-uploads_col = db.uploads
-medical_history_col = db.medical_history
-equipment_col = db.equipment
-training_col = db.training
-weightroom_col = db.weightroom
-activity_logs_col = db.activity_logs
-
-risk = db["risk_predictions"]
+# page data is read through app/services/dashboard_data.py (async, concurrent)
 metrics_coll = db["model_daily_metrics"]
 
-# ---- Industry collections ----
-oil_incidents = db["oil_gas_incidents"]
-oil_permits = db["oil_gas_permits"]
-oil_trainings = db["oil_gas_trainings"]
-
-fin_clients = db["financial_clients"]
-fin_alerts = db["financial_alerts"]
-fin_kyc = db["financial_kyc"]
-
-law_matters = db["law_matters"]
-law_deadlines = db["law_deadlines"]
-law_signatures = db["law_signatures"]
-
 
 # ================= TRAINER JSON / LEGACY VIEW =====================
 
@@ -65,14 +46,7 @@ async def trainer_dashboard_legacy(request: Request, user=Depends(get_current_us
     dependencies=[Depends(require_role("trainer"))],
 )
 async def top_risk(limit: int = 20):
-    rows = list(risk.find().sort("ts", -1).limit(2000))
-    if not rows:
-        return []
-
-    df = pd.DataFrame(rows)
-    latest = df.sort_values(["athlete_id", "ts"]).groupby("athlete_id").tail(1)
-    top = latest.sort_values("score", ascending=False).head(limit)
-
+    # latest prediction per athlete is maintained on write in athlete_risk_latest
     return [
         {
             "athlete_id": str(r["athlete_id"]),
@@ -80,7 +54,7 @@ async def top_risk(limit: int = 20):
             "run_id": r.get("run_id"),
             "model_version": r.get("model_version"),
         }
-        for _, r in top.iterrows()
+        for r in latest_top_risk(limit)
     ]
 
 
@@ -146,7 +120,7 @@ def format_label(value: str) -> str:
 # ================= MAIN /dashboard DISPATCHER =====================
 
 @router.get("/", response_class=HTMLResponse)
-def dashboard(request: Request, current_user: dict = Depends(get_current_user)):
+async def dashboard(request: Request, current_user: dict = Depends(get_current_user)):
     """
     Entry point for all dashboards.
 
@@ -168,23 +142,28 @@ def dashboard(request: Request, current_user: dict = Depends(get_current_user)):
 
     # 2) Oil & Gas org view
     if vertical == "oil_gas":
-        return _render_oil_gas_dashboard(request, current_user, org_id)
+        return await _render_oil_gas_dashboard(request, current_user, org_id)
 
     # 3) Financial org view
     if vertical == "financial":
-        return _render_financial_dashboard(request, current_user, org_id)
+        return await _render_financial_dashboard(request, current_user, org_id)
 
     # 4) Law org view
     if vertical == "law":
-        return _render_law_dashboard(request, current_user, org_id)
+        return await _render_law_dashboard(request, current_user, org_id)
 
     # 5) Default: athlete / health_sports view (existing logic)
-    docs = list(
-        uploads_col.find({"username": username})
-        .sort("upload_date", -1)
-        .limit(10)
+    ctx = await dashboard_cache.aget_or_build(user_key(username), lambda: _athlete_context(username))
+    return templates.TemplateResponse(
+        "dashboard.html",
+        {"request": request, "user": current_user, **ctx},
     )
-    doc_count = uploads_col.count_documents({"username": username})
+
+
+async def _athlete_context(username: str) -> dict:
+    data = await dashboard_data.fetch_athlete(username)
+    docs = data["recent_docs"]
+    doc_count = data["doc_count"]
 
     grouped_docs = {"medical": [], "performance": [], "equipment": []}
     for d in docs:
@@ -193,9 +172,9 @@ def dashboard(request: Request, current_user: dict = Depends(get_current_user)):
             if k in grouped_docs:
                 grouped_docs[k].append(d)
 
-    medical = medical_history_col.find_one({"username": username}) or {}
+    medical = data["medical"]
 
-    user_equipment = equipment_col.find_one({"username": username}) or {}
+    user_equipment = data["equipment"]
     if not isinstance(user_equipment.get("items"), list):
         user_equipment["items"] = []
     for it in user_equipment["items"]:
@@ -203,47 +182,42 @@ def dashboard(request: Request, current_user: dict = Depends(get_current_user)):
             if key in it:
                 it[key] = format_label(it[key])
 
-    training_logs = list(
-        training_col.find({"username": username}).sort("_id", -1).limit(5)
-    )
-    training_count = training_col.count_documents({"username": username})
+    training_logs = data["training_logs"]
+    training_count = data["training_count"]
 
-    weightroom_stats = weightroom_col.find_one({"username": username}) or {}
+    weightroom_stats = data["weightroom"]
 
-    activity = list(
-        activity_logs_col.find({"user_id": username})
-        .sort("_id", -1)
-        .limit(5)
-    )
+    activity = data["activity"]
     for log in activity:
         log["friendly_time"] = humanize_time(log.get("timestamp"))
 
-    return templates.TemplateResponse(
-        "dashboard.html",
-        {
-            "request": request,
-            "user": current_user,
-            "doc_count": doc_count,
-            "recent_docs": docs,
-            "grouped_docs": grouped_docs,
-            "medical": medical,
-            "equipment": user_equipment,
-            "training_logs": training_logs,
-            "training_count": training_count,
-            "weightroom": weightroom_stats,
-            "activity": activity,
-        },
-    )
+    return {
+        "doc_count": doc_count,
+        "recent_docs": docs,
+        "grouped_docs": grouped_docs,
+        "medical": medical,
+        "equipment": user_equipment,
+        "training_logs": training_logs,
+        "training_count": training_count,
+        "weightroom": weightroom_stats,
+        "activity": activity,
+    }
 
 
 # ================= OIL & GAS DASHBOARD RENDERER ===================
 
-def _render_oil_gas_dashboard(request: Request, user: dict, org_id: str | None):
-    org_filter = {"org_id": org_id} if org_id else {}
-
-    inc_docs = list(
-        oil_incidents.find({"demo": True, **org_filter}).sort("ts", -1).limit(50)
+async def _render_oil_gas_dashboard(request: Request, user: dict, org_id: str | None):
+    ctx = await dashboard_cache.aget_or_build(org_key(org_id), lambda: _oil_gas_context(org_id))
+    return templates.TemplateResponse(
+        "dashboard_oil_gas.html",
+        {"request": request, "user": user, **ctx},
     )
+
+
+async def _oil_gas_context(org_id: str | None) -> dict:
+    data = await dashboard_data.fetch_oil_gas(org_id)
+
+    inc_docs = data["incidents"]
     incidents_total = len(inc_docs)
     incidents_high = sum(1 for d in inc_docs if d.get("severity") == "high")
     incidents_open = sum(
@@ -251,9 +225,7 @@ def _render_oil_gas_dashboard(request: Request, user: dict, org_id: str | None):
     )
 
     now = datetime.now(timezone.utc)
-    permits_docs = list(
-        oil_permits.find({"demo": True, **org_filter}).limit(50)
-    )
+    permits_docs = data["permits"]
     permits_30d = 0
     permits_60d = 0
     permits_upcoming = []
@@ -271,9 +243,7 @@ def _render_oil_gas_dashboard(request: Request, user: dict, org_id: str | None):
         if days >= 0:
             permits_upcoming.append(p)
 
-    trainings_docs = list(
-        oil_trainings.find({"demo": True, **org_filter}).limit(100)
-    )
+    trainings_docs = data["trainings"]
     trainings_on_time = sum(1 for t in trainings_docs if t.get("status") == "on_time")
     trainings_overdue = sum(1 for t in trainings_docs if t.get("status") == "overdue")
 
@@ -281,39 +251,40 @@ def _render_oil_gas_dashboard(request: Request, user: dict, org_id: str | None):
     risk_direction = "Stable"
     risk_delta = 0.0
 
-    return templates.TemplateResponse(
-        "dashboard_oil_gas.html",
-        {
-            "request": request,
-            "user": user,
-            "incidents_total": incidents_total,
-            "incidents_high": incidents_high,
-            "incidents_open": incidents_open,
-            "permits_30d": permits_30d,
-            "permits_60d": permits_60d,
-            "trainings_on_time": trainings_on_time,
-            "trainings_overdue": trainings_overdue,
-            "risk_direction": risk_direction,
-            "risk_delta": risk_delta,
-            "recent_incidents": inc_docs[:10],
-            "permits_upcoming": permits_upcoming[:10],
-            "training_status": trainings_docs[:20],
-        },
-    )
+    return {
+        "incidents_total": incidents_total,
+        "incidents_high": incidents_high,
+        "incidents_open": incidents_open,
+        "permits_30d": permits_30d,
+        "permits_60d": permits_60d,
+        "trainings_on_time": trainings_on_time,
+        "trainings_overdue": trainings_overdue,
+        "risk_direction": risk_direction,
+        "risk_delta": risk_delta,
+        "recent_incidents": inc_docs[:10],
+        "permits_upcoming": permits_upcoming[:10],
+        "training_status": trainings_docs[:20],
+    }
 
 
 # ================= FINANCIAL DASHBOARD RENDERER ===================
 
-def _render_financial_dashboard(request: Request, user: dict, org_id: str | None):
-    org_filter = {"org_id": org_id} if org_id else {}
+async def _render_financial_dashboard(request: Request, user: dict, org_id: str | None):
+    ctx = await dashboard_cache.aget_or_build(org_key(org_id), lambda: _financial_context(org_id))
+    return templates.TemplateResponse(
+        "dashboard_financial.html",
+        {"request": request, "user": user, **ctx},
+    )
+
 
-    clients = list(fin_clients.find({"demo": True, **org_filter}).limit(200))
+async def _financial_context(org_id: str | None) -> dict:
+    data = await dashboard_data.fetch_financial(org_id)
+
+    clients = data["clients"]
     clients_active = sum(1 for c in clients if c.get("status") == "active")
     clients_onboarding = sum(1 for c in clients if c.get("status") == "onboarding")
 
-    alerts = list(
-        fin_alerts.find({"demo": True, **org_filter}).sort("ts", -1).limit(100)
-    )
+    alerts = data["alerts"]
     accounts_high_risk = len(alerts)
     accounts_under_review = sum(1 for a in alerts if a.get("status") == "review")
 
@@ -334,7 +305,7 @@ def _render_financial_dashboard(request: Request, user: dict, org_id: str | None
         for day in sorted(alerts_by_day_map.keys())
     ]
 
-    kyc_docs = list(fin_kyc.find({"demo": True, **org_filter}).limit(100))
+    kyc_docs = data["kyc"]
     kyc_pending = sum(1 for k in kyc_docs if k.get("status") == "pending")
     kyc_overdue = sum(1 for k in kyc_docs if k.get("status") == "overdue")
 
@@ -345,37 +316,38 @@ def _render_financial_dashboard(request: Request, user: dict, org_id: str | None
     kyc_queue = kyc_docs
     recent_activity = []  # later: map from audit logs
 
-    return templates.TemplateResponse(
-        "dashboard_financial.html",
-        {
-            "request": request,
-            "user": user,
-            "clients_active": clients_active,
-            "clients_onboarding": clients_onboarding,
-            "kyc_pending": kyc_pending,
-            "kyc_overdue": kyc_overdue,
-            "accounts_high_risk": accounts_high_risk,
-            "accounts_under_review": accounts_under_review,
-            "alerts_direction": alerts_direction,
-            "alerts_delta": alerts_delta,
-            "high_risk_accounts": high_risk_accounts,
-            "kyc_queue": kyc_queue,
-            "recent_activity": recent_activity,
-            # chart series
-            "alerts_by_day": alerts_by_day,
-        },
-    )
+    return {
+        "clients_active": clients_active,
+        "clients_onboarding": clients_onboarding,
+        "kyc_pending": kyc_pending,
+        "kyc_overdue": kyc_overdue,
+        "accounts_high_risk": accounts_high_risk,
+        "accounts_under_review": accounts_under_review,
+        "alerts_direction": alerts_direction,
+        "alerts_delta": alerts_delta,
+        "high_risk_accounts": high_risk_accounts,
+        "kyc_queue": kyc_queue,
+        "recent_activity": recent_activity,
+        # chart series
+        "alerts_by_day": alerts_by_day,
+    }
 
 
 
 # ================= LAW / LEGAL DASHBOARD RENDERER =================
 
-def _render_law_dashboard(request: Request, user: dict, org_id: str | None):
-    org_filter = {"org_id": org_id} if org_id else {}
-
-    matters = list(
-        law_matters.find({"demo": True, **org_filter}).limit(200)
+async def _render_law_dashboard(request: Request, user: dict, org_id: str | None):
+    ctx = await dashboard_cache.aget_or_build(org_key(org_id), lambda: _law_context(org_id))
+    return templates.TemplateResponse(
+        "dashboard_law.html",
+        {"request": request, "user": user, **ctx},
     )
+
+
+async def _law_context(org_id: str | None) -> dict:
+    data = await dashboard_data.fetch_law(org_id)
+
+    matters = data["matters"]
     matters_open = sum(1 for m in matters if m.get("status") == "open")
 
     now = datetime.now(timezone.utc)
@@ -389,9 +361,7 @@ def _render_law_dashboard(request: Request, user: dict, org_id: str | None):
         if (now - opened_dt).days <= 30:
             matters_new_month += 1
 
-    deadlines = list(
-        law_deadlines.find({"demo": True, **org_filter}).limit(200)
-    )
+    deadlines = data["deadlines"]
     deadlines_7d = 0
     deadlines_14d = 0
     upcoming_deadlines = []
@@ -409,30 +379,23 @@ def _render_law_dashboard(request: Request, user: dict, org_id: str | None):
         if days >= 0:
             upcoming_deadlines.append(d)
 
-    sigs = list(
-        law_signatures.find({"demo": True, **org_filter}).limit(200)
-    )
+    sigs = data["signatures"]
     signatures_pending = sum(1 for s in sigs if s.get("status") == "pending")
     signatures_overdue = sum(1 for s in sigs if s.get("status") == "overdue")
 
     workload_direction = "Stable"
     workload_delta = 0.0
 
-    return templates.TemplateResponse(
-        "dashboard_law.html",
-        {
-            "request": request,
-            "user": user,
-            "matters_open": matters_open,
-            "matters_new_month": matters_new_month,
-            "deadlines_7d": deadlines_7d,
-            "deadlines_14d": deadlines_14d,
-            "signatures_pending": signatures_pending,
-            "signatures_overdue": signatures_overdue,
-            "workload_direction": workload_direction,
-            "workload_delta": workload_delta,
-            "open_matters": matters,
-            "upcoming_deadlines": upcoming_deadlines,
-            "signature_queue": sigs,
-        },
-    )
+    return {
+        "matters_open": matters_open,
+        "matters_new_month": matters_new_month,
+        "deadlines_7d": deadlines_7d,
+        "deadlines_14d": deadlines_14d,
+        "signatures_pending": signatures_pending,
+        "signatures_overdue": signatures_overdue,
+        "workload_direction": workload_direction,
+        "workload_delta": workload_delta,
+        "open_matters": matters,
+        "upcoming_deadlines": upcoming_deadlines,
+        "signature_queue": sigs,
+    }
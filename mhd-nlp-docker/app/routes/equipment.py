@@ -4,6 +4,7 @@ from fastapi.templating import Jinja2Templates
 from app.db import db
 from app.auth import get_current_user
 from app.utils.logger import log_activity
+from app.services.dashboard_cache import invalidate_user
 
 router = APIRouter(prefix="/equipment", tags=["equipment"])
 templates = Jinja2Templates(directory="app/templates")
@@ -90,4 +91,6 @@ async def submit_equipment_form(
         metadata={"items": equipment_doc["items"]},
     )
 
+    invalidate_user(current_user["username"])
+
     return RedirectResponse("/equipment", status_code=303)
@@ -1,7 +1,14 @@
 from fastapi import APIRouter, Depends
 from app.authz import require_role
-from datetime import datetime, timedelta, timezone
+from datetime import date, datetime, timedelta, timezone
 from app.db import db
+from app.routes.predict import session_batcher
+from app.serving.cache import risk_cache, session_cache
+from app.services.dashboard_cache import dashboard_cache
+from app.services.auth_cache import revocations, user_cache
+from app.utils.audit_pipeline import audit_pipeline
+from app.db.blob_cache import blob_cache
+from app.monitoring.drift import compare_windows
 
 router = APIRouter(prefix="/metrics", tags=["metrics"])
 
@@ -54,3 +61,53 @@ async def session_summary(user=Depends(require_role("trainer"))):
         k = round(min(5, max(0, p["score"])))
         counts[k] += 1
     return {"score_hist": counts}
+
+
+@router.get("/batching")
+async def batching_stats(user=Depends(require_role("trainer"))):
+    # micro-batcher counters + batch-size histogram for /predict/session_score
+    return {"session_quality": session_batcher.stats()}
+
+
+@router.get("/prediction_cache")
+async def prediction_cache_stats(user=Depends(require_role("trainer"))):
+    return {"injury_risk": risk_cache.stats(), "session_quality": session_cache.stats()}
+
+
+@router.get("/dashboard_cache")
+async def dashboard_cache_stats(user=Depends(require_role("trainer"))):
+    return dashboard_cache.stats()
+
+
+@router.get("/auth_cache")
+async def auth_cache_stats(user=Depends(require_role("admin"))):
+    return {"revocations": revocations.stats(), "user_cache": user_cache.stats()}
+
+
+@router.get("/audit_pipeline")
+async def audit_pipeline_stats(user=Depends(require_role("admin"))):
+    return audit_pipeline.stats()
+
+
+@router.get("/blob_cache")
+async def blob_cache_stats(user=Depends(require_role("admin"))):
+    return blob_cache.stats()
+
+
+@router.get("/drift")
+async def drift_between(use_case: str = "session_quality",
+                        ref_start: date | None = None, ref_end: date | None = None,
+                        cur_start: date | None = None, cur_end: date | None = None,
+                        user=Depends(require_role("trainer"))):
+    # windows are [start, end) days; default: today vs. the 7 days before
+    today = datetime.now(timezone.utc).date()
+    cur_end = cur_end or today + timedelta(days=1)
+    cur_start = cur_start or cur_end - timedelta(days=1)
+    ref_end = ref_end or cur_start
+    ref_start = ref_start or ref_end - timedelta(days=7)
+    return {
+        "use_case": use_case,
+        "ref": [ref_start.isoformat(), ref_end.isoformat()],
+        "cur": [cur_start.isoformat(), cur_end.isoformat()],
+        "features": compare_windows(use_case, (ref_start, ref_end), (cur_start, cur_end)),
+    }
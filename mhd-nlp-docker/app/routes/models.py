@@ -5,6 +5,7 @@ import mlflow
 
 from app.audit import log_event                       
 from app.authz import get_current_user, require_role  
+from app.serving.pool import model_pool
 
 router = APIRouter(prefix="/models", tags=["models"])
 DEPLOYED_PATH = "/app/.registry/deployed.json"  # kept if you still use it somewhere
@@ -18,7 +19,7 @@ async def current(user = Depends(get_current_user)):
     if not versions:
         raise HTTPException(status_code=404, detail="No Production model")
     mv = max(versions, key=lambda v: int(v.version))
-    await log_event(user.get("username"), "models_current", {"name": name, "version": mv.version})
+    log_event(user.get("username"), "models_current", {"name": name, "version": mv.version})
     return {"name": name, "version": mv.version, "stage": "Production"}
 
 @router.get("/compare", dependencies=[Depends(require_role("trainer"))])
@@ -28,5 +29,10 @@ async def compare(runs: list[str] = Query(..., description="repeat ?runs=<id>&ru
     for r in runs:
         run = client.get_run(r)
         out.append({"run_id": r, "metrics": run.data.metrics, "params": run.data.params})
-    await log_event(user.get("username"), "models_compare", {"runs": runs})
+    log_event(user.get("username"), "models_compare", {"runs": runs})
     return {"results": out}
+
+@router.get("/loaded", dependencies=[Depends(require_role("trainer"))])
+async def loaded(user = Depends(get_current_user)):
+    # resident serving models: version, load latency, warm-up latency, memory footprint
+    return model_pool.stats()
@@ -9,6 +9,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.auth import get_current_user
 from app.db import db
+from app.services.dashboard_cache import invalidate_org
 
 router = APIRouter(prefix="/org/fin", tags=["org_financial"])
 
@@ -42,6 +43,7 @@ async def create_client(request: Request, user=Depends(get_current_user)):
         "segment": form.get("segment") or "retail",
     }
     fin_clients.insert_one(doc)
+    invalidate_org(user.get("org_id"))
     return RedirectResponse("/dashboard", status_code=303)
 
 
@@ -57,6 +59,7 @@ def run_kyc_batch(user=Depends(get_current_user)):
       {"org_id": org_id, "status": "pending"},
       {"$set": {"status": "in_progress"}}
     )
+    invalidate_org(org_id)
     return {
         "status": "ok",
         "message": f"KYC batch started for {result.modified_count} records.",
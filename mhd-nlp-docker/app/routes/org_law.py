@@ -9,6 +9,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.auth import get_current_user
 from app.db import db
+from app.services.dashboard_cache import invalidate_org
 
 router = APIRouter(prefix="/org/law", tags=["org_law"])
 
@@ -43,6 +44,7 @@ async def create_matter(request: Request, user=Depends(get_current_user)):
         "status": form.get("status") or "open",
     }
     law_matters.insert_one(doc)
+    invalidate_org(user.get("org_id"))
     return RedirectResponse("/dashboard", status_code=303)
 
 
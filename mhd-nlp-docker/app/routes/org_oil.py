@@ -8,6 +8,7 @@ from fastapi.templating import Jinja2Templates
 
 from app.auth import get_current_user
 from app.db import db
+from app.services.dashboard_cache import invalidate_org
 
 router = APIRouter(prefix="/org/oil", tags=["org_oil"])
 
@@ -44,6 +45,7 @@ async def create_incident(request: Request, user=Depends(get_current_user)):
         "created_by": user.get("username"),
     }
     oil_incidents.insert_one(doc)
+    invalidate_org(user.get("org_id"))
 
     # send them back to main dashboard
     return RedirectResponse("/dashboard", status_code=303)
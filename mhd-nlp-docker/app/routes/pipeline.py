@@ -1,10 +1,11 @@
 from fastapi import APIRouter
-from app.pipelines.orchestrator import run_training_job
+from app.jobs.registry import enqueue
 
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
 @router.post("/train")
-def trigger_training():
-    jid = run_training_job()
-    return {"status": "started", "job_id": jid}
- 
\ No newline at end of file
+def trigger_training(force: bool = False):
+    # steps are memoized on their inputs; force=true recomputes every step.
+    # Runs on a job worker; poll /pipeline/status/{job_id}.
+    jid = enqueue("train", {"force": force})
+    return {"status": "queued", "job_id": jid}
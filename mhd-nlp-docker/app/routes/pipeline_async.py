@@ -1,9 +1,6 @@
-from fastapi import APIRouter, BackgroundTasks, Depends
-from rq.job import Job
-from redis import Redis
-import os
+from fastapi import APIRouter, Depends, HTTPException, Body
 
-from app.jobs.queue import q, train_job
+from app.jobs.registry import KINDS, enqueue, get_job, list_jobs, cancel
 from app.audit import log_event
 from app.auth import get_current_user
 from app.authz import require_role
@@ -13,28 +10,57 @@ router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
 @router.post("/train-async", dependencies=[Depends(require_role("trainer"))])
 async def train_async(user=Depends(get_current_user)):
-    job = q.enqueue(train_job)
+    jid = enqueue("train", created_by=user.get("username"))
     log_event(
         user.get("username"),
         "train_async_enqueued",
-        {"job_id": job.id},
+        {"job_id": jid},
     )
-    return {"job_id": job.id, "status": "queued"}
+    return {"job_id": jid, "status": "queued"}
+
+
+@router.post("/jobs/{kind}", dependencies=[Depends(require_role("trainer"))])
+async def submit_job(kind: str, params: dict = Body(default={}), priority: int | None = None,
+                     user=Depends(get_current_user)):
+    if kind not in KINDS:
+        raise HTTPException(status_code=404, detail=f"Unknown job kind: {kind}")
+    jid = enqueue(kind, params, priority=priority, created_by=user.get("username"))
+    log_event(user.get("username"), "job_enqueued", {"job_id": jid, "kind": kind})
+    return {"job_id": jid, "status": "queued"}
+
+
+@router.get("/jobs", dependencies=[Depends(require_role("trainer"))])
+async def jobs_list(kind: str | None = None, status: str | None = None, limit: int = 50):
+    return {"items": list_jobs(kind, status, min(limit, 500))}
+
+
+@router.post("/jobs/{job_id}/cancel", dependencies=[Depends(require_role("trainer"))])
+async def jobs_cancel(job_id: str, user=Depends(get_current_user)):
+    ok = cancel(job_id)
+    log_event(user.get("username"), "job_cancel", {"job_id": job_id, "ok": ok})
+    return {"job_id": job_id, "cancelled": ok}
 
 
 @router.get("/status/{job_id}", dependencies=[Depends(require_role("trainer"))])
 async def status(job_id: str, user=Depends(get_current_user)):
-    r = Redis.from_url(os.getenv("REDIS_URL", "redis://redis:6379"))
-    job = Job.fetch(job_id, connection=r)
-    info = {"job_id": job.id, "status": job.get_status()}
-    if job.is_finished:
-        info["result"] = job.result
-    if job.is_failed:
-        info["exc_info"] = job.exc_info
+    job = get_job(job_id)
+    if not job:
+        raise HTTPException(status_code=404, detail="Job not found")
+    info = {
+        "job_id": job["_id"],
+        "kind": job.get("kind"),
+        "status": job["status"],
+        "attempts": job.get("attempts", 0),
+        "progress": job.get("progress"),
+    }
+    if job["status"] == "succeeded":
+        info["result"] = job.get("result")
+    if job.get("error"):
+        info["error"] = job["error"]
 
     log_event(
         user.get("username"),
         "train_async_status",
-        {"job_id": job.id, "status": info["status"]},
+        {"job_id": job_id, "status": info["status"]},
     )
     return info
@@ -1,9 +1,11 @@
 from fastapi import APIRouter, HTTPException, Query, Depends
+import asyncio
 import hashlib
 import pandas as pd
 import mlflow
 
-from app.db.storage import get_bytes_raw
+from app.db.storage import open_raw_file
+from app.db.blob_cache import blob_cache
 from app.pipelines.steps.train import train_basic
 from app.pipelines.steps.validate import validate_metrics
 from app.pipelines.steps.deploy import promote_to_registry
@@ -13,6 +15,37 @@ from app.authz import require_role
 router = APIRouter(prefix="/pipeline", tags=["pipeline"])
 
 
+class _HashingReader:
+    """Pass-through reader that sha256s every byte pandas pulls."""
+
+    def __init__(self, f):
+        self._f = f
+        self.sha = hashlib.sha256()
+
+    def read(self, n: int = -1) -> bytes:
+        b = self._f.read(n)
+        self.sha.update(b)
+        return b
+
+    def __iter__(self):
+        # pandas only needs read(); iteration is what makes it accept the object
+        return iter(lambda: self.read(1 << 16), b"")
+
+    def drain(self):
+        while self.read(1 << 20):
+            pass
+
+
+def _read_csv_stream(f):
+    try:
+        reader = _HashingReader(f)
+        df = pd.read_csv(reader)
+        reader.drain()  # hash covers the whole object even if the parser stopped short
+        return df, reader.sha.hexdigest()
+    finally:
+        f.close()
+
+
 @router.post("/train-from-blob", dependencies=[Depends(require_role("trainer"))])
 async def train_from_blob(
     key: str = Query(...),
@@ -22,17 +55,31 @@ async def train_from_blob(
     Pull a CSV from raw storage (Azure Blob or S3), train a basic model, validate metrics,
     and if valid promote it to the registry.
     """
-    try:
-        b = get_bytes_raw(key)
-    except Exception:
-        raise HTTPException(status_code=404, detail="Blob/S3 object not found")
+    if blob_cache.enabled:
+        # repeat trainings on the same object read the local copy (mmap'd by pandas)
+        try:
+            blob = await asyncio.to_thread(blob_cache.fetch, "raw", key, True)
+        except Exception:
+            raise HTTPException(status_code=404, detail="Blob/S3 object not found")
 
-    data_sha256 = hashlib.sha256(b).hexdigest()
+        data_sha256 = blob.sha256
+        try:
+            df = await asyncio.to_thread(pd.read_csv, blob.path, memory_map=True)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
+        finally:
+            blob_cache.release(blob)  # pinned so it can't be evicted mid-read
+    else:
+        # stream the object through the parser instead of materializing it first
+        try:
+            f = await asyncio.to_thread(open_raw_file, key)
+        except Exception:
+            raise HTTPException(status_code=404, detail="Blob/S3 object not found")
 
-    try:
-        df = pd.read_csv(pd.io.common.BytesIO(b))
-    except Exception as e:
-        raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
+        try:
+            df, data_sha256 = await asyncio.to_thread(_read_csv_stream, f)
+        except Exception as e:
+            raise HTTPException(status_code=400, detail=f"Failed to parse CSV: {e}")
 
     with mlflow.start_run(run_name="csv-train") as run:
         mlflow.log_param("data_key", key)
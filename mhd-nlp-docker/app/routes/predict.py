@@ -11,12 +11,15 @@ from app.db import db
 from app.auth import get_current_user
 from app.authz import require_role
 from app.schemas.predict import RiskRequest, SessionScoreRequest
-from app.pipelines.model_loader import load_latest_or_production
+from app.serving.pool import model_pool, SESSION_FEATURES
+from app.serving.batcher import batcher_from_env, QueueFull
+from app.serving.cache import risk_cache, session_cache, score_cached
 from app.utils.audit import audit
+from app.services.risk_latest import record_risk_predictions
+from app.monitoring.drift import observe as observe_drift
 
 router = APIRouter(prefix="/predict", tags=["predict"])
-api_metrics = db["api_metrics"]
-api_metrics.create_index("ts")
+api_metrics = db["api_metrics"]  # ts (TTL) index: app/jobs/retention.py
 
 # ------------ Injury Risk ------------
 
@@ -24,18 +27,15 @@ api_metrics.create_index("ts")
 @audit("predict.risk")
 async def predict_risk(payload: RiskRequest,
                        user=Depends(require_role("viewer"))):
-    # load injury-risk model
-    model, meta = load_latest_or_production(model_name="injury_risk_logreg")
-
     df = pd.DataFrame([i.dict() for i in payload.items])
-    feature_cols = df.columns.tolist()
     if df.empty:
         raise HTTPException(status_code=400, detail="No rows provided")
 
-    if hasattr(model, "predict_proba"):
-        scores = model.predict_proba(df[feature_cols])[:, 1]
-    else:
-        scores = model.predict(df[feature_cols])
+    # resident injury-risk model (preloaded at startup; a cold pool loads off the event loop)
+    await model_pool.ensure_loaded("injury_risk")
+    with model_pool.acquire("injury_risk") as loaded:
+        meta = loaded.meta
+        scores = score_cached(risk_cache, loaded, df)
 
     now = datetime.now(timezone.utc)
     docs, results = [], []
@@ -49,6 +49,7 @@ async def predict_risk(payload: RiskRequest,
         docs.append({
             "ts": now,
             "use_case": "injury_risk",
+            "athlete_id": row.athlete_id,
             "features": row.dict(),
             "score": s_float,
             "run_id": meta.get("run_id"),
@@ -56,59 +57,82 @@ async def predict_risk(payload: RiskRequest,
         })
     if docs:
         db["risk_predictions"].insert_many(docs)
+        record_risk_predictions(docs)
+        try:
+            observe_drift("injury_risk", (d["features"] for d in docs), [d["score"] for d in docs], now)
+        except Exception:
+            pass  # drift histograms must never fail a prediction
 
     return {"predictions": results, "model_info": meta}
 
 
 # ------------ Session Quality ------------
 
+def _score_session_rows(rows: list[dict]) -> list[tuple[float, dict]]:
+    """
+    Score the combined rows of one micro-batch with a single model call and a
+    single insert_many. Runs in the batcher's worker thread.
+    """
+    df = pd.DataFrame(rows)
+    cols = SESSION_FEATURES
+    for c in cols:
+        if c not in df.columns:
+            df[c] = 0.0
+    X = df[cols]
+
+    with model_pool.acquire("session_quality") as loaded:
+        meta = loaded.meta
+        preds = score_cached(session_cache, loaded, X)
+
+    now = datetime.now(timezone.utc)
+    db["session_scores"].insert_many([
+        {
+            "ts": now,
+            "use_case": "session_quality",
+            "features": row,
+            "score": float(s),
+            "run_id": meta.get("run_id"),
+            "model_version": meta.get("model_version"),
+        }
+        for row, s in zip(rows, preds)
+    ])
+    try:
+        observe_drift("session_quality", rows, [float(s) for s in preds], now)
+    except Exception:
+        pass  # drift histograms must never fail a prediction
+    return [(float(s), meta) for s in preds]
+
+
+session_batcher = batcher_from_env(_score_session_rows, "session_quality", "PREDICT_BATCH")
+
+
 @router.post("/session_score")
 @audit("predict.session_score")
 async def predict_session_score(req: SessionScoreRequest,
                                 user=Depends(require_role("viewer"))):
     t0 = time.perf_counter()
-    model, meta = load_latest_or_production(model_name="mhd_session_score")
-    df = pd.DataFrame([i.dict() for i in req.items])
-
-    cols = [
-        "sets", "reps", "rpe", "rest_s", "completed_pct",
-        "nlp_fatigue", "nlp_pain_any", "nlp_sleep_poor",
-        "nlp_mood_neg", "nlp_compliance_issues",
-    ]
-    for c in cols:
-        if c not in df.columns:
-            df[c] = 0.0
-    X = df[cols]
+    if not req.items:
+        raise HTTPException(status_code=400, detail="No rows provided")
 
-    preds = model.predict(X) if hasattr(model, "predict") else model.predict_proba(X)[:, 1]
+    try:
+        scored = await session_batcher.submit([i.dict() for i in req.items])
+    except QueueFull:
+        raise HTTPException(status_code=503, detail="Scoring queue full, retry shortly")
+    preds = [s for s, _ in scored]
+    meta = scored[0][1]
     latency_ms = (time.perf_counter() - t0) * 1000.0
 
     api_metrics.insert_one({
         "ts": datetime.now(timezone.utc),
         "endpoint": "/predict/session_score",
         "latency_ms": float(latency_ms),
-        "n": len(df),
+        "n": len(preds),
         "model_run_id": meta.get("run_id"),
         "model_uri": meta.get("model_uri"),
         "ok": True,
     })
 
-    docs = []
-    now = datetime.now(timezone.utc)
-    for row, s in zip(req.items, preds):
-        s_float = float(s)
-        docs.append({
-            "ts": now,
-            "use_case": "session_quality",
-            "features": row.dict(),
-            "score": s_float,
-            "run_id": meta.get("run_id"),
-            "model_version": meta.get("model_version"),
-        })
-    if docs:
-        db["session_scores"].insert_many(docs)
-
     return {
-        "predictions": [float(x) for x in preds],
+        "predictions": preds,
         "meta": meta,
     }
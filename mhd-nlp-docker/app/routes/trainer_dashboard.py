@@ -15,6 +15,8 @@ from app.scripts.seed_demo_data import seed_predictions_and_forms
 
 from app.db import db
 from app.authz import require_role
+from app.services.dashboard_data import fetch_trainer
+from app.services.risk_latest import HIGH_RISK
 
 router = APIRouter(prefix="/trainer", tags=["trainer"])
 templates = Jinja2Templates(directory="app/templates")
@@ -22,6 +24,7 @@ templates = Jinja2Templates(directory="app/templates")
 UTC = timezone.utc
 
 predictions = db["predictions"]
+predictions.create_index([("use_case", 1), ("ts", -1)])
 sessions_coll = db["sessions"]
 forms_coll = db["forms"]  # adjust if your medical forms collection name differs
 clearance_coll = db["clearance"]  # NEW: overrides for “cleared” athletes
@@ -59,63 +62,91 @@ def trainer_trigger_mlflow_run(user=Depends(require_role("trainer"))):
         "mlflow_uri": "http://localhost:5001" 
     }
 
-def _bucket_risk(items: List[Dict[str, Any]]):
-    """Split risk predictions into high / med / low by score."""
-    high, med, low = [], [], []
-    for p in items:
-        s = float(p.get("score", 0.0))
-        if s >= 0.8:
-            high.append(p)
-        elif s >= 0.5:
-            med.append(p)
-        else:
-            low.append(p)
-    return high, med, low
-
-
-def _top_per_athlete(items: List[Dict[str, Any]]):
-    """Keep the highest-risk entry per athlete."""
-    best_by_athlete: Dict[str, Dict[str, Any]] = {}
-    for p in items:
-        aid = p.get("athlete_id") or "unknown"
-        s = float(p.get("score", 0.0))
-        if aid not in best_by_athlete or s > float(best_by_athlete[aid].get("score", 0.0)):
-            best_by_athlete[aid] = p
-    return list(best_by_athlete.values())
-
-
-def _compute_risk_drift(now: datetime) -> Dict[str, Any]:
+TOP_HIGH_LIMIT = 20
+RECENT_SESSIONS_LIMIT = 30
+
+
+def _facet_pipeline(now: datetime, since: datetime) -> List[Dict[str, Any]]:
     """
-    Naive drift: compare average risk score in the last 7 days
-    vs. the previous 7-day window.
+    One $facet aggregation for every trainer KPI derived from predictions.
+    Only the aggregated rows leave the database, and counts/averages cover
+    the whole window instead of a capped sample.
     """
-    recent_start = now - timedelta(days=7)
     prev_start = now - timedelta(days=14)
+    in_window = {"ts": {"$gte": since}}
+    risk = {"use_case": "injury_risk"}
+    session = {"use_case": "session_quality"}
+
+    pipeline = [
+        {"$match": {
+            "use_case": {"$in": ["injury_risk", "session_quality"]},
+            "ts": {"$gte": prev_start, "$lte": now},
+        }},
+        {"$facet": {
+            # distinct athletes + prediction count for the risk window
+            "risk_totals": [
+                {"$match": {**risk, **in_window}},
+                {"$group": {"_id": "$athlete_id", "n": {"$sum": 1}}},
+                {"$group": {
+                    "_id": None,
+                    "predictions": {"$sum": "$n"},
+                    "athletes": {"$sum": {"$cond": [{"$ifNull": ["$_id", False]}, 1, 0]}},
+                }},
+            ],
+            # highest high-risk prediction per athlete
+            "top_high": [
+                {"$match": {**risk, **in_window, "score": {"$gte": HIGH_RISK}}},
+                {"$sort": {"score": -1}},
+                {"$group": {"_id": {"$ifNull": ["$athlete_id", "unknown"]}, "doc": {"$first": "$$ROOT"}}},
+                {"$replaceRoot": {"newRoot": "$doc"}},
+                {"$sort": {"score": -1}},
+                {"$limit": TOP_HIGH_LIMIT},
+            ],
+            "session_stats": [
+                {"$match": {**session, **in_window}},
+                {"$group": {"_id": None, "avg": {"$avg": "$score"}, "n": {"$sum": 1}}},
+            ],
+            "sessions": [
+                {"$match": {**session, **in_window}},
+                {"$sort": {"ts": -1}},
+                {"$limit": RECENT_SESSIONS_LIMIT},
+            ],
+            # drift: average risk score this week vs. the week before
+            "risk_windows": [
+                {"$match": risk},
+                {"$group": {
+                    "_id": {"$cond": [{"$gte": ["$ts", since]}, "recent", "prev"]},
+                    "avg": {"$avg": "$score"},
+                    "n": {"$sum": 1},
+                }},
+            ],
+        }},
+    ]
+    return pipeline
+
+
+def _shape_facets(facets: Dict[str, Any]) -> Dict[str, Any]:
+    totals = (facets.get("risk_totals") or [{}])[0]
+    session_stats = (facets.get("session_stats") or [{}])[0]
+    windows = {w["_id"]: w for w in facets.get("risk_windows", [])}
+    return {
+        "total_predictions": totals.get("predictions", 0),
+        "total_athletes": totals.get("athletes", 0),
+        "top_high": facets.get("top_high", []),
+        "sessions": facets.get("sessions", []),
+        "session_count": session_stats.get("n", 0),
+        "avg_session_score": session_stats.get("avg"),
+        "drift": _compute_risk_drift(windows.get("recent", {}), windows.get("prev", {})),
+    }
 
-    recent = list(
-        predictions.find(
-            {
-                "use_case": "injury_risk",
-                "ts": {"$gte": recent_start, "$lte": now},
-            }
-        ).limit(2000)
-    )
-    prev = list(
-        predictions.find(
-            {
-                "use_case": "injury_risk",
-                "ts": {"$gte": prev_start, "$lt": recent_start},
-            }
-        ).limit(2000)
-    )
-
-    def avg_score(docs: List[Dict[str, Any]]) -> float:
-        if not docs:
-            return 0.0
-        return sum(float(d.get("score", 0.0)) for d in docs) / len(docs)
 
-    recent_avg = avg_score(recent)
-    prev_avg = avg_score(prev)
+def _compute_risk_drift(recent: Dict[str, Any], prev: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Naive drift: compare average risk score in the last 7 days
+    vs. the previous 7-day window.
+    """
+    recent_avg = float(recent.get("avg") or 0.0)
+    prev_avg = float(prev.get("avg") or 0.0)
     delta = recent_avg - prev_avg
 
     return {
@@ -123,41 +154,29 @@ def _compute_risk_drift(now: datetime) -> Dict[str, Any]:
         "prev_avg": prev_avg,
         "delta": delta,
         "direction": "up" if delta > 0.01 else "down" if delta < -0.01 else "flat",
-        "recent_count": len(recent),
-        "prev_count": len(prev),
+        "recent_count": recent.get("n", 0),
+        "prev_count": prev.get("n", 0),
     }
 
 
 @router.get("/dashboard", response_class=HTMLResponse)
-def trainer_dashboard(
+async def trainer_dashboard(
     request: Request,
     user=Depends(require_role("trainer")),  # trainer OR admin
 ):
     now = datetime.now(UTC)
     since = now - timedelta(days=7)
 
-    # ---- Injury risk predictions (last 7 days) ----
-    risk_cursor = (
-        predictions.find(
-            {
-                "use_case": "injury_risk",
-                "ts": {"$gte": since},
-            }
-        )
-        .sort("score", -1)
-        .limit(500)
-    )
-    risk_preds = list(risk_cursor)
+    # independent queries run concurrently on the async client
+    data = await fetch_trainer(now, since, _facet_pipeline(now, since))
 
-    risk_high, risk_med, risk_low = _bucket_risk(risk_preds)
-    top_high = _top_per_athlete(risk_high)  # one best entry per athlete
+    # ---- Prediction KPIs (single aggregation) ----
+    agg = _shape_facets(data["facets"])
+    top_high = agg["top_high"]  # one best entry per athlete
 
-    risk_total = max(len(risk_preds), 1)
-    risk_counts = {
-        "high": len(risk_high),
-        "med": len(risk_med),
-        "low": len(risk_low),
-    }
+    # athletes per bucket by their latest prediction (athlete_risk_latest view)
+    risk_counts = data["risk_counts"]
+    risk_total = max(sum(risk_counts.values()), 1)
     risk_pct = {
         "high": (risk_counts["high"] / risk_total) * 100.0,
         "med":  (risk_counts["med"]  / risk_total) * 100.0,
@@ -165,72 +184,21 @@ def trainer_dashboard(
     }
 
     # Live high-risk list (most recent 25 high-risk predictions)
-    live_high = list(
-        predictions.find(
-            {
-                "use_case": "injury_risk",
-                "score": {"$gte": 0.8},
-                "ts": {"$gte": since},
-            }
-        )
-        .sort("ts", -1)
-        .limit(25)
-    )
+    live_high = data["live_high"]
 
     # ---- Session quality predictions (last 7 days) ----
-    sess_cursor = (
-        predictions.find(
-            {
-                "use_case": "session_quality",
-                "ts": {"$gte": since},
-            }
-        )
-        .sort("ts", -1)
-        .limit(500)
-    )
-    session_preds = list(sess_cursor)
-
-    avg_session_score = None
-    if session_preds:
-        scores = [float(s.get("score", 0.0)) for s in session_preds]
-        if scores:
-            avg_session_score = sum(scores) / len(scores)
-
-    # ---- Active clearance overrides (NEW) ----
-    active_clearance_docs = list(
-        clearance_coll.find({"cleared_until": {"$gte": now}})
-    )
-    cleared_ids = {doc.get("athlete_id") for doc in active_clearance_docs if doc.get("athlete_id")}
+    session_preds = agg["sessions"]
+    avg_session_score = agg["avg_session_score"]
 
     # ---- Needs Clearance (high risk OR recent injury, minus cleared ids) ----
-    needs_query = {
-        "use_case": "injury_risk",
-        "ts": {"$gte": since},
-        "$or": [
-            {"score": {"$gte": 0.8}},
-            {"meta.recent_injury_flag": True},
-        ],
-    }
-    if cleared_ids:
-        needs_query["athlete_id"] = {"$nin": list(cleared_ids)}
-
-    needs_clearance = list(
-        predictions.find(needs_query)
-        .sort("score", -1)
-        .limit(20)
-    )
+    # one row per athlete, from their latest prediction
+    needs_clearance = data["needs_clearance"]
 
     # ---- Pending medical forms ----
-    pending_forms = list(
-        forms_coll.find(
-            {"status": {"$in": ["pending", "in_review"]}}
-        )
-        .sort("created_at", -1)
-        .limit(15)
-    )
+    pending_forms = data["pending_forms"]
 
     # ---- Model health / drift ----
-    drift = _compute_risk_drift(now)
+    drift = agg["drift"]
 
     alerts: List[str] = []
     if risk_counts["high"] >= 5:
@@ -252,8 +220,8 @@ def trainer_dashboard(
     }
 
     # ---- High-level KPIs for analytic tiles ----
-    total_athletes_tracked = len({p.get("athlete_id") for p in risk_preds if p.get("athlete_id")})
-    total_predictions_week = len(risk_preds)
+    total_athletes_tracked = agg["total_athletes"]
+    total_predictions_week = agg["total_predictions"]
     high_risk_count = risk_counts["high"]
     needs_clearance_count = len(needs_clearance)
     pending_forms_count = len(pending_forms)
@@ -281,14 +249,12 @@ def trainer_dashboard(
             "now": now,
             "risk_window_days": 7,
             "session_window_days": 7,
-            "risk_high": risk_high,
-            "risk_med": risk_med,
-            "risk_low": risk_low,
             "risk_counts": risk_counts,
             "risk_pct": risk_pct,
             "top_high": top_high,
             "live_high": live_high,
             "sessions": session_preds,
+            "session_count": agg["session_count"],
             "avg_session_score": avg_session_score,
             "needs_clearance": needs_clearance,
             "pending_forms": pending_forms,
@@ -4,6 +4,7 @@ from fastapi.templating import Jinja2Templates
 from app.db import db
 from app.auth import get_current_user
 from app.utils.logger import log_activity
+from app.services.dashboard_cache import invalidate_user
 
 router = APIRouter(prefix="/training", tags=["training"])
 templates = Jinja2Templates(directory="app/templates")
@@ -50,5 +51,7 @@ async def update_training(
         metadata=record
     )
 
+    invalidate_user(current_user["username"])
+
     return RedirectResponse("/training", status_code=303)
 
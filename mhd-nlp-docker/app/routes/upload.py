@@ -1,11 +1,14 @@
-from fastapi import APIRouter, Request, UploadFile, File, Depends, Form, Query, HTTPException
-from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse
+from fastapi import APIRouter, Request, UploadFile, File, Depends, Form, Query, HTTPException, Header
+from fastapi.responses import HTMLResponse, RedirectResponse, FileResponse, JSONResponse, StreamingResponse
 from fastapi.templating import Jinja2Templates
 from datetime import datetime, timezone
 from bson import ObjectId
 import os
+import asyncio
+import hashlib
 from typing import List, Optional
 import csv, io, re
+from urllib.parse import quote
 from bson.errors import InvalidId
 from app.db import db
 from app.auth import get_current_user, get_current_user_optional 
@@ -13,6 +16,9 @@ from app.utils.logger import log_activity
 from app.utils.ocr import extract_text_from_pdf_or_ocr, ocr_image_path
 from app.services.sync import rebuild_clinical_snapshot, run_risk_rules
 from app.utils.snapshot import rebuild_snapshot
+from app.services.dashboard_cache import invalidate_user
+from app.db.storage import open_raw, stat_raw, parse_range
+from app.services import content_store
 
 
 router = APIRouter(prefix="/upload", tags=["upload"])
@@ -20,6 +26,10 @@ templates = Jinja2Templates(directory="app/templates")
 
 UPLOAD_FOLDER = "uploads"
 os.makedirs(UPLOAD_FOLDER, exist_ok=True)
+# local copies are named by content, so same-named files never collide
+CAS_FOLDER = os.path.join(UPLOAD_FOLDER, "cas")
+os.makedirs(CAS_FOLDER, exist_ok=True)
+COPY_CHUNK = 1024 * 1024
 
 uploads_collection = db.uploads
 upload_flags = db.upload_flags
@@ -111,6 +121,88 @@ def _clean_text(v: str | None) -> str | None:
 def _ext(filename: str) -> str:
     return os.path.splitext(filename)[1].lower()
 
+def _upload_size(file: UploadFile) -> int:
+    # the multipart parser already spooled the body; size it without reading it
+    if file.size is not None:
+        return file.size
+    f = file.file
+    f.seek(0, os.SEEK_END)
+    size = f.tell()
+    f.seek(0)
+    return size
+
+def _save_local(file: UploadFile, ext: str):
+    """Copy the spooled upload to uploads/cas/<sha256><ext>, hashing in the same pass."""
+    f = file.file
+    f.seek(0)
+    h = hashlib.sha256()
+    tmp = os.path.join(CAS_FOLDER, f".{os.getpid()}.{id(file)}.tmp")
+    with open(tmp, "wb") as buffer:
+        for chunk in iter(lambda: f.read(COPY_CHUNK), b""):
+            h.update(chunk)
+            buffer.write(chunk)
+    sha = h.hexdigest()
+    path = os.path.join(CAS_FOLDER, sha + ext)
+    if os.path.exists(path):
+        os.remove(tmp)  # identical bytes already on disk
+    else:
+        os.replace(tmp, path)
+    f.seek(0)
+    return sha, path
+
+def _content_disposition(filename: str) -> str:
+    # same rule as Starlette's FileResponse: RFC 5987 filename* whenever the
+    # name needs escaping (non-ASCII, quotes, ...), plus a plain ASCII fallback
+    quoted = quote(filename)
+    if quoted == filename:
+        return f'attachment; filename="{filename}"'
+    fallback = filename.encode("ascii", "replace").decode("ascii").replace("\\", "_").replace('"', "_")
+    return f'attachment; filename="{fallback}"; filename*=utf-8\'\'{quoted}'
+
+
+async def _serve_upload(file_meta: dict, range_header: Optional[str]):
+    """
+    Stream a stored upload from blob/S3 (honouring a single Range), so any
+    replica can serve it. Rows written before uploads went to storage fall
+    back to the local copy.
+    """
+    key = file_meta.get("storage_key")
+    filename = file_meta["filename"]
+    if not key:
+        path = file_meta.get("local_path") or os.path.join(UPLOAD_FOLDER, filename)
+        return FileResponse(path, filename=filename)
+
+    try:
+        st = await asyncio.to_thread(stat_raw, key)
+    except Exception:
+        return JSONResponse({"error": "File not found"}, status_code=404)
+
+    size = st["size"]
+    try:
+        rng = parse_range(range_header, size)
+    except ValueError:
+        return JSONResponse({"error": "Range not satisfiable"}, status_code=416,
+                            headers={"Content-Range": f"bytes */{size}"})
+
+    start, end = rng or (0, size - 1)
+    length = end - start + 1
+    chunks = await asyncio.to_thread(open_raw, key, start, length) if length > 0 else iter(())
+    headers = {
+        "Accept-Ranges": "bytes",
+        "Content-Length": str(max(length, 0)),
+        "Content-Disposition": _content_disposition(filename),
+    }
+    if st.get("etag"):
+        headers["ETag"] = f'"{st["etag"]}"'
+    if rng:
+        headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return StreamingResponse(
+        chunks,
+        status_code=206 if rng else 200,
+        media_type=file_meta.get("content_type") or st.get("content_type") or "application/octet-stream",
+        headers=headers,
+    )
+
 def validate_upload(filename: str, size_bytes: int, categories: List[str]) -> List[str]:
     errs: List[str] = []
     ext = _ext(filename)
@@ -511,20 +603,27 @@ async def upload_record(
 ):
     username = current_user["username"]
     filename = os.path.basename(file.filename)
-    content = await file.read()
+    size = _upload_size(file)
     ext = _ext(filename)
     cat_set = {c.lower() for c in (category or [])}
 
     # 1) Basic validations
-    errs = validate_upload(filename, len(content), list(cat_set))  # <-- fixed name & args
+    errs = validate_upload(filename, size, list(cat_set))  # <-- fixed name & args
     if errs:
         log_activity(username, "upload_validation_failed", {"filename": filename, "errors": errs})
         return RedirectResponse(f"/upload?err={errs[0]}", status_code=303)
 
-    # 2) Save file
-    path = os.path.join(UPLOAD_FOLDER, filename)
-    with open(path, "wb") as buffer:
-        buffer.write(content)
+    # 2) Save file: chunked copies off the spooled upload, never the whole body in memory.
+    # Blobs are content-addressed; a duplicate only bumps the blob's refcount.
+    sha256, path = await asyncio.to_thread(_save_local, file, ext)
+
+    storage_key, dedup = None, False
+    try:
+        blob = await asyncio.to_thread(content_store.put_stream, file.file, sha256, size, file.content_type)
+        storage_key, dedup = blob["key"], blob["dedup"]
+    except Exception as e:
+        # local copy still serves ingestion and the download fallback
+        log_activity(username, "upload_storage_failed", {"filename": filename, "error": str(e)})
 
     # 3) Record upload row
     uploads_collection.insert_one({
@@ -532,12 +631,23 @@ async def upload_record(
         "filename": filename,
         "category": list(cat_set),
         "upload_date": _utcnow(),
+        "size": size,
+        "content_type": file.content_type,
+        "sha256": sha256,
+        "storage_key": storage_key,
+        "local_path": path,
+        "dedup": dedup,
     })
     upload_flags.update_one({"username": username}, {"$set": {"first_time": False}}, upsert=True)
 
     # 4) Smart ingestion
     msg = "File uploaded."
     try:
+        if ext in (".csv", ".txt"):
+            # text formats are parsed whole; binary formats are read from path
+            with open(path, "rb") as f:
+                content = f.read()
+
         if ext == ".csv":
             rows = _read_csv_bytes(content)
             # Optional: soft warnings (not blocking)
@@ -662,9 +772,11 @@ async def upload_record(
 
     except ValueError as e:
         log_activity(username, "csv_parse_error", {"filename": filename, "error": str(e)})
+        invalidate_user(username)
         return RedirectResponse(f"/upload?err=CSV parse error: {str(e)}", status_code=303)
     except Exception as e:
         log_activity(username, "ingest_error", {"filename": filename, "error": str(e)})
+        invalidate_user(username)
         return RedirectResponse(f"/upload?err=Could not ingest: {str(e)}", status_code=303)
     
     try:
@@ -684,6 +796,7 @@ async def upload_record(
 
     # 5) Base upload activity
     log_activity(username, "upload_file", {"filename": filename, "category": list(cat_set)})
+    invalidate_user(username)
     return RedirectResponse(f"/upload?msg={msg}", status_code=303)
 
 
@@ -692,6 +805,7 @@ async def download_file(
     file_id: str,
     token: str | None = Query(None),
     email: str | None = Query(None),
+    range: str | None = Header(None),
     current_user: dict | None = Depends(get_current_user_optional),
 ):
     # Validate object id
@@ -706,8 +820,7 @@ async def download_file(
 
     # 1) If the owner is logged in, allow direct download
     if current_user and current_user.get("username") == file_meta["username"]:
-        filepath = os.path.join(UPLOAD_FOLDER, file_meta["filename"])
-        return FileResponse(filepath, filename=file_meta["filename"])
+        return await _serve_upload(file_meta, range)
 
     # 2) Otherwise require a valid share token + email (single-file or category-scoped)
     try:
@@ -715,7 +828,6 @@ async def download_file(
     except HTTPException as e:
         return JSONResponse({"error": e.detail}, status_code=e.status_code)
 
-    filepath = os.path.join(UPLOAD_FOLDER, file_meta["filename"])
-    return FileResponse(filepath, filename=file_meta["filename"])
+    return await _serve_upload(file_meta, range)
 
 
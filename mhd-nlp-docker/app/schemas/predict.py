@@ -1,7 +1,8 @@
 from pydantic import BaseModel, Field
-from typing import List
+from typing import List, Optional
 
 class RiskItem(BaseModel):
+    athlete_id: Optional[str] = None
     age: float = Field(ge=10, le=100)
     bp: float
     hr: float
@@ -0,0 +1,78 @@
+"""
+Benchmark the two serving flavors of app/serving/pool.py on the same model:
+
+- pyfunc:  mlflow.pyfunc.load_model(...).predict(DataFrame)
+- sklearn: mlflow.sklearn.load_model(...).predict_proba(contiguous float64 array)
+
+Fully offline: trains a small logistic regression, logs it to a throwaway
+file-based MLflow store and times per-batch latency for both paths.
+
+Run:
+    python -m app.scripts.bench_serving
+    python -m app.scripts.bench_serving --batches 1 8 64 512 --repeat 200
+"""
+import argparse
+import tempfile
+import time
+
+import mlflow
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+from sklearn.linear_model import LogisticRegression
+
+from app.serving.pool import LoadedModel, load_flavor
+
+FEATURES = ["age", "bp", "hr"]
+
+
+def _train_and_log(tracking_dir: str) -> str:
+    mlflow.set_tracking_uri(f"file://{tracking_dir}")
+    mlflow.set_experiment("bench_serving")
+    rng = np.random.default_rng(42)
+    X = pd.DataFrame({
+        "age": rng.integers(18, 80, 2000).astype(float),
+        "bp": rng.normal(120, 15, 2000),
+        "hr": rng.normal(72, 10, 2000),
+    })
+    y = ((X["age"] > 50) & (X["bp"] > 130)).astype(int)
+    with mlflow.start_run(run_name="bench_serving") as run:
+        mlflow.sklearn.log_model(LogisticRegression(max_iter=500).fit(X, y), "model")
+        return f"runs:/{run.info.run_id}/model"
+
+
+def _time_per_batch(entry: LoadedModel, df: pd.DataFrame, repeat: int) -> float:
+    entry.score(df)  # warm
+    t0 = time.perf_counter()
+    for _ in range(repeat):
+        entry.score(df)
+    return (time.perf_counter() - t0) * 1000.0 / repeat
+
+
+def run(batches, repeat: int):
+    with tempfile.TemporaryDirectory() as d:
+        uri = _train_and_log(d)
+        entries = {}
+        for flavor in ("pyfunc", "sklearn"):
+            model = load_flavor(uri, flavor=flavor)
+            entries[flavor] = LoadedModel(
+                "injury_risk", model, {}, 0.0, None, None,
+                flavor=flavor,
+                features=list(getattr(model, "feature_names_in_", FEATURES)),
+            )
+
+        rng = np.random.default_rng(0)
+        print(f"{'batch':>6} {'pyfunc ms':>10} {'sklearn ms':>11} {'speedup':>8}")
+        for n in batches:
+            df = pd.DataFrame(rng.normal(size=(n, len(FEATURES))) * 10 + 80, columns=FEATURES)
+            py = _time_per_batch(entries["pyfunc"], df, repeat)
+            sk = _time_per_batch(entries["sklearn"], df, repeat)
+            print(f"{n:>6} {py:>10.3f} {sk:>11.3f} {py / sk:>7.1f}x")
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--batches", type=int, nargs="+", default=[1, 8, 64, 512])
+    ap.add_argument("--repeat", type=int, default=200)
+    args = ap.parse_args()
+    run(args.batches, args.repeat)
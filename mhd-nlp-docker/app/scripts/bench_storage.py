@@ -0,0 +1,117 @@
+"""
+Compare storage backends on the operations the app actually does:
+
+- put:    put_many of N objects (seed scripts / migrations)
+- get:    get_many of the same objects
+- stream: open_raw chunked reads (downloads)
+- csv:    pd.read_csv over open_raw_file (train_from_blob ingestion)
+- train:  csv + train_basic against a throwaway MLflow store (--train)
+
+Payloads come from a seeded RNG, so runs are repeatable. memory and localfs
+need no services; s3/azure use the usual STORAGE_* / AZURE_* env.
+
+Run:
+    python -m app.scripts.bench_storage
+    python -m app.scripts.bench_storage --backends memory localfs s3 --objects 500 --size-kb 256
+"""
+import argparse
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+
+from app.db import storage
+
+
+def _payloads(n: int, size: int):
+    rng = np.random.default_rng(42)
+    return [(f"bench/obj-{i:05d}.bin", rng.bytes(size)) for i in range(n)]
+
+
+def _csv(rows: int) -> bytes:
+    rng = np.random.default_rng(7)
+    df = pd.DataFrame({
+        "age": rng.integers(18, 80, rows).astype(float),
+        "bp": rng.normal(120, 15, rows),
+        "hr": rng.normal(72, 10, rows),
+    })
+    df["target"] = ((df["age"] > 50) & (df["bp"] > 130)).astype(int)
+    return df.to_csv(index=False).encode("utf-8")
+
+
+def _timed(fn):
+    t0 = time.perf_counter()
+    out = fn()
+    return out, time.perf_counter() - t0
+
+
+def bench_backend(name: str, objects, csv_bytes: bytes, workers: int, train: bool):
+    storage.BACKEND = name
+    storage.storage_startup()
+    storage.ensure_buckets()
+    nbytes = sum(len(d) for _, d in objects)
+    keys = [k for k, _ in objects]
+    row = {"backend": name}
+
+    put = storage.put_many(objects, workers=workers)
+    row["put MB/s"] = put["mb_per_s"]
+
+    got = storage.get_many(keys, workers=workers)
+    row["get MB/s"] = got["mb_per_s"]
+    assert not put["failed"] and not got["failed"]
+
+    def _stream():
+        for k in keys:
+            for _ in storage.open_raw(k):
+                pass
+    _, secs = _timed(_stream)
+    row["stream MB/s"] = round(nbytes / 1e6 / secs, 2) if secs else 0.0
+
+    storage.put_raw("bench/train.csv", csv_bytes, content_type="text/csv")
+    df, secs = _timed(lambda: pd.read_csv(storage.open_raw_file("bench/train.csv")))
+    row["csv MB/s"] = round(len(csv_bytes) / 1e6 / secs, 2) if secs else 0.0
+
+    if train:
+        import mlflow
+        from app.pipelines.steps.train import train_basic
+
+        with tempfile.TemporaryDirectory() as d:
+            mlflow.set_tracking_uri(f"file://{d}")
+            mlflow.set_experiment("bench_storage")
+
+            def _read_and_train():
+                frame = pd.read_csv(storage.open_raw_file("bench/train.csv"))
+                with mlflow.start_run(run_name="bench_storage"):
+                    return train_basic(frame)
+            _, secs = _timed(_read_and_train)
+        row["train s"] = round(secs, 3)
+
+    row["rows"] = len(df)
+    return row
+
+
+def run(backends, n: int, size_kb: int, rows: int, workers: int, train: bool):
+    objects = _payloads(n, size_kb * 1024)
+    csv_bytes = _csv(rows)
+    with tempfile.TemporaryDirectory() as root:
+        storage.STORAGE_LOCAL_ROOT = root
+        results = [bench_backend(b, objects, csv_bytes, workers, train) for b in backends]
+
+    cols = [c for c in results[0] if c != "backend"]
+    print(f"{n} objects x {size_kb} KiB, csv {len(csv_bytes) / 1e6:.1f} MB, {workers} workers")
+    print(f"{'backend':>8} " + " ".join(f"{c:>11}" for c in cols))
+    for r in results:
+        print(f"{r['backend']:>8} " + " ".join(f"{r[c]:>11}" for c in cols))
+
+
+if __name__ == "__main__":
+    ap = argparse.ArgumentParser()
+    ap.add_argument("--backends", nargs="+", default=["memory", "localfs"])
+    ap.add_argument("--objects", type=int, default=200)
+    ap.add_argument("--size-kb", type=int, default=64)
+    ap.add_argument("--csv-rows", type=int, default=200_000)
+    ap.add_argument("--workers", type=int, default=storage.STORAGE_BULK_WORKERS)
+    ap.add_argument("--train", action="store_true")
+    args = ap.parse_args()
+    run(args.backends, args.objects, args.size_kb, args.csv_rows, args.workers, args.train)
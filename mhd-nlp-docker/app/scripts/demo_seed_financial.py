@@ -3,6 +3,7 @@
 from datetime import datetime, timedelta, timezone
 
 from app.db import db, users
+from app.services.auth_cache import user_cache
 
 fin_clients = db["financial_clients"]
 fin_alerts = db["financial_alerts"]
@@ -28,6 +29,9 @@ def seed_financial_demo():
         },
         upsert=True,
     )
+    # recorded in user_invalidations too, so running API processes drop the
+    # cached profile on their next revocation poll
+    user_cache.invalidate(email="demo_fin_1@mhd.local")
 
     # Clear old demo data for this org so you can re-run the script
     fin_clients.delete_many({"demo": True, "org_id": org_id})
@@ -1,6 +1,7 @@
 from datetime import datetime, timedelta, timezone
 import random
 from app.utils.slugify import ensure_form_slug
+from app.services.risk_latest import athlete_risk_latest, rebuild_athlete_risk_latest
 
 from pymongo import MongoClient
 
@@ -304,6 +305,10 @@ def seed_predictions_and_forms():
             form_doc = ensure_form_slug(form_doc, prefix="clearance")
             forms_coll.insert_one(form_doc)
 
+    # refresh the latest-risk-per-athlete view from the new demo predictions
+    athlete_risk_latest.delete_many({"athlete_id": {"$in": ATHLETE_USERNAMES}})
+    rebuild_athlete_risk_latest(predictions_coll)
+
     print("[seed] predictions + forms done.")
 
 
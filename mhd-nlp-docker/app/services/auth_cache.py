@@ -0,0 +1,258 @@
+# app/services/auth_cache.py
+# In-process caches for the auth dependency:
+#   - user_cache: TTL cache of the trimmed user profile keyed by token sub
+#   - revocations: revoked access/refresh jtis held in memory behind a Bloom
+#     filter, kept fresh by a change stream (or polling on a standalone
+#     mongod) plus optional Redis pub/sub between replicas
+# User invalidations are also written to user_invalidations, which the
+# revocation refresher polls, so scripts and other replicas reach every
+# process without Redis (within REVOCATION_POLL_S).
+import os
+import math
+import time
+import hashlib
+import threading
+from datetime import datetime, timezone
+from typing import Any, Dict, Optional
+
+from pymongo.errors import PyMongoError
+
+from app.db import db
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+AUTH_CACHE_REDIS = os.getenv("AUTH_CACHE_REDIS", "false").lower() == "true"
+AUTH_CHANNEL = os.getenv("AUTH_CACHE_CHANNEL", "auth:invalidate")
+USER_CACHE_TTL_S = float(os.getenv("USER_CACHE_TTL_S", "60"))
+USER_CACHE_MAX_ITEMS = int(os.getenv("USER_CACHE_MAX_ITEMS", "10000"))
+REVOCATION_POLL_S = float(os.getenv("REVOCATION_POLL_S", "5"))
+REVOCATION_RELOAD_S = float(os.getenv("REVOCATION_RELOAD_S", "300"))
+REVOCATION_BLOOM_CAPACITY = int(os.getenv("REVOCATION_BLOOM_CAPACITY", "100000"))
+USER_INVALIDATION_TTL_S = int(os.getenv("USER_INVALIDATION_TTL_S", "3600"))
+
+revoked_tokens = db["revoked_tokens"]
+user_invalidations = db["user_invalidations"]
+user_invalidations.create_index("ts", expireAfterSeconds=USER_INVALIDATION_TTL_S)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter; k indexes per key via double hashing of sha256."""
+
+    def __init__(self, capacity: int, fp_rate: float = 0.001):
+        capacity = max(capacity, 1)
+        self.m = max(8, int(-capacity * math.log(fp_rate) / (math.log(2) ** 2)))
+        self.k = max(1, round(self.m / capacity * math.log(2)))
+        self.bits = bytearray((self.m + 7) // 8)
+
+    def _indexes(self, key: str):
+        h = hashlib.sha256(key.encode()).digest()
+        h1 = int.from_bytes(h[:8], "big")
+        h2 = int.from_bytes(h[8:16], "big") | 1
+        return ((h1 + i * h2) % self.m for i in range(self.k))
+
+    def add(self, key: str):
+        for i in self._indexes(key):
+            self.bits[i >> 3] |= 1 << (i & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self.bits[i >> 3] & (1 << (i & 7)) for i in self._indexes(key))
+
+
+class UserCache:
+    def __init__(self, ttl_s: float = USER_CACHE_TTL_S, maxsize: int = USER_CACHE_MAX_ITEMS):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self._items: Dict[str, tuple[float, Dict[str, Any]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, sub: str) -> Optional[Dict[str, Any]]:
+        v = self._items.get(sub)
+        if v is None or v[0] < time.monotonic():
+            return None
+        return v[1]
+
+    def put(self, sub: str, profile: Dict[str, Any]):
+        with self._lock:
+            if len(self._items) >= self.maxsize:
+                # drop expired first, then the oldest insert
+                now = time.monotonic()
+                for k in [k for k, v in self._items.items() if v[0] < now] or [next(iter(self._items))]:
+                    self._items.pop(k, None)
+            self._items[sub] = (time.monotonic() + self.ttl_s, profile)
+
+    def invalidate(self, sub: Optional[str] = None, email: Optional[str] = None, publish: bool = True):
+        with self._lock:
+            if sub:
+                self._items.pop(sub, None)
+            if email:
+                for k in [k for k, v in self._items.items() if v[1].get("email") == email]:
+                    self._items.pop(k, None)
+        if publish:
+            _publish(f"user:{sub or ''}:{email or ''}")
+            try:
+                user_invalidations.insert_one({"sub": sub, "email": email, "ts": datetime.now(timezone.utc)})
+            except PyMongoError:
+                pass
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        return {"size": len(self._items), "maxsize": self.maxsize, "ttl_s": self.ttl_s}
+
+
+class RevocationSet:
+    def __init__(self, capacity: int = REVOCATION_BLOOM_CAPACITY):
+        self.capacity = capacity
+        self._jtis: set[str] = set()
+        self._bloom = BloomFilter(capacity)
+        self._last_id = None
+        self._last_user_id = None
+        self._lock = threading.Lock()
+        self.loaded = False
+        self.mode = "mongo"
+        self._started = False
+        self._can_watch = True
+
+    # ---------- lookups ----------
+
+    def is_revoked(self, jti: str) -> bool:
+        if not self.loaded:
+            return revoked_tokens.find_one({"jti": jti}) is not None
+        if jti not in self._bloom:
+            return False  # definite negative: the common case
+        return jti in self._jtis
+
+    def add(self, jti: str, publish: bool = True):
+        with self._lock:
+            self._jtis.add(jti)
+            self._bloom.add(jti)
+        if publish:
+            _publish(f"revoke:{jti}")
+
+    # ---------- loading ----------
+
+    def load(self):
+        """Full reload of unexpired revocations; rebuilds the Bloom filter."""
+        now = int(time.time())
+        jtis, last_id = set(), None
+        for d in revoked_tokens.find({"exp": {"$gte": now}}, {"jti": 1}).sort("_id", 1):
+            jtis.add(d["jti"])
+            last_id = d["_id"]
+        bloom = BloomFilter(max(self.capacity, len(jtis) * 2))
+        for j in jtis:
+            bloom.add(j)
+        with self._lock:
+            self._jtis, self._bloom = jtis, bloom
+            self._last_id = last_id or self._last_id
+            self.loaded = True
+        if self._last_user_id is None:
+            # older invalidations predate anything this process has cached
+            last = user_invalidations.find_one({}, {"_id": 1}, sort=[("_id", -1)])
+            self._last_user_id = last["_id"] if last else None
+        # anything written while the cursor was running has a larger _id
+        self.poll()
+
+    def poll(self):
+        q = {"_id": {"$gt": self._last_id}} if self._last_id is not None else {}
+        now = int(time.time())
+        for d in revoked_tokens.find(q, {"jti": 1, "exp": 1}).sort("_id", 1):
+            if d.get("exp", now) >= now:
+                self.add(d["jti"], publish=False)
+            self._last_id = d["_id"]
+        self.poll_users()
+
+    def poll_users(self):
+        """Apply user invalidations written by other processes since the last poll."""
+        q = {"_id": {"$gt": self._last_user_id}} if self._last_user_id is not None else {}
+        for d in user_invalidations.find(q).sort("_id", 1):
+            user_cache.invalidate(d.get("sub"), d.get("email"), publish=False)
+            self._last_user_id = d["_id"]
+
+    def start(self):
+        """Load once and keep fresh in a daemon thread; safe to call repeatedly."""
+        if self._started:
+            return
+        self._started = True
+        threading.Thread(target=self._run, name="revocation-refresh", daemon=True).start()
+        if AUTH_CACHE_REDIS:
+            threading.Thread(target=_subscribe, name="auth-cache-pubsub", daemon=True).start()
+
+    def _run(self):
+        last_reload = 0.0
+        while True:
+            try:
+                if time.monotonic() - last_reload >= REVOCATION_RELOAD_S:
+                    self.load()
+                    last_reload = time.monotonic()
+                if self._can_watch and self._watch(last_reload):
+                    continue
+                self.mode = "poll"
+                self.poll()
+            except Exception:
+                pass
+            time.sleep(REVOCATION_POLL_S)
+
+    def _watch(self, last_reload: float) -> bool:
+        # change streams need a replica set; returns False on a standalone mongod
+        try:
+            with revoked_tokens.watch(
+                [{"$match": {"operationType": {"$in": ["insert", "update", "replace"]}}}],
+                full_document="updateLookup",
+                max_await_time_ms=int(REVOCATION_POLL_S * 1000),
+            ) as stream:
+                self.mode = "change_stream"
+                self.poll()  # cover the gap between the last read and the stream opening
+                while stream.alive and time.monotonic() - last_reload < REVOCATION_RELOAD_S:
+                    change = stream.try_next()
+                    doc = (change or {}).get("fullDocument") or {}
+                    if doc.get("jti"):
+                        self.add(doc["jti"], publish=False)
+                    self.poll_users()
+        except PyMongoError:
+            self._can_watch = False
+            return False
+        return True
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "loaded": self.loaded,
+            "mode": self.mode,
+            "size": len(self._jtis),
+            "bloom_bits": self._bloom.m,
+            "bloom_hashes": self._bloom.k,
+        }
+
+
+user_cache = UserCache()
+revocations = RevocationSet()
+
+_redis = None
+if AUTH_CACHE_REDIS:
+    from redis import Redis
+    _redis = Redis.from_url(REDIS_URL)
+
+
+def _publish(msg: str):
+    if _redis is None:
+        return
+    try:
+        _redis.publish(AUTH_CHANNEL, msg)
+    except Exception:
+        pass
+
+
+def _subscribe():
+    while True:
+        try:
+            ps = _redis.pubsub(ignore_subscribe_messages=True)
+            ps.subscribe(AUTH_CHANNEL)
+            for m in ps.listen():
+                kind, _, rest = m["data"].decode().partition(":")
+                if kind == "revoke":
+                    revocations.add(rest, publish=False)
+                elif kind == "user":
+                    sub, _, email = rest.partition(":")
+                    user_cache.invalidate(sub or None, email or None, publish=False)
+        except Exception:
+            time.sleep(1)
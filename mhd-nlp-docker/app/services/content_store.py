@@ -0,0 +1,131 @@
+# app/services/content_store.py
+# Content-addressed raw objects. Bytes are stored once under
+# cas/sha256/<aa>/<bb>/<sha256>; blob_refs counts how many uploads rows point
+# at each blob, so storing a file that already exists is a metadata write.
+#
+# A ref doc moves through states: uploading -> stored -> deleting (GC). A
+# store never bumps a blob that GC is deleting, and GC never touches a blob
+# with refcount > 0, so the two can run concurrently.
+import os
+import time
+import hashlib
+from datetime import datetime, timedelta, timezone
+from typing import Any, BinaryIO, Dict, Optional, Tuple
+
+from pymongo import ReturnDocument
+from pymongo.errors import DuplicateKeyError
+
+from app.db import db
+from app.db.storage import put_raw_stream, delete_raw
+
+CAS_PREFIX = "cas/sha256"
+CAS_GC_GRACE_S = int(os.getenv("CAS_GC_GRACE_S", "86400"))
+HASH_CHUNK = 1024 * 1024
+
+blob_refs = db["blob_refs"]
+blob_refs.create_index([("refcount", 1), ("released_at", 1)])
+
+
+def _utcnow():
+    return datetime.now(timezone.utc)
+
+
+def cas_key(sha256: str) -> str:
+    return f"{CAS_PREFIX}/{sha256[:2]}/{sha256[2:4]}/{sha256}"
+
+
+def hash_stream(f: BinaryIO) -> Tuple[str, int]:
+    """sha256 and size of a seekable stream; leaves it rewound."""
+    f.seek(0)
+    h = hashlib.sha256()
+    n = 0
+    for chunk in iter(lambda: f.read(HASH_CHUNK), b""):
+        h.update(chunk)
+        n += len(chunk)
+    f.seek(0)
+    return h.hexdigest(), n
+
+
+def _ref(sha256: str, state: str, size: int, content_type: Optional[str]) -> Dict[str, Any]:
+    return {"sha256": sha256, "key": cas_key(sha256), "size": size,
+            "content_type": content_type, "dedup": state == "stored"}
+
+
+def put_stream(f: BinaryIO, sha256: str, size: int, content_type: Optional[str] = None,
+               retries: int = 20) -> Dict[str, Any]:
+    """
+    Reference (and if needed upload) the blob for already-hashed content.
+    Returns {"sha256", "key", "size", "content_type", "dedup"}; dedup=True
+    means no bytes were sent.
+    """
+    now = _utcnow()
+    # fast path: the bytes are already there
+    ref = blob_refs.find_one_and_update(
+        {"_id": sha256, "state": "stored"},
+        {"$inc": {"refcount": 1}, "$set": {"last_ref_at": now}, "$unset": {"released_at": ""}},
+    )
+    if ref is not None:
+        return _ref(sha256, "stored", size, content_type)
+
+    for _ in range(retries):
+        try:
+            blob_refs.update_one(
+                {"_id": sha256, "state": {"$ne": "deleting"}},
+                {
+                    "$inc": {"refcount": 1},
+                    "$set": {"last_ref_at": now, "key": cas_key(sha256), "size": size},
+                    "$setOnInsert": {"state": "uploading", "content_type": content_type, "created_at": now},
+                    "$unset": {"released_at": ""},
+                },
+                upsert=True,
+            )
+            break
+        except DuplicateKeyError:
+            time.sleep(0.05)  # GC is removing this blob; it recreates cleanly once done
+    else:
+        raise RuntimeError(f"blob {sha256} stuck in GC")
+
+    try:
+        f.seek(0)
+        put_raw_stream(cas_key(sha256), f, content_type=content_type, length=size)
+    except Exception:
+        release(sha256)
+        raise
+    blob_refs.update_one({"_id": sha256}, {"$set": {"state": "stored"}})
+    return _ref(sha256, "uploading", size, content_type)
+
+
+def release(sha256: str) -> Optional[int]:
+    """Drop one reference; returns the remaining count (None if unknown)."""
+    ref = blob_refs.find_one_and_update(
+        {"_id": sha256, "refcount": {"$gt": 0}},
+        {"$inc": {"refcount": -1}},
+        return_document=ReturnDocument.AFTER,
+    )
+    if ref is None:
+        return None
+    if ref["refcount"] <= 0:
+        blob_refs.update_one({"_id": sha256, "refcount": {"$lte": 0}}, {"$set": {"released_at": _utcnow()}})
+    return ref["refcount"]
+
+
+def gc_unreferenced(grace_s: int = CAS_GC_GRACE_S, limit: int = 1000) -> int:
+    """Delete blobs nobody has referenced for grace_s seconds."""
+    cutoff = _utcnow() - timedelta(seconds=grace_s)
+    n = 0
+    for _ in range(limit):
+        ref = blob_refs.find_one_and_update(
+            {"refcount": {"$lte": 0}, "released_at": {"$lt": cutoff}, "state": {"$ne": "deleting"}},
+            {"$set": {"state": "deleting"}},
+        )
+        if ref is None:
+            break
+        try:
+            delete_raw(ref["key"])
+        except Exception:
+            # leave it for the next run
+            blob_refs.update_one({"_id": ref["_id"]}, {"$set": {"state": ref.get("state", "stored")}})
+            continue
+        blob_refs.delete_one({"_id": ref["_id"], "state": "deleting"})
+        n += 1
+    return n
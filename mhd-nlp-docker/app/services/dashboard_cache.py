@@ -0,0 +1,152 @@
+# app/services/dashboard_cache.py
+# Short-TTL cache for dashboard template contexts, keyed per user (athlete
+# view) or per org (vertical views). In-process LRU, optionally backed by
+# Redis so replicas share renders. Routes that write data shown on a
+# dashboard call invalidate_user / invalidate_org right after the write.
+# The athlete dashboard also shows activity_logs, which are buffered by the
+# audit pipeline, so invalidate_user flushes it first; otherwise the next
+# render would cache a feed missing the route's own log entry.
+import os
+import time
+import pickle
+import threading
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+from app.utils.audit_pipeline import audit_pipeline
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+DASHBOARD_CACHE_ENABLED = os.getenv("DASHBOARD_CACHE_ENABLED", "true").lower() == "true"
+DASHBOARD_CACHE_REDIS = os.getenv("DASHBOARD_CACHE_REDIS", "false").lower() == "true"
+DASHBOARD_CACHE_TTL_S = float(os.getenv("DASHBOARD_CACHE_TTL_S", "15"))
+DASHBOARD_CACHE_MAX_ITEMS = int(os.getenv("DASHBOARD_CACHE_MAX_ITEMS", "1024"))
+
+
+def user_key(username: str) -> str:
+    return f"dash:user:{username}"
+
+
+def org_key(org_id: Optional[str]) -> str:
+    return f"dash:org:{org_id or '-'}"
+
+
+class RenderCache:
+    def __init__(
+        self,
+        ttl_s: float = DASHBOARD_CACHE_TTL_S,
+        maxsize: int = DASHBOARD_CACHE_MAX_ITEMS,
+        use_redis: bool = DASHBOARD_CACHE_REDIS,
+        enabled: bool = DASHBOARD_CACHE_ENABLED,
+    ):
+        self.ttl_s = ttl_s
+        self.maxsize = maxsize
+        self.enabled = enabled
+        self._lru: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._redis = None
+        if use_redis:
+            from redis import Redis
+            self._redis = Redis.from_url(REDIS_URL)
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        if not self.enabled:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            v = self._lru.get(key)
+            if v is not None and v[0] > now:
+                self._lru.move_to_end(key)
+                self.hits += 1
+                return v[1]
+            if v is not None:
+                del self._lru[key]
+
+        if self._redis is not None:
+            try:
+                raw = self._redis.get(key)
+            except Exception:
+                raw = None
+            if raw is not None:
+                ctx = pickle.loads(raw)
+                with self._lock:
+                    self._set_local(key, ctx, now)
+                    self.hits += 1
+                return ctx
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, ctx: Dict[str, Any]):
+        if not self.enabled:
+            return
+        with self._lock:
+            self._set_local(key, ctx, time.monotonic())
+        if self._redis is not None:
+            try:
+                self._redis.setex(key, max(int(self.ttl_s), 1), pickle.dumps(ctx))
+            except Exception:
+                pass
+
+    def get_or_build(self, key: str, build: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        ctx = self.get(key)
+        if ctx is None:
+            ctx = build()
+            self.put(key, ctx)
+        return ctx
+
+    async def aget_or_build(self, key: str, build: Callable[[], Awaitable[Dict[str, Any]]]) -> Dict[str, Any]:
+        ctx = self.get(key)
+        if ctx is None:
+            ctx = await build()
+            self.put(key, ctx)
+        return ctx
+
+    def invalidate(self, key: str):
+        # other replicas' local copies still expire within ttl_s
+        with self._lock:
+            self._lru.pop(key, None)
+            self.invalidations += 1
+        if self._redis is not None:
+            try:
+                self._redis.delete(key)
+            except Exception:
+                pass
+
+    def _set_local(self, key: str, ctx: Dict[str, Any], now: float):
+        self._lru[key] = (now + self.ttl_s, ctx)
+        self._lru.move_to_end(key)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "enabled": self.enabled,
+                "size": len(self._lru),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "redis": self._redis is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+dashboard_cache = RenderCache()
+
+
+def invalidate_user(username: Optional[str]):
+    if username:
+        if audit_pipeline.running:
+            audit_pipeline.flush()
+        dashboard_cache.invalidate(user_key(username))
+
+
+def invalidate_org(org_id: Optional[str]):
+    dashboard_cache.invalidate(org_key(org_id))
@@ -0,0 +1,133 @@
+# app/services/dashboard_data.py
+# Async data access for the dashboard routes. Each fetch_* issues its
+# independent Mongo queries concurrently on the Motor client, so a page
+# costs max(query) instead of sum(query) and never blocks the event loop.
+# Callers get raw documents back and do their own shaping.
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from app.db.mongo_async import db as adb
+from app.services.risk_latest import (
+    HIGH_RISK,
+    bucket_counts_pipeline,
+    bucket_counts_from_rows,
+    needs_clearance_query,
+)
+
+# ---- athlete ----
+uploads = adb["uploads"]
+medical_history = adb["medical_history"]
+equipment = adb["equipment"]
+training = adb["training"]
+weightroom = adb["weightroom"]
+activity_logs = adb["activity_logs"]
+
+# ---- trainer ----
+predictions = adb["predictions"]
+athlete_risk_latest = adb["athlete_risk_latest"]
+clearance = adb["clearance"]
+forms = adb["forms"]
+
+# ---- industry ----
+oil_incidents = adb["oil_gas_incidents"]
+oil_permits = adb["oil_gas_permits"]
+oil_trainings = adb["oil_gas_trainings"]
+
+fin_clients = adb["financial_clients"]
+fin_alerts = adb["financial_alerts"]
+fin_kyc = adb["financial_kyc"]
+
+law_matters = adb["law_matters"]
+law_deadlines = adb["law_deadlines"]
+law_signatures = adb["law_signatures"]
+
+
+def _demo_filter(org_id: Optional[str]) -> Dict[str, Any]:
+    return {"demo": True, **({"org_id": org_id} if org_id else {})}
+
+
+async def fetch_athlete(username: str) -> Dict[str, Any]:
+    q = {"username": username}
+    (
+        recent_docs, doc_count, medical, user_equipment,
+        training_logs, training_count, weightroom_stats, activity,
+    ) = await asyncio.gather(
+        uploads.find(q).sort("upload_date", -1).to_list(10),
+        uploads.count_documents(q),
+        medical_history.find_one(q),
+        equipment.find_one(q),
+        training.find(q).sort("_id", -1).to_list(5),
+        training.count_documents(q),
+        weightroom.find_one(q),
+        activity_logs.find({"user_id": username}).sort("_id", -1).to_list(5),
+    )
+    return {
+        "recent_docs": recent_docs,
+        "doc_count": doc_count,
+        "medical": medical or {},
+        "equipment": user_equipment or {},
+        "training_logs": training_logs,
+        "training_count": training_count,
+        "weightroom": weightroom_stats or {},
+        "activity": activity,
+    }
+
+
+async def fetch_oil_gas(org_id: Optional[str]) -> Dict[str, List[Dict[str, Any]]]:
+    q = _demo_filter(org_id)
+    incidents, permits, trainings = await asyncio.gather(
+        oil_incidents.find(q).sort("ts", -1).to_list(50),
+        oil_permits.find(q).to_list(50),
+        oil_trainings.find(q).to_list(100),
+    )
+    return {"incidents": incidents, "permits": permits, "trainings": trainings}
+
+
+async def fetch_financial(org_id: Optional[str]) -> Dict[str, List[Dict[str, Any]]]:
+    q = _demo_filter(org_id)
+    clients, alerts, kyc = await asyncio.gather(
+        fin_clients.find(q).to_list(200),
+        fin_alerts.find(q).sort("ts", -1).to_list(100),
+        fin_kyc.find(q).to_list(100),
+    )
+    return {"clients": clients, "alerts": alerts, "kyc": kyc}
+
+
+async def fetch_law(org_id: Optional[str]) -> Dict[str, List[Dict[str, Any]]]:
+    q = _demo_filter(org_id)
+    matters, deadlines, signatures = await asyncio.gather(
+        law_matters.find(q).to_list(200),
+        law_deadlines.find(q).to_list(200),
+        law_signatures.find(q).to_list(200),
+    )
+    return {"matters": matters, "deadlines": deadlines, "signatures": signatures}
+
+
+async def _needs_clearance(now: datetime, since: datetime, limit: int) -> List[Dict[str, Any]]:
+    # depends on the active overrides, so these two run in sequence
+    cleared = await clearance.find({"cleared_until": {"$gte": now}}).to_list(None)
+    cleared_ids = {d.get("athlete_id") for d in cleared if d.get("athlete_id")}
+    q = needs_clearance_query(since, cleared_ids)
+    return await athlete_risk_latest.find(q).sort("score", -1).to_list(limit)
+
+
+async def fetch_trainer(now: datetime, since: datetime, facet_pipeline: List[Dict[str, Any]]) -> Dict[str, Any]:
+    facets, bucket_rows, live_high, needs_clearance, pending_forms = await asyncio.gather(
+        predictions.aggregate(facet_pipeline).to_list(1),
+        athlete_risk_latest.aggregate(bucket_counts_pipeline(since)).to_list(None),
+        predictions.find({
+            "use_case": "injury_risk",
+            "score": {"$gte": HIGH_RISK},
+            "ts": {"$gte": since},
+        }).sort("ts", -1).to_list(25),
+        _needs_clearance(now, since, 20),
+        forms.find({"status": {"$in": ["pending", "in_review"]}}).sort("created_at", -1).to_list(15),
+    )
+    return {
+        "facets": facets[0] if facets else {},
+        "risk_counts": bucket_counts_from_rows(bucket_rows),
+        "live_high": live_high,
+        "needs_clearance": needs_clearance,
+        "pending_forms": pending_forms,
+    }
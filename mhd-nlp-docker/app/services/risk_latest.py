@@ -0,0 +1,133 @@
+from __future__ import annotations
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional
+
+from pymongo import UpdateOne
+from pymongo.errors import BulkWriteError
+
+from app.db import db
+
+# One document per athlete: their most recent injury-risk prediction.
+# Maintained on every prediction write, so dashboards read it instead of
+# re-deriving "latest per athlete" from the raw prediction history.
+athlete_risk_latest = db["athlete_risk_latest"]
+athlete_risk_latest.create_index("athlete_id", unique=True)
+athlete_risk_latest.create_index([("score", -1)])
+athlete_risk_latest.create_index([("ts", -1), ("bucket", 1)])
+
+# same thresholds as the trainer dashboard
+HIGH_RISK = 0.8
+MED_RISK = 0.5
+
+DUPLICATE_KEY = 11000
+
+
+def risk_bucket(score: float) -> str:
+    if score >= HIGH_RISK:
+        return "high"
+    if score >= MED_RISK:
+        return "med"
+    return "low"
+
+
+def _view_doc(p: Dict[str, Any]) -> Dict[str, Any]:
+    meta = p.get("meta") or {}
+    score = float(p.get("score", 0.0))
+    return {
+        "athlete_id": p["athlete_id"],
+        "org_id": p.get("org_id"),
+        "score": score,
+        "bucket": risk_bucket(score),
+        "ts": p["ts"],
+        "run_id": p.get("run_id"),
+        "model_version": p.get("model_version"),
+        "meta": meta,
+        # lifted out of meta so the needs-clearance filter can use an index
+        "recent_injury_flag": bool(meta.get("recent_injury_flag")),
+        "prediction_id": p.get("_id"),
+    }
+
+
+def record_risk_predictions(preds: Iterable[Dict[str, Any]]) -> int:
+    """
+    Upsert each athlete's newest prediction into athlete_risk_latest.
+
+    Upsert-if-newer: the filter only matches a stored row that is not newer
+    than the incoming one; if a newer row exists the upsert collides on the
+    unique athlete_id index and is dropped. Returns the number of athletes touched.
+    """
+    latest: Dict[str, Dict[str, Any]] = {}
+    for p in preds:
+        aid = p.get("athlete_id")
+        if aid is None or p.get("ts") is None:
+            continue
+        if aid not in latest or p["ts"] >= latest[aid]["ts"]:
+            latest[aid] = p
+    if not latest:
+        return 0
+
+    ops = [
+        UpdateOne({"athlete_id": aid, "ts": {"$lte": p["ts"]}}, {"$set": _view_doc(p)}, upsert=True)
+        for aid, p in latest.items()
+    ]
+    try:
+        athlete_risk_latest.bulk_write(ops, ordered=False)
+    except BulkWriteError as e:
+        if any(err.get("code") != DUPLICATE_KEY for err in e.details.get("writeErrors", [])):
+            raise
+    return len(ops)
+
+
+def rebuild_athlete_risk_latest(source=None) -> int:
+    """Recompute the view from a prediction collection (default: predictions)."""
+    source = db["predictions"] if source is None else source
+    rows = source.aggregate([
+        {"$match": {"use_case": "injury_risk", "athlete_id": {"$ne": None}}},
+        {"$sort": {"ts": 1}},
+        {"$group": {"_id": "$athlete_id", "doc": {"$last": "$$ROOT"}}},
+    ])
+    return record_risk_predictions(r["doc"] for r in rows)
+
+
+# ---------- readers (single indexed reads) ----------
+
+def _window(since: Optional[datetime]) -> Dict[str, Any]:
+    return {"ts": {"$gte": since}} if since else {}
+
+
+def top_risk(limit: int = 20, since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    return list(athlete_risk_latest.find(_window(since)).sort("score", -1).limit(limit))
+
+
+def bucket_counts_pipeline(since: Optional[datetime] = None) -> List[Dict[str, Any]]:
+    return [
+        {"$match": _window(since)},
+        {"$group": {"_id": "$bucket", "n": {"$sum": 1}}},
+    ]
+
+
+def bucket_counts_from_rows(rows: Iterable[Dict[str, Any]]) -> Dict[str, int]:
+    counts = {"high": 0, "med": 0, "low": 0}
+    for r in rows:
+        counts[r["_id"]] = r["n"]
+    return counts
+
+
+def risk_bucket_counts(since: Optional[datetime] = None) -> Dict[str, int]:
+    return bucket_counts_from_rows(athlete_risk_latest.aggregate(bucket_counts_pipeline(since)))
+
+
+def needs_clearance_query(since: Optional[datetime] = None, exclude_ids: Iterable[str] = ()) -> Dict[str, Any]:
+    q: Dict[str, Any] = {
+        **_window(since),
+        "$or": [{"score": {"$gte": HIGH_RISK}}, {"recent_injury_flag": True}],
+    }
+    exclude = list(exclude_ids)
+    if exclude:
+        q["athlete_id"] = {"$nin": exclude}
+    return q
+
+
+def needs_clearance(since: Optional[datetime] = None, exclude_ids: Iterable[str] = (), limit: int = 20) -> List[Dict[str, Any]]:
+    q = needs_clearance_query(since, exclude_ids)
+    return list(athlete_risk_latest.find(q).sort("score", -1).limit(limit))
@@ -0,0 +1,148 @@
+# app/serving/batcher.py
+# asyncio micro-batcher: concurrent small predict calls are queued for up to
+# max_wait_ms (or until max_batch_rows rows are waiting), scored with ONE
+# vectorized call in a worker thread, and the results scattered back.
+import os
+import asyncio
+import threading
+from bisect import bisect_left
+from typing import Any, Callable, Dict, List, Optional
+
+# upper bounds (rows per flushed batch); last bucket is +Inf
+HIST_BUCKETS = [1, 2, 4, 8, 16, 32, 64, 128, 256]
+
+
+class QueueFull(Exception):
+    """Raised by submit() when more than max_queue_rows rows are already waiting."""
+
+
+class MicroBatcher:
+    def __init__(
+        self,
+        fn: Callable[[List[Any]], List[Any]],
+        name: str,
+        max_wait_ms: float = 5.0,
+        max_batch_rows: int = 64,
+        max_queue_rows: int = 2048,
+    ):
+        """
+        fn takes the concatenated rows of every request in a batch and returns one
+        result per row, in order. It runs in a thread so the event loop never
+        blocks on the model.
+        """
+        self.fn = fn
+        self.name = name
+        self.max_wait = max_wait_ms / 1000.0
+        self.max_batch_rows = max_batch_rows
+        self.max_queue_rows = max_queue_rows
+
+        self._queue: Optional[asyncio.Queue] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._task: Optional[asyncio.Task] = None
+        self._pending_rows = 0
+
+        self._stats_lock = threading.Lock()
+        self._hist = [0] * (len(HIST_BUCKETS) + 1)
+        self._batches = 0
+        self._rows = 0
+        self._requests = 0
+        self._rejected = 0
+
+    # ---------- public ----------
+
+    async def submit(self, rows: List[Any]) -> List[Any]:
+        if not rows:
+            return []
+        if self._pending_rows + len(rows) > self.max_queue_rows:
+            with self._stats_lock:
+                self._rejected += 1
+            raise QueueFull(f"{self.name}: {self._pending_rows} rows already queued")
+
+        self._ensure_worker()
+        fut = self._loop.create_future()
+        self._pending_rows += len(rows)
+        await self._queue.put((rows, fut))
+        return await fut
+
+    def stats(self) -> Dict[str, Any]:
+        with self._stats_lock:
+            buckets = {str(b): n for b, n in zip(HIST_BUCKETS, self._hist)}
+            buckets["+Inf"] = self._hist[-1]
+            return {
+                "name": self.name,
+                "max_wait_ms": self.max_wait * 1000.0,
+                "max_batch_rows": self.max_batch_rows,
+                "max_queue_rows": self.max_queue_rows,
+                "queue_rows": self._pending_rows,
+                "batches": self._batches,
+                "requests": self._requests,
+                "rows": self._rows,
+                "rejected": self._rejected,
+                "avg_batch_rows": (self._rows / self._batches) if self._batches else 0.0,
+                "batch_rows_hist": buckets,
+            }
+
+    # ---------- worker ----------
+
+    def _ensure_worker(self):
+        loop = asyncio.get_running_loop()
+        # (re)bind to the current loop; TestClient and reloads spin up new ones
+        if self._loop is not loop or self._task is None or self._task.done():
+            self._loop = loop
+            self._queue = asyncio.Queue()
+            self._pending_rows = 0
+            self._task = loop.create_task(self._run())
+
+    async def _run(self):
+        q = self._queue
+        while True:
+            batch = [await q.get()]
+            n = len(batch[0][0])
+            deadline = self._loop.time() + self.max_wait
+            while n < self.max_batch_rows:
+                remaining = deadline - self._loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    item = await asyncio.wait_for(q.get(), timeout=remaining)
+                except asyncio.TimeoutError:
+                    break
+                batch.append(item)
+                n += len(item[0])
+            self._pending_rows -= n
+            await self._flush(batch, n)
+
+    async def _flush(self, batch, n: int):
+        rows = [r for rows, _ in batch for r in rows]
+        try:
+            results = await asyncio.to_thread(self.fn, rows)
+        except Exception as e:
+            for _, fut in batch:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        self._record(len(batch), n)
+        i = 0
+        for req_rows, fut in batch:
+            if not fut.done():
+                fut.set_result(list(results[i:i + len(req_rows)]))
+            i += len(req_rows)
+
+    def _record(self, n_requests: int, n_rows: int):
+        with self._stats_lock:
+            self._hist[bisect_left(HIST_BUCKETS, n_rows)] += 1
+            self._batches += 1
+            self._requests += n_requests
+            self._rows += n_rows
+
+
+def batcher_from_env(fn: Callable[[List[Any]], List[Any]], name: str, prefix: str) -> MicroBatcher:
+    """Build a batcher tuned by <prefix>_MAX_WAIT_MS / _MAX_ROWS / _MAX_QUEUE_ROWS."""
+    return MicroBatcher(
+        fn,
+        name=name,
+        max_wait_ms=float(os.getenv(f"{prefix}_MAX_WAIT_MS", "5")),
+        max_batch_rows=int(os.getenv(f"{prefix}_MAX_ROWS", "64")),
+        max_queue_rows=int(os.getenv(f"{prefix}_MAX_QUEUE_ROWS", "2048")),
+    )
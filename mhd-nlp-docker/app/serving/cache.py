@@ -0,0 +1,166 @@
+# app/serving/cache.py
+# Prediction result cache: key = sha256(feature row as float64 bytes in the
+# model's trained column order) scoped by the served model (uri, version,
+# run_id; see model_key). In-process LRU + TTL, optionally shared across
+# replicas through Redis; flushed whenever the model pool swaps the entry.
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional
+
+import numpy as np
+import pandas as pd
+
+from app.serving.pool import model_pool
+
+REDIS_URL = os.getenv("REDIS_URL", "redis://redis:6379")
+CACHE_USE_REDIS = os.getenv("PREDICTION_CACHE_REDIS", "false").lower() == "true"
+CACHE_MAX_ITEMS = int(os.getenv("PREDICTION_CACHE_MAX_ITEMS", "50000"))
+CACHE_TTL_S = int(os.getenv("PREDICTION_CACHE_TTL_S", "3600"))
+
+
+class PredictionCache:
+    def __init__(self, name: str, maxsize: int = CACHE_MAX_ITEMS, ttl_s: int = CACHE_TTL_S, use_redis: bool = CACHE_USE_REDIS):
+        self.name = name
+        self.maxsize = maxsize
+        self.ttl_s = ttl_s
+        self._lru: "OrderedDict[str, tuple[float, float]]" = OrderedDict()
+        self._model: Optional[str] = None
+        self._lock = threading.Lock()
+        self._redis = None
+        if use_redis:
+            from redis import Redis
+            self._redis = Redis.from_url(REDIS_URL)
+        self.hits = 0
+        self.misses = 0
+
+    # ---------- keys ----------
+
+    def keys_for(self, X: np.ndarray, model: str) -> List[str]:
+        # +0.0 folds -0.0 into 0.0 so equal vectors always hash equal
+        X = np.ascontiguousarray(X, dtype=np.float64) + 0.0
+        prefix = f"predcache:{self.name}:{model}:"
+        return [prefix + hashlib.sha256(row.tobytes()).hexdigest() for row in X]
+
+    def _check_model(self, model: str):
+        # keys are model-scoped, so a new deployment can never hit old entries;
+        # dropping them just frees the memory right away
+        if model != self._model:
+            self._lru.clear()
+            self._model = model
+
+    def clear(self):
+        with self._lock:
+            self._lru.clear()
+            self._model = None
+
+    # ---------- lookups ----------
+
+    def get_many(self, keys: List[str], model: str) -> List[Optional[float]]:
+        now = time.monotonic()
+        out: List[Optional[float]] = []
+        with self._lock:
+            self._check_model(model)
+            for k in keys:
+                v = self._lru.get(k)
+                if v is not None and v[1] > now:
+                    self._lru.move_to_end(k)
+                    out.append(v[0])
+                else:
+                    if v is not None:
+                        del self._lru[k]
+                    out.append(None)
+
+        missing = [i for i, v in enumerate(out) if v is None]
+        if missing and self._redis is not None:
+            try:
+                remote = self._redis.mget([keys[i] for i in missing])
+            except Exception:
+                remote = [None] * len(missing)
+            with self._lock:
+                for i, raw in zip(missing, remote):
+                    if raw is not None:
+                        out[i] = float(raw)
+                        self._set_local(keys[i], out[i], now)
+
+        n_hit = sum(v is not None for v in out)
+        with self._lock:
+            self.hits += n_hit
+            self.misses += len(out) - n_hit
+        return out
+
+    def put_many(self, keys: List[str], values: List[float], model: str):
+        now = time.monotonic()
+        with self._lock:
+            self._check_model(model)
+            for k, v in zip(keys, values):
+                self._set_local(k, float(v), now)
+        if self._redis is not None:
+            try:
+                pipe = self._redis.pipeline(transaction=False)
+                for k, v in zip(keys, values):
+                    pipe.setex(k, self.ttl_s, repr(float(v)))
+                pipe.execute()
+            except Exception:
+                pass
+
+    def _set_local(self, k: str, v: float, now: float):
+        self._lru[k] = (v, now + self.ttl_s)
+        self._lru.move_to_end(k)
+        while len(self._lru) > self.maxsize:
+            self._lru.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "name": self.name,
+                "model": self._model,
+                "size": len(self._lru),
+                "maxsize": self.maxsize,
+                "ttl_s": self.ttl_s,
+                "redis": self._redis is not None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": (self.hits / total) if total else 0.0,
+            }
+
+
+def model_key(meta: Dict[str, Any]) -> str:
+    """Identity of the served model: artifact uri, registry version and run."""
+    parts = [meta.get("model_uri"), meta.get("model_version"), meta.get("run_id")]
+    return "|".join(str(p) for p in parts if p is not None)
+
+
+def score_cached(cache: PredictionCache, loaded, df: pd.DataFrame) -> np.ndarray:
+    """
+    loaded.score(df) with per-row caching: only rows not seen for this model
+    are sent to the model.
+    """
+    model = model_key(loaded.meta)
+    keys = cache.keys_for(df[loaded.features].to_numpy(dtype=np.float64), model)
+    found = cache.get_many(keys, model)
+
+    missing = [i for i, v in enumerate(found) if v is None]
+    if missing:
+        fresh = np.asarray(loaded.score(df.iloc[missing]), dtype=np.float64)
+        cache.put_many([keys[i] for i in missing], fresh.tolist(), model)
+        for i, v in zip(missing, fresh):
+            found[i] = float(v)
+    return np.asarray(found, dtype=np.float64)
+
+
+risk_cache = PredictionCache("injury_risk")
+session_cache = PredictionCache("session_quality")
+CACHES = {"injury_risk": risk_cache, "session_quality": session_cache}
+
+
+def flush_on_swap(use_case: str, entry=None):
+    cache = CACHES.get(use_case)
+    if cache is not None:
+        cache.clear()
+
+
+model_pool.on_swap(flush_on_swap)
@@ -0,0 +1,346 @@
+# app/serving/pool.py
+# Resident model pool: one Production model per use case, loaded once at startup,
+# warmed with a dummy batch and shared across requests with reference counting.
+# Borrowing an entry older than MODEL_POOL_REFRESH_S kicks off a background
+# check of the Production version (or per-use-case manifest); a new
+# deployment is loaded off the request path and swapped in atomically.
+import os
+import json
+import time
+import asyncio
+import warnings
+import threading
+import tracemalloc
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from datetime import datetime, timezone
+from typing import Any, Callable, Dict, List, Optional
+
+import mlflow
+import mlflow.sklearn
+import numpy as np
+import pandas as pd
+from mlflow.tracking import MlflowClient
+
+from app.pipelines.model_loader import REGISTRY_DIR, load_latest_or_production
+
+SESSION_FEATURES = [
+    "sets", "reps", "rpe", "rest_s", "completed_pct",
+    "nlp_fatigue", "nlp_pain_any", "nlp_sleep_poor",
+    "nlp_mood_neg", "nlp_compliance_issues",
+]
+
+# each use case resolves its own registered model, never the shared deployed.json
+USE_CASES: Dict[str, Dict[str, Any]] = {
+    "injury_risk": {
+        "model_name": os.getenv("INJURY_MODEL_NAME", "injury_risk_logreg"),
+        "features": ["age", "bp", "hr"],
+    },
+    "session_quality": {
+        "model_name": os.getenv("SESSION_MODEL_NAME", "session_quality_rf"),
+        "features": SESSION_FEATURES,
+    },
+}
+
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+# sklearn: load the native estimator and call it on a NumPy array (fast path)
+# pyfunc:  mlflow.pyfunc wrapper with schema enforcement + DataFrame conversion
+SERVING_FLAVOR = os.getenv("MODEL_SERVING_FLAVOR", "sklearn").lower()
+WARMUP_ROWS = int(os.getenv("MODEL_WARMUP_ROWS", "8"))
+POOL_REFRESH_S = float(os.getenv("MODEL_POOL_REFRESH_S", "30"))  # 0 disables reloads
+# exact per-load allocation via tracemalloc; slows every thread while a load runs
+POOL_TRACE_ALLOC = os.getenv("MODEL_POOL_TRACE_ALLOC", "false").lower() == "true"
+
+
+def manifest_path(use_case: str) -> str:
+    return os.path.join(REGISTRY_DIR, f"deployed_{use_case}.json")
+
+
+@dataclass
+class LoadedModel:
+    use_case: str
+    model: Any
+    meta: Dict[str, Any]
+    load_ms: float
+    warmup_ms: Optional[float]
+    mem_bytes: Optional[int]
+    loaded_at: datetime = field(default_factory=lambda: datetime.now(timezone.utc))
+    refs: int = 0
+    flavor: str = "pyfunc"
+    features: List[str] = field(default_factory=list)
+    checked_at: float = field(default_factory=time.monotonic)
+
+    @property
+    def signature(self) -> tuple:
+        return (self.meta.get("source"), str(self.meta.get("model_version")), self.meta.get("run_id"))
+
+    def score(self, df: pd.DataFrame) -> np.ndarray:
+        """
+        Positive-class probability for classifiers, prediction for regressors.
+        The sklearn flavor gets a contiguous float64 array in the trained column
+        order; pyfunc gets the DataFrame (its wrapper has no predict_proba).
+        """
+        if self.flavor != "sklearn":
+            return np.asarray(self.model.predict(df[self.features]))
+        X = np.ascontiguousarray(df[self.features].to_numpy(dtype=np.float64))
+        with warnings.catch_warnings():
+            # fitted on a DataFrame; column order is already enforced above
+            warnings.filterwarnings("ignore", message="X does not have valid feature names")
+            if hasattr(self.model, "predict_proba"):
+                return self.model.predict_proba(X)[:, 1]
+            return self.model.predict(X)
+
+
+def _resolve_production(model_name: str):
+    """Load models:/<name>/<version> for the current Production version of model_name."""
+    client = MlflowClient()
+    vers = client.get_latest_versions(model_name, stages=["Production"])
+    if not vers:
+        raise RuntimeError(f"No Production version for {model_name}")
+    v = max(vers, key=lambda mv: int(mv.version))
+    uri = f"models:/{model_name}/{v.version}"
+    return load_flavor(uri), {
+        "run_id": v.run_id,
+        "model_uri": uri,
+        "model_version": v.version,
+        "model_name": model_name,
+        "source": "registry",
+    }
+
+
+def _production_signature(model_name: str) -> Optional[tuple]:
+    """(source, version, run_id) of what load() would serve now; cheap metadata calls only."""
+    try:
+        vers = MlflowClient().get_latest_versions(model_name, stages=["Production"])
+    except Exception:
+        vers = []
+    if vers:
+        v = max(vers, key=lambda mv: int(mv.version))
+        return ("registry", str(v.version), v.run_id)
+    return None
+
+
+def _manifest_signature(use_case: str) -> Optional[tuple]:
+    try:
+        with open(manifest_path(use_case)) as f:
+            m = json.load(f)
+    except (OSError, ValueError):
+        return None
+    return ("manifest", str(m.get("model_version")), m.get("run_id"))
+
+
+def load_flavor(uri: str, flavor: str = None):
+    """Load uri as a native sklearn estimator when possible, else as pyfunc."""
+    if (flavor or SERVING_FLAVOR) == "sklearn":
+        try:
+            return mlflow.sklearn.load_model(uri)
+        except Exception:
+            # not logged with the sklearn flavor
+            pass
+    return mlflow.pyfunc.load_model(uri)
+
+
+def _is_native(model) -> bool:
+    return not isinstance(model, mlflow.pyfunc.PyFuncModel)
+
+
+_PAGE_SIZE = os.sysconf("SC_PAGE_SIZE") if hasattr(os, "sysconf") else 4096
+_trace_lock = threading.Lock()
+
+
+def _rss_bytes() -> Optional[int]:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * _PAGE_SIZE
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _load_measured(loader, *args):
+    """
+    Run loader, returning (result, elapsed ms, bytes it added). By default the
+    bytes are the process RSS delta (approximate when loads overlap, None off
+    Linux); MODEL_POOL_TRACE_ALLOC=true measures with tracemalloc instead,
+    one load at a time.
+    """
+    if POOL_TRACE_ALLOC:
+        with _trace_lock:
+            started = not tracemalloc.is_tracing()
+            if started:
+                tracemalloc.start()
+            before = tracemalloc.get_traced_memory()[0]
+            t0 = time.perf_counter()
+            try:
+                out = loader(*args)
+                return out, (time.perf_counter() - t0) * 1000.0, max(tracemalloc.get_traced_memory()[0] - before, 0)
+            finally:
+                if started:
+                    tracemalloc.stop()
+
+    before = _rss_bytes()
+    t0 = time.perf_counter()
+    out = loader(*args)
+    ms = (time.perf_counter() - t0) * 1000.0
+    after = _rss_bytes()
+    return out, ms, (max(after - before, 0) if before is not None and after is not None else None)
+
+
+class ModelPool:
+    def __init__(self, use_cases: Dict[str, Dict[str, Any]]):
+        self.use_cases = use_cases
+        self._models: Dict[str, LoadedModel] = {}
+        self._errors: Dict[str, str] = {}
+        self._lock = threading.Lock()
+        # one loader per use case: concurrent first uses / refreshes load once
+        self._load_locks = {uc: threading.RLock() for uc in use_cases}
+        self._refreshing: set = set()
+        self._swap_listeners: List[Callable[[str, LoadedModel], None]] = []
+
+    # ---------- loading ----------
+
+    def load(self, use_case: str) -> LoadedModel:
+        """(Re)load the Production model for use_case and swap it in."""
+        cfg = self.use_cases[use_case]
+        err = None
+        with self._load_locks[use_case]:
+            try:
+                (model, meta), load_ms, mem = _load_measured(_resolve_production, cfg["model_name"])
+            except Exception as e:
+                # registry empty/unreachable: this use case's own manifest (never the shared one)
+                err = repr(e)
+                (model, meta), load_ms, mem = _load_measured(
+                    load_latest_or_production, cfg["model_name"], manifest_path(use_case))
+                meta = {**meta, "source": "manifest"}
+
+            entry = LoadedModel(
+                use_case, model, meta, load_ms, None, mem,
+                flavor="sklearn" if _is_native(model) else "pyfunc",
+                features=list(getattr(model, "feature_names_in_", cfg["features"])),
+            )
+            entry.warmup_ms = self._warm(entry)
+            with self._lock:
+                # a replaced entry is freed once in-flight borrowers release it
+                self._models[use_case] = entry
+            for fn in self._swap_listeners:
+                try:
+                    fn(use_case, entry)
+                except Exception:
+                    pass
+            if err:
+                self._errors[use_case] = err
+            else:
+                self._errors.pop(use_case, None)
+        return entry
+
+    def on_swap(self, fn: Callable[[str, LoadedModel], None]):
+        """fn(use_case, entry) runs after every (re)load swaps an entry in."""
+        self._swap_listeners.append(fn)
+
+    def _get_or_load(self, use_case: str) -> LoadedModel:
+        entry = self._models.get(use_case)
+        if entry is not None:
+            return entry
+        with self._load_locks[use_case]:
+            # double-checked: whoever waited on the lock finds the fresh entry
+            entry = self._models.get(use_case)
+            return entry if entry is not None else self.load(use_case)
+
+    async def ensure_loaded(self, use_case: str) -> None:
+        """Load off the event loop; async routes call this before acquire()."""
+        if use_case not in self._models:
+            await asyncio.to_thread(self._get_or_load, use_case)
+
+    # ---------- refresh ----------
+
+    def _maybe_refresh(self, use_case: str, entry: LoadedModel):
+        if POOL_REFRESH_S <= 0 or time.monotonic() - entry.checked_at < POOL_REFRESH_S:
+            return
+        with self._lock:
+            if use_case in self._refreshing:
+                return
+            self._refreshing.add(use_case)
+            entry.checked_at = time.monotonic()
+        threading.Thread(target=self.refresh, args=(use_case,), daemon=True).start()
+
+    def refresh(self, use_case: str) -> bool:
+        """Reload use_case if its deployed version changed; True if swapped."""
+        try:
+            entry = self._models.get(use_case)
+            current = _production_signature(self.use_cases[use_case]["model_name"])
+            if current is None and entry is not None and entry.meta.get("source") == "manifest":
+                current = _manifest_signature(use_case)
+            if entry is None or current is None or current == entry.signature:
+                return False
+            self.load(use_case)
+            return True
+        except Exception as e:
+            # keep serving the old model; the next borrow past the TTL retries
+            self._errors[use_case] = repr(e)
+            return False
+        finally:
+            with self._lock:
+                self._refreshing.discard(use_case)
+
+    def _warm(self, entry: LoadedModel) -> Optional[float]:
+        t0 = time.perf_counter()
+        try:
+            entry.score(pd.DataFrame(0.0, index=range(WARMUP_ROWS), columns=entry.features))
+        except Exception:
+            return None
+        return (time.perf_counter() - t0) * 1000.0
+
+    def preload(self) -> None:
+        for uc in self.use_cases:
+            try:
+                self.load(uc)
+            except Exception as e:
+                self._errors[uc] = repr(e)
+
+    def start_preload(self) -> Optional[threading.Thread]:
+        """Preload in a daemon thread so a slow/unreachable MLflow never blocks startup."""
+        if not MODEL_PRELOAD:
+            return None
+        t = threading.Thread(target=self.preload, daemon=True)
+        t.start()
+        return t
+
+    # ---------- serving ----------
+
+    @contextmanager
+    def acquire(self, use_case: str):
+        """
+        Borrow the resident model for use_case (loading it on first use).
+        A reload during the request swaps the pool entry but the borrowed
+        model stays valid until released.
+        """
+        entry = self._get_or_load(use_case)
+        with self._lock:
+            entry.refs += 1
+        self._maybe_refresh(use_case, entry)
+        try:
+            yield entry
+        finally:
+            with self._lock:
+                entry.refs -= 1
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            loaded = {
+                uc: {
+                    "model_name": self.use_cases[uc]["model_name"],
+                    "run_id": e.meta.get("run_id"),
+                    "model_version": e.meta.get("model_version"),
+                    "source": e.meta.get("source"),
+                    "flavor": e.flavor,
+                    "load_ms": round(e.load_ms, 2),
+                    "warmup_ms": None if e.warmup_ms is None else round(e.warmup_ms, 2),
+                    "mem_bytes": e.mem_bytes,
+                    "refs": e.refs,
+                    "loaded_at": e.loaded_at.isoformat(),
+                }
+                for uc, e in self._models.items()
+            }
+        return {"loaded": loaded, "errors": dict(self._errors)}
+
+
+model_pool = ModelPool(USE_CASES)
@@ -1,38 +1,54 @@
+import inspect
+import time
 from datetime import datetime, timezone
 from typing import Callable, Any, Dict
 from functools import wraps
 from app.db import db
+from app.utils.audit_pipeline import audit_pipeline
 
 
-_events = db["audit_events"]
-_events.create_index([("ts", 1)])
-_events.create_index([("action", 1)])
+# ts (TTL) index: app/jobs/retention.py
+db["audit_events"].create_index([("action", 1)])
+
+
+def _emit(action: str, meta: Dict[str, Any], ok: bool, err: str | None, t0: float):
+    audit_pipeline.emit("audit_events", {
+        "ts": datetime.now(timezone.utc),
+        "action": action,
+        "ok": ok,
+        "err": err,
+        "meta": meta,
+        "duration_ms": (time.perf_counter() - t0) * 1000.0,
+    })
+
 
 def audit(action: str, meta: Dict[str, Any] | None = None):
     """Decorator: write an audit event after the function runs (even on error, we log outcome)."""
     meta = meta or {}
     def _wrap(func: Callable):
+        if inspect.iscoroutinefunction(func):
+            # await the handler so the event records its real outcome
+            @wraps(func)
+            async def _ainner(*args, **kwargs):
+                ok, err, t0 = True, None, time.perf_counter()
+                try:
+                    return await func(*args, **kwargs)
+                except Exception as e:
+                    ok, err = False, repr(e)
+                    raise
+                finally:
+                    _emit(action, meta, ok, err, t0)
+            return _ainner
+
         @wraps(func)
         def _inner(*args, **kwargs):
-            ok = True
-            err = None
+            ok, err, t0 = True, None, time.perf_counter()
             try:
                 return func(*args, **kwargs)
             except Exception as e:
                 ok, err = False, repr(e)
                 raise
             finally:
-                try:
-                    doc = {
-                        "ts": datetime.now(timezone.utc),
-                        "action": action,
-                        "ok": ok,
-                        "err": err,
-                        "meta": meta,
-
-                    }
-                    _events.insert_one(doc)
-                except Exception:
-                    pass
+                _emit(action, meta, ok, err, t0)
         return _inner
     return _wrap
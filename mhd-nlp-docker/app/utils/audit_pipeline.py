@@ -0,0 +1,155 @@
+# app/utils/audit_pipeline.py
+# Single write path for activity_logs, audits and audit_events. Callers
+# append to an in-memory ring buffer (never blocks, never raises); a
+# background flusher drains it with one insert_many per collection.
+# A batch that fails to insert goes back into the buffer and is retried on
+# later flushes for up to AUDIT_RETRY_S; only then (or on ring overflow)
+# are events given up. Until start() is called (scripts, tests) events are
+# written inline.
+import os
+import time
+import atexit
+import threading
+from collections import deque, defaultdict
+from typing import Any, Dict
+
+from pymongo.errors import BulkWriteError
+
+from app.db import db
+
+AUDIT_BUFFER_MAX = int(os.getenv("AUDIT_BUFFER_MAX", "10000"))
+AUDIT_FLUSH_BATCH = int(os.getenv("AUDIT_FLUSH_BATCH", "500"))
+AUDIT_FLUSH_INTERVAL_MS = float(os.getenv("AUDIT_FLUSH_INTERVAL_MS", "200"))
+AUDIT_RETRY_S = float(os.getenv("AUDIT_RETRY_S", "300"))
+
+
+class AuditPipeline:
+    def __init__(self, maxlen: int = AUDIT_BUFFER_MAX, batch: int = AUDIT_FLUSH_BATCH,
+                 interval_ms: float = AUDIT_FLUSH_INTERVAL_MS):
+        self._buf: deque = deque(maxlen=maxlen)
+        self.batch = batch
+        self.interval = interval_ms / 1000.0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._flush_lock = threading.Lock()
+        self._count_lock = threading.Lock()  # counters are bumped from request threads and the flusher
+        self._thread = None
+        self.emitted = 0
+        self.written = 0
+        self.dropped = 0
+        self.lost = 0
+        self.errors = 0
+        self.flushes = 0
+
+    @property
+    def running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def emit(self, collection: str, doc: Dict[str, Any]):
+        if not self.running:
+            try:
+                db[collection].insert_one(doc)
+                self._count(written=1)
+            except Exception:
+                self._count(errors=1)
+            return
+        with self._count_lock:
+            self._append_locked(collection, doc, None)
+            self.emitted += 1
+        if len(self._buf) >= self.batch:
+            self._wake.set()
+
+    def _append_locked(self, collection: str, doc: Dict[str, Any], failed_at):
+        # caller holds _count_lock
+        if len(self._buf) == self._buf.maxlen:
+            self.dropped += 1  # ring buffer: the oldest event is overwritten
+        self._buf.append((collection, doc, failed_at))
+
+    def flush(self) -> int:
+        """Drain everything buffered right now; returns documents written."""
+        with self._flush_lock:
+            by_coll = defaultdict(list)
+            with self._count_lock:  # so a drop is counted only when one really happens
+                while self._buf:
+                    coll, doc, failed_at = self._buf.popleft()
+                    by_coll[coll].append((doc, failed_at))
+
+            n = errors = lost = 0
+            now = time.monotonic()
+            retry = []
+            for coll, items in by_coll.items():
+                docs = [d for d, _ in items]
+                try:
+                    db[coll].insert_many(docs, ordered=False)
+                    n += len(docs)
+                    continue
+                except BulkWriteError as e:
+                    # a retried doc that made it in last time is a duplicate _id: done
+                    bad = {w["index"] for w in e.details.get("writeErrors", []) if w.get("code") != 11000}
+                except Exception:
+                    bad = set(range(len(items)))
+                # audit failures never reach the request path
+                errors += 1
+                n += len(items) - len(bad)
+                for i in sorted(bad):
+                    doc, failed_at = items[i]
+                    failed_at = now if failed_at is None else failed_at
+                    if now - failed_at < AUDIT_RETRY_S:
+                        retry.append((coll, doc, failed_at))
+                    else:
+                        lost += 1
+
+            with self._count_lock:
+                for item in retry:
+                    self._append_locked(*item)
+                self.written += n
+                self.errors += errors
+                self.lost += lost
+                self.flushes += 1 if by_coll else 0
+            return n
+
+    def _count(self, **deltas: int):
+        with self._count_lock:
+            for name, d in deltas.items():
+                setattr(self, name, getattr(self, name) + d)
+
+    def _run(self):
+        while not self._stop.is_set():
+            self._wake.wait(self.interval)
+            self._wake.clear()
+            self.flush()
+        self.flush()
+
+    def start(self):
+        if self.running:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="audit-flusher", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the flusher and drain what is left in the buffer."""
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._wake.set()
+        self._thread.join(timeout)
+        self._thread = None
+        self.flush()
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "running": self.running,
+            "buffered": len(self._buf),
+            "capacity": self._buf.maxlen,
+            "emitted": self.emitted,
+            "written": self.written,
+            "dropped": self.dropped,
+            "lost": self.lost,
+            "errors": self.errors,
+            "flushes": self.flushes,
+        }
+
+
+audit_pipeline = AuditPipeline()
+atexit.register(audit_pipeline.stop)
@@ -1,12 +1,11 @@
-from app.db import db
 from datetime import datetime, timezone
-
-activity_logs = db["activity_logs"]
+from app.utils.audit_pipeline import audit_pipeline
 
 def log_activity(user_id: str, action: str, metadata: dict | None = None):
-    activity_logs.insert_one({
+    # buffered; written by the audit pipeline's background flusher
+    audit_pipeline.emit("activity_logs", {
         "user_id": user_id,
         "action": action,
         "timestamp": datetime.now(timezone.utc),
         "metatdata": metadata or {}
-    })
\ No newline at end of file
+    })
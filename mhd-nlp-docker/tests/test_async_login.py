@@ -0,0 +1,49 @@
+import asyncio
+
+import pytest
+from app import auth
+
+
+@pytest.fixture
+def users_async(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    coll = mongomock_motor.AsyncMongoMockClient()["test_db"]["users"]
+    monkeypatch.setattr(auth, "users_async", coll)
+    return coll
+
+
+def test_async_login_checks_password(users_async):
+    async def scenario():
+        await users_async.insert_one({"username": "u1", "email": "u1@x.io",
+                                      "password": auth.get_password_hash("pw")})
+        ok = await auth.authenticate_user_async("U1@X.io", "pw")
+        bad = await auth.authenticate_user_async("u1", "nope")
+        missing = await auth.authenticate_user_async("ghost", "pw")
+        return ok, bad, missing
+
+    ok, bad, missing = asyncio.run(scenario())
+    assert ok["username"] == "u1" and bad is None and missing is None
+
+
+def test_login_concurrency_limit(users_async, monkeypatch):
+    monkeypatch.setattr(auth, "LOGIN_MAX_CONCURRENCY", 1)
+    monkeypatch.setattr(auth, "LOGIN_QUEUE_TIMEOUT_S", 0.05)
+    auth._login_slots.clear()
+
+    async def slow_verify(plain, hashed):
+        await asyncio.sleep(0.2)
+        return True
+
+    monkeypatch.setattr(auth, "verify_password_async", slow_verify)
+
+    async def scenario():
+        await users_async.insert_one({"username": "u1", "password": "x"})
+        return await asyncio.gather(
+            auth.authenticate_user_async("u1", "pw"),
+            auth.authenticate_user_async("u1", "pw"),
+            return_exceptions=True,
+        )
+
+    first, second = asyncio.run(scenario())
+    assert first["username"] == "u1"
+    assert isinstance(second, auth.LoginBusy)
@@ -0,0 +1,124 @@
+import asyncio
+
+import pytest
+from app.utils import audit_pipeline as ap
+from app.utils import audit as audit_mod
+
+
+@pytest.fixture
+def pipeline(mock_db, monkeypatch):
+    monkeypatch.setattr(ap, "db", mock_db)
+    p = ap.AuditPipeline(maxlen=4, batch=100, interval_ms=10_000)
+    monkeypatch.setattr(audit_mod, "audit_pipeline", p)
+    yield p
+    p.stop()
+
+
+def test_buffered_events_drain_on_stop(pipeline, mock_db):
+    pipeline.start()
+    for i in range(3):
+        pipeline.emit("activity_logs", {"i": i})
+    pipeline.emit("audits", {"action": "x"})
+    assert mock_db.activity_logs.count_documents({}) == 0  # still buffered
+
+    pipeline.stop()
+    assert mock_db.activity_logs.count_documents({}) == 3
+    assert mock_db.audits.count_documents({}) == 1
+    assert pipeline.stats()["flushes"] == 1
+
+
+def test_ring_buffer_drops_oldest(pipeline, mock_db):
+    pipeline.start()
+    for i in range(6):
+        pipeline.emit("activity_logs", {"i": i})
+    pipeline.stop()
+    assert sorted(d["i"] for d in mock_db.activity_logs.find()) == [2, 3, 4, 5]
+    assert pipeline.stats()["dropped"] == 2
+
+
+def test_counters_are_exact_under_concurrent_emit(pipeline):
+    import threading
+    pipeline.start()
+
+    def burst():
+        for i in range(500):
+            pipeline.emit("activity_logs", {"i": i})
+
+    threads = [threading.Thread(target=burst) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    pipeline.stop()
+    s = pipeline.stats()
+    assert s["emitted"] == 4000
+    assert s["emitted"] == s["written"] + s["dropped"]
+
+
+def test_inline_when_not_started(pipeline, mock_db):
+    pipeline.emit("audits", {"action": "y"})
+    assert mock_db.audits.count_documents({}) == 1
+
+
+def test_async_decorator_records_outcome(pipeline, mock_db):
+    @audit_mod.audit("demo.ok")
+    async def ok():
+        await asyncio.sleep(0)
+        return 1
+
+    @audit_mod.audit("demo.fail")
+    async def fail():
+        await asyncio.sleep(0)
+        raise ValueError("boom")
+
+    assert asyncio.run(ok()) == 1
+    with pytest.raises(ValueError):
+        asyncio.run(fail())
+
+    events = {e["action"]: e for e in mock_db.audit_events.find()}
+    assert events["demo.ok"]["ok"] is True
+    assert events["demo.fail"]["ok"] is False and "boom" in events["demo.fail"]["err"]
+
+
+def test_failed_batches_are_retried_not_lost(pipeline, mock_db, monkeypatch):
+    real = mock_db.activity_logs.insert_many
+    outage = [True]
+
+    def flaky(docs, **kw):
+        if outage[0]:
+            raise ConnectionError("mongo down")
+        return real(docs, **kw)
+
+    monkeypatch.setattr(mock_db.activity_logs, "insert_many", flaky)
+    pipeline.start()
+    pipeline.emit("activity_logs", {"i": 1})
+    pipeline.emit("activity_logs", {"i": 2})
+    assert pipeline.flush() == 0
+    assert pipeline.stats()["buffered"] == 2 and pipeline.stats()["errors"] == 1
+
+    outage[0] = False
+    assert pipeline.flush() == 2
+    assert mock_db.activity_logs.count_documents({}) == 2
+    assert pipeline.stats()["lost"] == 0
+
+
+def test_events_are_given_up_after_the_retry_window(pipeline, mock_db, monkeypatch):
+    def down(docs, **kw):
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(mock_db.activity_logs, "insert_many", down)
+    monkeypatch.setattr(ap, "AUDIT_RETRY_S", 0)
+    pipeline.start()
+    pipeline.emit("activity_logs", {"i": 1})
+    pipeline.flush()
+    s = pipeline.stats()
+    assert s["lost"] == 1 and s["buffered"] == 0 and s["dropped"] == 0
+
+
+def test_invalidate_user_flushes_buffered_activity(pipeline, mock_db, monkeypatch):
+    from app.services import dashboard_cache as dc
+    monkeypatch.setattr(dc, "audit_pipeline", pipeline)
+    pipeline.start()
+    pipeline.emit("activity_logs", {"user_id": "u1", "action": "upload_file"})
+    dc.invalidate_user("u1")
+    assert mock_db.activity_logs.count_documents({"user_id": "u1"}) == 1
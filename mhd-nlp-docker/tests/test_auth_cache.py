@@ -0,0 +1,67 @@
+import time
+import uuid
+
+from bson import ObjectId
+from app import auth
+from app.services import auth_cache
+
+
+def test_bloom_has_no_false_negatives():
+    bloom = auth_cache.BloomFilter(1000)
+    keys = [str(uuid.uuid4()) for _ in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert all(k in bloom for k in keys)
+    misses = sum(str(uuid.uuid4()) in bloom for _ in range(5000))
+    assert misses < 50
+
+
+def test_revocation_set_load_and_poll(mock_db, monkeypatch):
+    coll = mock_db["revoked_tokens"]
+    monkeypatch.setattr(auth_cache, "revoked_tokens", coll)
+    exp = int(time.time()) + 600
+    coll.insert_one({"jti": "old", "exp": exp})
+    coll.insert_one({"jti": "expired", "exp": int(time.time()) - 10})
+
+    rs = auth_cache.RevocationSet(capacity=100)
+    assert rs.is_revoked("old")  # falls back to Mongo before load
+    rs.load()
+    assert rs.loaded and rs.is_revoked("old")
+    assert not rs.is_revoked("expired") and not rs.is_revoked("never")
+
+    coll.insert_one({"jti": "new", "exp": exp})
+    assert not rs.is_revoked("new")
+    rs.poll()
+    assert rs.is_revoked("new")
+
+
+def test_user_profile_served_from_cache(mock_db, monkeypatch):
+    monkeypatch.setattr(auth, "users", mock_db.users)
+    monkeypatch.setattr(auth, "user_cache", auth_cache.UserCache(ttl_s=60))
+    uid = mock_db.users.insert_one({"username": "u1", "email": "u1@x", "role": "user"}).inserted_id
+    sub = str(uid)
+
+    assert auth._user_profile(sub)["role"] == "user"
+    mock_db.users.update_one({"_id": ObjectId(sub)}, {"$set": {"role": "trainer"}})
+    assert auth._user_profile(sub)["role"] == "user"  # cached
+
+    auth.user_cache.invalidate(email="u1@x")
+    assert auth._user_profile(sub)["role"] == "trainer"
+
+
+def test_user_invalidation_reaches_other_processes(mock_db, monkeypatch):
+    monkeypatch.setattr(auth_cache, "revoked_tokens", mock_db["revoked_tokens"])
+    monkeypatch.setattr(auth_cache, "user_invalidations", mock_db["user_invalidations"])
+    cache = auth_cache.UserCache(ttl_s=60)
+    monkeypatch.setattr(auth_cache, "user_cache", cache)
+    rs = auth_cache.RevocationSet(capacity=100)
+    rs.load()
+    cache.put("s1", {"email": "u1@x", "role": "user"})
+    cache.put("s2", {"email": "u2@x", "role": "user"})
+
+    # another process (e.g. a seed script) invalidates with its own cache
+    auth_cache.UserCache(ttl_s=60).invalidate(email="u1@x")
+    assert cache.get("s1") is not None
+    rs.poll()
+    assert cache.get("s1") is None and cache.get("s2") is not None
+    assert cache.stats() == {"size": 1, "maxsize": cache.maxsize, "ttl_s": 60}
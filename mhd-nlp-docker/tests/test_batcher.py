@@ -0,0 +1,54 @@
+import asyncio
+import pytest
+from app.serving.batcher import MicroBatcher, QueueFull
+
+
+def test_concurrent_requests_share_one_model_call():
+    calls = []
+
+    def score(rows):
+        calls.append(len(rows))
+        return [r * 10 for r in rows]
+
+    b = MicroBatcher(score, "t", max_wait_ms=50, max_batch_rows=64)
+
+    async def go():
+        return await asyncio.gather(b.submit([1]), b.submit([2, 3]), b.submit([4]))
+
+    assert asyncio.run(go()) == [[10], [20, 30], [40]]
+    assert calls == [4]
+    stats = b.stats()
+    assert stats["batches"] == 1 and stats["requests"] == 3
+    assert stats["batch_rows_hist"]["4"] == 1
+
+
+def test_flush_at_max_rows():
+    calls = []
+
+    def score(rows):
+        calls.append(len(rows))
+        return rows
+
+    b = MicroBatcher(score, "t", max_wait_ms=1000, max_batch_rows=2)
+
+    async def go():
+        return await asyncio.gather(*(b.submit([i]) for i in range(4)))
+
+    assert asyncio.run(go()) == [[0], [1], [2], [3]]
+    assert calls == [2, 2]
+
+
+def test_errors_and_queue_limit():
+    def boom(rows):
+        raise ValueError("model down")
+
+    b = MicroBatcher(boom, "t", max_wait_ms=1, max_queue_rows=2)
+
+    async def go():
+        with pytest.raises(ValueError):
+            await b.submit([1])
+        with pytest.raises(QueueFull):
+            await b.submit([1, 2, 3])
+
+    asyncio.run(go())
+    assert b.stats()["rejected"] == 1
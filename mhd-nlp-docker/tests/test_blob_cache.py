@@ -0,0 +1,125 @@
+import os
+import threading
+
+import app.db.storage as storage
+from app.db.blob_cache import DiskBlobCache
+
+
+def _fake_store(monkeypatch, objects):
+    gets = []
+
+    def stat(key):
+        body, etag = objects[key]
+        return {"size": len(body), "etag": etag, "content_type": None}
+
+    def open_(key, offset=0, length=None):
+        gets.append(key)
+        body = objects[key][0]
+        return iter([body[i:i + 3] for i in range(0, len(body), 3)])
+
+    monkeypatch.setattr(storage, "stat_raw", stat)
+    monkeypatch.setattr(storage, "open_raw", open_)
+    return gets
+
+
+def test_read_through_hit_and_etag_change(tmp_path, monkeypatch):
+    objects = {"a.csv": (b"x,y\n1,2\n", "e1")}
+    gets = _fake_store(monkeypatch, objects)
+    c = DiskBlobCache(root=str(tmp_path), max_bytes=1 << 20)
+
+    first = c.fetch("raw", "a.csv")
+    again = c.fetch("raw", "a.csv")
+    assert first == again and gets == ["a.csv"]
+    with open(first.path, "rb") as f:
+        assert f.read() == b"x,y\n1,2\n"
+
+    m = c.open_mmap("raw", "a.csv")
+    assert m.read() == b"x,y\n1,2\n"
+    m.close()
+
+    objects["a.csv"] = (b"x,y\n3,4\n", "e2")  # overwritten upstream
+    assert open(c.fetch("raw", "a.csv").path, "rb").read() == b"x,y\n3,4\n"
+    assert len(gets) == 2
+
+    st = c.stats()
+    assert st["hits"] == 2 and st["misses"] == 2
+    assert st["bytes_saved"] == 16
+
+
+def test_lru_eviction_by_bytes(tmp_path, monkeypatch):
+    objects = {k: (k.encode() * 10, "e") for k in ("a", "b", "c")}
+    _fake_store(monkeypatch, objects)
+    c = DiskBlobCache(root=str(tmp_path), max_bytes=25)
+
+    pa = c.fetch("raw", "a").path
+    c.fetch("raw", "b")
+    c.fetch("raw", "a")  # a is now most recent
+    c.fetch("raw", "c")
+
+    st = c.stats()
+    assert st["bytes"] <= 25 and st["evictions"] == 1
+    assert os.path.exists(pa)
+
+
+def test_corrupt_entry_is_refetched(tmp_path, monkeypatch):
+    objects = {"k": (b"hello world", "e")}
+    gets = _fake_store(monkeypatch, objects)
+    c = DiskBlobCache(root=str(tmp_path))
+    path = c.fetch("raw", "k").path
+    with open(path, "r+b") as f:
+        f.write(b"J")  # same size, different bytes
+
+    fresh = DiskBlobCache(root=str(tmp_path))  # new process: verifies checksum once
+    assert open(fresh.fetch("raw", "k").path, "rb").read() == b"hello world"
+    assert fresh.stats()["corrupt"] == 1 and len(gets) == 2
+
+
+def test_concurrent_misses_download_once(tmp_path, monkeypatch):
+    objects = {"k": (b"z" * 1000, "e")}
+    gets = _fake_store(monkeypatch, objects)
+    c = DiskBlobCache(root=str(tmp_path))
+    threads = [threading.Thread(target=c.fetch, args=("raw", "k")) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert gets == ["k"]
+    assert not [f for _, _, fs in os.walk(tmp_path) for f in fs if f.endswith(".tmp")]
+
+
+def test_fill_lock_is_shared_until_last_waiter(tmp_path, monkeypatch):
+    objects = {"k": (b"z" * 30, "e")}
+    gets = _fake_store(monkeypatch, objects)
+    slow, real_open = threading.Event(), storage.open_raw
+
+    def gated_open(key, offset=0, length=None):
+        slow.wait(5)
+        return real_open(key, offset, length)
+
+    monkeypatch.setattr(storage, "open_raw", gated_open)
+    c = DiskBlobCache(root=str(tmp_path))
+    threads = [threading.Thread(target=c.fetch, args=("raw", "k")) for _ in range(3)]
+    for t in threads:
+        t.start()
+    for _ in range(100):
+        if sum(slot[1] for slot in c._fill_locks.values()) == 3:
+            break
+        threading.Event().wait(0.01)
+    assert len(c._fill_locks) == 1  # every waiter is queued on the same lock
+    slow.set()
+    for t in threads:
+        t.join()
+    assert gets == ["k"] and c._fill_locks == {}
+
+
+def test_pinned_entries_survive_eviction(tmp_path, monkeypatch):
+    objects = {k: (k.encode() * 10, "e") for k in ("a", "b", "c")}
+    _fake_store(monkeypatch, objects)
+    c = DiskBlobCache(root=str(tmp_path), max_bytes=15)
+
+    a = c.fetch("raw", "a", pin=True)
+    c.fetch("raw", "b")
+    c.fetch("raw", "c")
+    assert os.path.exists(a.path)  # least recent, but in use
+    c.release(a)
+    assert not os.path.exists(a.path) and c.stats()["bytes"] <= 15
@@ -0,0 +1,73 @@
+import io
+from datetime import datetime, timedelta
+
+import pytest
+
+import app.db.storage as storage
+from app.services import content_store
+
+
+@pytest.fixture
+def store(mock_db, monkeypatch):
+    mem = storage.MemoryBackend()
+    monkeypatch.setitem(storage._BACKENDS, "memory", mem)
+    monkeypatch.setattr(storage, "BACKEND", "memory")
+    monkeypatch.setattr(content_store, "blob_refs", mock_db["blob_refs"])
+    return mem
+
+
+def _put(data: bytes):
+    f = io.BytesIO(data)
+    sha, size = content_store.hash_stream(f)
+    return content_store.put_stream(f, sha, size, "application/pdf")
+
+
+def test_duplicate_is_metadata_only(store, mock_db):
+    uploads = []
+    real_put = storage.get_backend().put_stream
+
+    def counting_put(*a, **kw):
+        uploads.append(a[1])
+        return real_put(*a, **kw)
+
+    store.put_stream = counting_put
+
+    first = _put(b"%PDF same form")
+    second = _put(b"%PDF same form")
+    other = _put(b"%PDF other form")
+
+    assert first["key"] == second["key"] != other["key"]
+    assert first["key"].startswith("cas/sha256/" + first["sha256"][:2] + "/")
+    assert (first["dedup"], second["dedup"]) == (False, True)
+    assert len(uploads) == 2
+    assert storage.get_bytes_raw(first["key"]) == b"%PDF same form"
+    assert mock_db.blob_refs.find_one({"_id": first["sha256"]})["refcount"] == 2
+
+
+def test_release_and_gc(store, mock_db):
+    ref = _put(b"bytes")
+    _put(b"bytes")
+    assert content_store.release(ref["sha256"]) == 1
+    assert content_store.gc_unreferenced(grace_s=0) == 0  # still referenced
+
+    assert content_store.release(ref["sha256"]) == 0
+    assert content_store.release(ref["sha256"]) is None  # never goes negative
+    mock_db.blob_refs.update_one({"_id": ref["sha256"]}, {"$set": {"released_at": datetime.utcnow() - timedelta(days=2)}})
+
+    assert content_store.gc_unreferenced(grace_s=3600) == 1
+    assert mock_db.blob_refs.count_documents({}) == 0
+    with pytest.raises(storage.ObjectNotFound):
+        storage.get_bytes_raw(ref["key"])
+
+    # storing it again after GC uploads fresh bytes
+    again = _put(b"bytes")
+    assert again["dedup"] is False and storage.get_bytes_raw(again["key"]) == b"bytes"
+
+
+def test_store_waits_out_gc(store, mock_db):
+    ref = _put(b"x")
+    mock_db.blob_refs.update_one({"_id": ref["sha256"]}, {"$set": {"state": "deleting", "refcount": 0}})
+    f = io.BytesIO(b"x")
+    with pytest.raises(RuntimeError):
+        content_store.put_stream(f, ref["sha256"], 1, retries=1)
+    assert mock_db.blob_refs.find_one({"_id": ref["sha256"]})["refcount"] == 0
@@ -0,0 +1,46 @@
+import asyncio
+
+import pytest
+from app.routes import dashboard as dash
+from app.services import dashboard_cache as dc
+from app.services import dashboard_data
+
+
+def test_ttl_and_lru():
+    cache = dc.RenderCache(ttl_s=0.0, maxsize=2, use_redis=False)
+    cache.put("a", {"x": 1})
+    assert cache.get("a") is None  # expired immediately
+
+    cache = dc.RenderCache(ttl_s=60, maxsize=2, use_redis=False)
+    for k in ("a", "b", "c"):
+        cache.put(k, {"k": k})
+    assert cache.get("a") is None and cache.get("c") == {"k": "c"}
+
+
+def test_athlete_context_cached_until_invalidated(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    adb = mongomock_motor.AsyncMongoMockClient()["test_db"]
+    for name in ("uploads", "medical_history", "equipment", "training", "weightroom", "activity_logs"):
+        monkeypatch.setattr(dashboard_data, name, adb[name])
+
+    cache = dc.RenderCache(ttl_s=60, use_redis=False)
+    monkeypatch.setattr(dc, "dashboard_cache", cache)
+    calls = []
+
+    async def build():
+        calls.append(1)
+        return await dash._athlete_context("ath1")
+
+    async def scenario():
+        await adb.training.insert_one({"username": "ath1", "injury": "none"})
+        first = await cache.aget_or_build(dc.user_key("ath1"), build)
+        await adb.training.insert_one({"username": "ath1", "injury": "ankle"})
+        second = await cache.aget_or_build(dc.user_key("ath1"), build)
+        assert len(calls) == 1 and second["training_count"] == first["training_count"] == 1
+
+        dc.invalidate_user("ath1")
+        third = await cache.aget_or_build(dc.user_key("ath1"), build)
+        assert len(calls) == 2 and third["training_count"] == 2
+
+    asyncio.run(scenario())
+    assert cache.stats()["invalidations"] == 1
@@ -0,0 +1,38 @@
+import asyncio
+from datetime import datetime, timedelta
+
+import pytest
+from app.routes import trainer_dashboard as td
+from app.services import dashboard_data
+
+
+def test_fetch_trainer_fans_out(monkeypatch):
+    mongomock_motor = pytest.importorskip("mongomock_motor")
+    adb = mongomock_motor.AsyncMongoMockClient()["test_db"]
+    for name in ("predictions", "athlete_risk_latest", "clearance", "forms"):
+        monkeypatch.setattr(dashboard_data, name, adb[name])
+
+    # mongomock hands back naive datetimes; keep the test in naive UTC
+    now = datetime.utcnow()
+    since = now - timedelta(days=7)
+
+    async def scenario():
+        await adb.predictions.insert_many([
+            {"use_case": "injury_risk", "athlete_id": "a1", "score": 0.9, "ts": now - timedelta(hours=1)},
+            {"use_case": "injury_risk", "athlete_id": "a2", "score": 0.2, "ts": now - timedelta(hours=2)},
+        ])
+        await adb.athlete_risk_latest.insert_many([
+            {"athlete_id": "a1", "score": 0.9, "bucket": "high", "ts": now, "recent_injury_flag": False},
+            {"athlete_id": "a3", "score": 0.85, "bucket": "high", "ts": now, "recent_injury_flag": False},
+        ])
+        await adb.clearance.insert_one({"athlete_id": "a3", "cleared_until": now + timedelta(days=1)})
+        await adb.forms.insert_one({"status": "pending", "created_at": now})
+        return await dashboard_data.fetch_trainer(now, since, td._facet_pipeline(now, since))
+
+    data = asyncio.run(scenario())
+
+    assert data["risk_counts"] == {"high": 2, "med": 0, "low": 0}
+    assert [d["athlete_id"] for d in data["live_high"]] == ["a1"]
+    assert [d["athlete_id"] for d in data["needs_clearance"]] == ["a1"]  # a3 is cleared
+    assert len(data["pending_forms"]) == 1
+    assert td._shape_facets(data["facets"])["total_athletes"] == 2
@@ -0,0 +1,48 @@
+import io
+import pytest
+import pandas as pd
+from app.pipelines.steps.deid import deidentify, deidentify_csv, hash_value
+
+
+def _frame():
+    return pd.DataFrame({
+        "athlete_id": ["a1", "a2", "a1", None],
+        "name": ["Ann", "Bo", "Ann", "Cy"],
+        "zip": [30301, 10001, 30301, 94103],
+        "age": [17, 25, 50, 70],
+    })
+
+
+def test_deidentify_hashes_ids_and_leaves_input_untouched():
+    df = _frame()
+    before = df.copy()
+    out = deidentify(df, salt="pepper")
+
+    assert df.equals(before)
+    assert "name" not in out and "zip" not in out
+    assert list(out["zip3"]) == ["303", "100", "303", "941"]
+    assert list(out["age_band"].astype(str)) == ["<18", "18-29", "45-59", "60+"]
+    assert out["athlete_id"][0] == out["athlete_id"][2] == hash_value("a1", "pepper")
+    assert out["athlete_id"][3] is None
+
+
+def test_deidentify_salt_changes_digest():
+    a = deidentify(_frame(), salt="one")["athlete_id"][0]
+    b = deidentify(_frame(), salt="two")["athlete_id"][0]
+    assert a != b
+
+
+def test_deidentify_csv_streams_chunks():
+    buf = io.StringIO(_frame().to_csv(index=False))
+    chunks = list(deidentify_csv(buf, chunksize=3, salt="pepper"))
+    assert [len(c) for c in chunks] == [3, 1]
+    assert all("name" not in c for c in chunks)
+
+
+def test_deidentify_requires_a_salt(monkeypatch):
+    from app.pipelines.steps import deid
+    monkeypatch.setattr(deid, "DEID_SALT", "")
+    with pytest.raises(RuntimeError, match="DEID_SALT"):
+        deidentify(_frame())
+    with pytest.raises(RuntimeError):
+        hash_value("a1", salt="")
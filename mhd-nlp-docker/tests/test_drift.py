@@ -0,0 +1,70 @@
+import datetime as dt
+
+import numpy as np
+import pytest
+
+from app.monitoring import drift as engine
+from app.jobs import drift as drift_job
+
+
+@pytest.fixture
+def hist(mock_db, monkeypatch):
+    monkeypatch.setattr(engine, "drift_hist", mock_db["drift_hist"])
+    monkeypatch.setattr(drift_job, "drift", mock_db["drift_metrics"])
+    return mock_db
+
+
+def _rows(rng, n, rpe_mean):
+    return [{"rpe": float(v), "sets": 3.0, "reps": 10.0} for v in rng.normal(rpe_mean, 1.0, n)]
+
+
+def test_observe_bins_and_one_doc_per_day(hist):
+    now = dt.datetime(2026, 3, 10, 12, tzinfo=dt.timezone.utc)
+    rows = [{"rpe": 0.2}, {"rpe": 9.9}, {"rpe": -1.0}, {"rpe": 12.0}, {"rpe": None}, {"rpe": "x"}]
+    assert engine.observe("session_quality", rows, [1.0] * 6, now) == 6
+    engine.observe("session_quality", [{"rpe": 0.3}], [2.0], now)
+
+    docs = list(hist.drift_hist.find())
+    assert len(docs) == 1 and docs[0]["day"] == "2026-03-10"
+    h = {int(b): c for b, c in docs[0]["h"]["rpe"].items()}
+    # underflow, first bin (x2), last bin, overflow; None/"x" skipped
+    assert h == {0: 1, 1: 2, engine.DRIFT_NBINS: 1, engine.DRIFT_NBINS + 1: 1}
+    assert docs[0]["n"]["rpe"] == 5 and docs[0]["n"]["score"] == 7
+    assert engine.observe("unknown_use_case", rows) == 0
+
+
+def test_compare_windows_all_features(hist):
+    rng = np.random.default_rng(0)
+    base = dt.datetime(2026, 3, 1, 9, tzinfo=dt.timezone.utc)
+    for d in range(7):
+        engine.observe("session_quality", _rows(rng, 300, 4.0), None, base + dt.timedelta(days=d))
+    engine.observe("session_quality", _rows(rng, 300, 4.0), None, base + dt.timedelta(days=7))
+    engine.observe("session_quality", _rows(rng, 300, 7.0), None, base + dt.timedelta(days=8))
+
+    ref = (dt.date(2026, 3, 1), dt.date(2026, 3, 8))
+    same = engine.compare_windows("session_quality", ref, (dt.date(2026, 3, 8), dt.date(2026, 3, 9)))
+    shifted = engine.compare_windows("session_quality", ref, (dt.date(2026, 3, 9), dt.date(2026, 3, 10)))
+
+    assert set(same) == {"rpe", "sets", "reps"}
+    assert same["rpe"]["n_ref"] == 2100 and same["rpe"]["n_cur"] == 300
+    assert same["rpe"]["psi"] < 0.1 and shifted["rpe"]["psi"] > 1.0
+    assert shifted["rpe"]["ks"] > 0.8 and shifted["sets"]["psi"] == pytest.approx(0.0)
+
+
+def test_daily_drift_windows_do_not_overlap(hist):
+    rng = np.random.default_rng(1)
+    today = dt.date(2026, 3, 10)
+    for d in range(1, 8):
+        ts = dt.datetime.combine(today - dt.timedelta(days=d), dt.time(8), dt.timezone.utc)
+        engine.observe("session_quality", _rows(rng, 100, 3.0), None, ts)
+    engine.observe("session_quality", _rows(rng, 50, 8.0), None,
+                   dt.datetime.combine(today, dt.time(8), dt.timezone.utc))
+
+    out = drift_job.compute_daily_drift(today=today.isoformat())
+    assert out["rpe"]["n_ref"] == 700 and out["rpe"]["n_cur"] == 50
+    assert out["rpe"]["psi"] > 1.0
+    stored = hist.drift_metrics.find_one({"feature": "rpe"})
+    assert stored["cur"] == ["2026-03-10", "2026-03-11"] and stored["ref"] == ["2026-03-03", "2026-03-10"]
+
+    only = drift_job.compute_daily_drift(feature="rpe", today=today)
+    assert list(only) == ["rpe"]
@@ -0,0 +1,166 @@
+import time
+import datetime as dt
+
+import pytest
+
+from app.jobs import registry, progress
+
+
+@pytest.fixture
+def jobs(mock_db, monkeypatch):
+    coll = mock_db["jobs"]
+    monkeypatch.setattr(registry, "jobs", coll)
+    monkeypatch.setattr(progress, "jobs", coll)
+    monkeypatch.setattr(registry, "JOBS_DISPATCH", "mongo")
+    monkeypatch.setattr(registry, "KINDS", {})
+    return coll
+
+
+def test_claim_by_priority_and_progress(jobs):
+    seen = []
+
+    def work(n):
+        progress.report_progress(0.5, f"half of {n}")
+        seen.append(jobs.find_one({"status": "running"})["progress"]["message"])
+        return {"n": n}
+
+    registry.register_kind("low", work, priority=1)
+    registry.register_kind("high", work, priority=9)
+    low = registry.enqueue("low", {"n": 1})
+    high = registry.enqueue("high", {"n": 2})
+
+    job = registry.claim("w1")
+    assert job["_id"] == high and job["attempts"] == 1
+    registry.execute(job, "w1")
+
+    done = registry.get_job(high)
+    assert done["status"] == "succeeded" and done["result"] == {"n": 2}
+    assert done["progress"]["pct"] == 1.0 and seen == ["half of 2"]
+    assert registry.get_job(low)["status"] == "queued"
+
+
+def test_failures_back_off_then_fail(jobs, monkeypatch):
+    monkeypatch.setattr(registry, "JOB_BACKOFF_S", 10)
+
+    def boom():
+        raise RuntimeError("nope")
+
+    registry.register_kind("flaky", boom, max_attempts=2)
+    jid = registry.enqueue("flaky")
+
+    registry.execute(registry.claim("w"), "w")
+    row = registry.get_job(jid)
+    assert row["status"] == "queued" and row["error"] == "nope"
+    assert row["run_after"] > dt.datetime.utcnow() + dt.timedelta(seconds=5)
+    assert registry.claim("w") is None  # still backing off
+
+    jobs.update_one({"_id": jid}, {"$set": {"run_after": dt.datetime.utcnow()}})
+    registry.execute(registry.claim("w"), "w")
+    row = registry.get_job(jid)
+    assert row["status"] == "failed" and row["attempts"] == 2
+
+
+def test_expired_lease_is_requeued(jobs):
+    registry.register_kind("slow", lambda: None, max_attempts=3)
+    jid = registry.enqueue("slow")
+    registry.claim("dead-worker")
+    jobs.update_one({"_id": jid}, {"$set": {"lease_until": dt.datetime.utcnow() - dt.timedelta(seconds=1)}})
+
+    assert registry.reap_expired() == 1
+    row = registry.get_job(jid)
+    assert row["status"] == "queued" and "lease expired" in row["error"]
+
+
+def test_cancel_queued_and_running(jobs):
+    registry.register_kind("k", lambda: None)
+    queued = registry.enqueue("k")
+    assert registry.cancel(queued) and registry.get_job(queued)["status"] == "cancelled"
+
+    def long_job():
+        # the heartbeat would set this; simulate it noticing cancel_requested
+        progress.current_job().cancel.set()
+        progress.report_progress(0.1)
+        raise AssertionError("should have been cancelled")
+
+    registry.register_kind("long", long_job)
+    jid = registry.enqueue("long")
+    job = registry.claim("w")
+    assert registry.cancel(jid)  # running: request only
+    registry.execute(job, "w")
+    assert registry.get_job(jid)["status"] == "cancelled"
+
+
+def test_worker_threads_drain_queue(jobs):
+    registry.register_kind("sq", lambda x: {"y": x * x})
+    ids = [registry.enqueue("sq", {"x": i}) for i in range(6)]
+    w = registry.JobWorker(concurrency=2, poll_s=0.01)
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and jobs.count_documents({"status": "succeeded"}) < 6:
+            time.sleep(0.02)
+    finally:
+        w.stop()
+    assert [registry.get_job(i)["result"]["y"] for i in ids] == [i * i for i in range(6)]
+
+
+def test_unknown_kind_rejected(jobs):
+    with pytest.raises(ValueError):
+        registry.enqueue("nope")
+
+
+def test_failed_success_write_does_not_rerun_the_job(jobs, monkeypatch):
+    runs = []
+    registry.register_kind("once", lambda: runs.append(1) or {"ok": True}, max_attempts=3)
+    jid = registry.enqueue("once")
+    real = jobs.update_one
+    blips = [1]
+
+    def flaky(q, change, *a, **kw):
+        if blips and change.get("$set", {}).get("status") == "succeeded":
+            blips.pop()
+            raise ConnectionError("mongo blip")
+        return real(q, change, *a, **kw)
+
+    monkeypatch.setattr(jobs, "update_one", flaky)
+    monkeypatch.setattr(registry, "JOB_POLL_S", 0.01)
+    registry.execute(registry.claim("w"), "w")
+    assert runs == [1] and registry.get_job(jid)["status"] == "succeeded"
+
+
+def test_worker_survives_state_write_errors(jobs, monkeypatch):
+    registry.register_kind("boom", lambda: 1 / 0, max_attempts=1)
+    registry.register_kind("sq", lambda x: {"y": x * x})
+    registry.enqueue("boom", priority=10)
+    jid = registry.enqueue("sq", {"x": 3})
+
+    def broken(*a, **kw):
+        raise ConnectionError("mongo down")
+
+    monkeypatch.setattr(registry, "_fail_or_retry", broken)
+    w = registry.JobWorker(concurrency=1, poll_s=0.01)
+    w.start()
+    try:
+        deadline = time.time() + 5
+        while time.time() < deadline and (registry.get_job(jid) or {}).get("status") != "succeeded":
+            time.sleep(0.02)
+        assert registry.get_job(jid)["status"] == "succeeded"
+        assert all(t.is_alive() for t in w._threads)
+    finally:
+        w.stop()
+
+
+def test_enqueue_unique_skips_pending_kinds(jobs):
+    registry.register_kind("agg", lambda: {"n": 0})
+    first = registry.enqueue_unique("agg")
+    assert registry.enqueue_unique("agg") == first
+    assert jobs.count_documents({"kind": "agg"}) == 1
+
+    registry.execute(registry.claim("w"), "w")
+    assert registry.enqueue_unique("agg") != first
+
+
+def test_retention_schedules_registered_kinds():
+    from app.jobs import retention
+    registry._register_builtin()
+    assert all(k in registry.KINDS for k in retention.SCHEDULED_KINDS)
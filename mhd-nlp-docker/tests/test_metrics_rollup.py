@@ -0,0 +1,94 @@
+from datetime import datetime, timedelta
+
+import numpy as np
+import pytest
+
+from app.jobs import metrics_rollup as mr
+from app.monitoring import aggregate as agg
+
+
+@pytest.fixture
+def rollup_db(mock_db, monkeypatch):
+    for name, coll in (("pred", "risk_predictions"), ("inj", "injuries"),
+                       ("met", "model_daily_metrics"), ("state", "rollup_state")):
+        monkeypatch.setattr(mr, name, mock_db[coll])
+    monkeypatch.setattr(mr, "db", mock_db)
+    monkeypatch.setattr(agg, "db", mock_db)
+    monkeypatch.setattr(agg, "aggs", mock_db["metric_aggregates"])
+    return mock_db
+
+
+def _predict(db, coll, day, scores, use_case="injury_risk"):
+    db[coll].insert_many([
+        {"ts": day + timedelta(hours=1 + i % 20), "use_case": use_case, "athlete_id": f"a{i}", "score": s}
+        for i, s in enumerate(scores)
+    ])
+
+
+def test_precision_at_many_k_in_one_pass():
+    labels = np.array([1, 1, 0, 1, 0, 0, 0, 0, 0, 0])
+    out = mr.precision_at(labels, ks=(1, 2, 4, 50), k_pcts=(0.1, 0.5))
+    assert out == {"p@1": 1.0, "p@2": 1.0, "p@4": 0.75, "p@50": 0.3, "p@0.1": 1.0, "p@0.5": 0.6}
+    assert mr.precision_at(np.array([], dtype=int), ks=(5,)) == {}
+
+
+def test_rollup_day_ranks_best_score_per_athlete(rollup_db):
+    day = datetime(2026, 3, 1)
+    _predict(rollup_db, "risk_predictions", day, [0.9, 0.8, 0.1, 0.7])
+    # a1 predicted again lower the same day: best score counts; other use cases ignored
+    rollup_db.risk_predictions.insert_one({"ts": day + timedelta(hours=23), "use_case": "injury_risk",
+                                           "athlete_id": "a1", "score": 0.05})
+    _predict(rollup_db, "risk_predictions", day, [0.99], use_case="session_quality")
+    rollup_db.injuries.insert_many([
+        {"athlete_id": "a0", "onset_date": day + timedelta(days=3)},
+        {"athlete_id": "a3", "onset_date": day + timedelta(days=6)},
+        {"athlete_id": "a1", "onset_date": day + timedelta(days=20)},  # outside horizon
+    ])
+
+    ids, labels = mr.ranked_labels(day)
+    assert ids == ["a0", "a1", "a3", "a2"] and labels.tolist() == [1, 0, 1, 0]
+
+    doc = mr.rollup_day(day, ks=(1, 2, 3), k_pcts=(0.5,))
+    assert doc["n"] == 4 and doc["positives"] == 2
+    assert doc["precision"] == {"p@1": 1.0, "p@2": 0.5, "p@3": pytest.approx(2 / 3), "p@0.5": 0.5}
+    assert doc["k"] == 1 and doc["precision_at_k"] == 1.0
+    assert mr.compute_precision_at_k(day, 0.5) == 0.5
+    assert rollup_db.model_daily_metrics.count_documents({}) == 1
+
+
+def test_run_rollups_watermark_and_parallel_backfill(rollup_db):
+    start = datetime(2026, 2, 1)
+    for d in range(10):
+        _predict(rollup_db, "risk_predictions", start + timedelta(days=d), [0.9, 0.2])
+    rollup_db.injuries.insert_one({"athlete_id": "a0", "onset_date": start + timedelta(days=2)})
+
+    now = start + timedelta(days=12, hours=5)
+    out = mr.run_precision_rollups(now=now, workers=4)
+    # days final once next_day + 7d has passed: Feb 1..Feb 5
+    assert out["days"] == 5 and out["rolled_through"] == datetime(2026, 2, 5)
+    p = {r["day"]: r["precision"]["p@5"] for r in rollup_db.model_daily_metrics.find()}
+    assert p[datetime(2026, 2, 1)] == 0.5 and p[datetime(2026, 2, 4)] == 0.0
+    assert rollup_db.metric_aggregates.find_one({"date": "2026-02-01"})["topk"] == {"k": 10, "precision": 0.5}
+
+    assert mr.run_precision_rollups(now=now)["days"] == 0
+    out = mr.run_precision_rollups(now=now + timedelta(days=3))
+    assert out["days"] == 3 and out["rolled_through"] == datetime(2026, 2, 8)
+
+
+def test_aggregate_datily_only_reads_new_rows(rollup_db):
+    day = datetime(2026, 3, 2)
+    _predict(rollup_db, "predictions", day, [0.1, 0.5, 0.9, 0.95])  # hours 1..4
+    assert agg.aggregate_datily(now=day + timedelta(hours=3, minutes=30)) == 3
+    doc = rollup_db.metric_aggregates.find_one({"date": "2026-03-02"})
+    assert doc["risk_buckets"] == {"low": 1, "medium": 1, "high": 1}
+
+    # nothing new: no change; then one more row arrives
+    assert agg.aggregate_datily(now=day + timedelta(hours=3, minutes=40)) == 0
+    assert agg.aggregate_datily(now=day + timedelta(hours=6)) == 1
+    # next morning: the rest of yesterday is closed out, today starts fresh
+    rollup_db.predictions.insert_one({"ts": day + timedelta(days=1, hours=1), "use_case": "injury_risk",
+                                      "athlete_id": "b", "score": 0.2})
+    assert agg.aggregate_datily(now=day + timedelta(days=1, hours=2)) == 1
+    assert rollup_db.metric_aggregates.find_one({"date": "2026-03-02"})["risk_buckets"] == \
+        {"low": 1, "medium": 1, "high": 2}
+    assert rollup_db.metric_aggregates.find_one({"date": "2026-03-03"})["risk_buckets"]["low"] == 1
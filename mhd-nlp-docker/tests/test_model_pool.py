@@ -0,0 +1,200 @@
+import numpy as np
+import pandas as pd
+from app.serving import pool as pool_mod
+
+
+class _Model:
+    def __init__(self, tag):
+        self.tag = tag
+
+    def predict(self, df):
+        return np.zeros(len(df))
+
+
+def _pool(monkeypatch):
+    loads = []
+
+    def fake_resolve(name):
+        loads.append(name)
+        return _Model(len(loads)), {"run_id": f"r{len(loads)}", "model_version": str(len(loads)), "source": "registry"}
+
+    monkeypatch.setattr(pool_mod, "_resolve_production", fake_resolve)
+    return pool_mod.ModelPool(pool_mod.USE_CASES), loads
+
+
+def test_preload_keeps_models_resident(monkeypatch):
+    p, loads = _pool(monkeypatch)
+    p.preload()
+    assert len(loads) == 2
+
+    with p.acquire("injury_risk") as a, p.acquire("injury_risk") as b:
+        assert a is b
+        assert p.stats()["loaded"]["injury_risk"]["refs"] == 2
+    assert len(loads) == 2
+
+    stats = p.stats()["loaded"]
+    assert stats["injury_risk"]["refs"] == 0
+    assert stats["session_quality"]["warmup_ms"] is not None
+    assert stats["injury_risk"]["run_id"] != stats["session_quality"]["run_id"]
+
+
+def test_reload_does_not_pull_model_from_borrower(monkeypatch):
+    p, _ = _pool(monkeypatch)
+    with p.acquire("session_quality") as borrowed:
+        first = borrowed.model
+        p.load("session_quality")
+        assert borrowed.model is first
+    with p.acquire("session_quality") as fresh:
+        assert fresh.model is not first
+
+
+def test_native_score_uses_trained_column_order(monkeypatch):
+    class _Clf:
+        feature_names_in_ = np.array(["hr", "age", "bp"])
+
+        def predict_proba(self, X):
+            assert isinstance(X, np.ndarray) and X.flags["C_CONTIGUOUS"]
+            return np.c_[1 - X[:, 0] / 100, X[:, 0] / 100]
+
+    monkeypatch.setattr(pool_mod, "_resolve_production", lambda name: (_Clf(), {"run_id": "r"}))
+    p = pool_mod.ModelPool(pool_mod.USE_CASES)
+    with p.acquire("injury_risk") as loaded:
+        assert loaded.flavor == "sklearn"
+        out = loaded.score(pd.DataFrame({"age": [30.0], "bp": [120.0], "hr": [50.0]}))
+    assert out.tolist() == [0.5]
+
+
+class _Version:
+    def __init__(self, version, run_id):
+        self.version, self.run_id = version, run_id
+
+
+class _Registry:
+    """Fake MlflowClient: Production versions per registered model name."""
+    prod = {}
+
+    def get_latest_versions(self, name, stages=None):
+        return [self.prod[name]] if name in self.prod else []
+
+
+def _registry_pool(monkeypatch):
+    _Registry.prod = {
+        "injury_risk_logreg": _Version("3", "run-injury"),
+        "session_quality_rf": _Version("7", "run-session"),
+    }
+    loaded_uris = []
+    monkeypatch.setattr(pool_mod, "MlflowClient", _Registry)
+    monkeypatch.setattr(pool_mod, "load_flavor", lambda uri: loaded_uris.append(uri) or _Model(uri))
+    return pool_mod.ModelPool(pool_mod.USE_CASES), loaded_uris
+
+
+def test_use_cases_resolve_their_own_production_models(monkeypatch):
+    p, uris = _registry_pool(monkeypatch)
+    p.preload()
+    with p.acquire("injury_risk") as risk, p.acquire("session_quality") as sess:
+        assert risk.model.tag == "models:/injury_risk_logreg/3"
+        assert sess.model.tag == "models:/session_quality_rf/7"
+        assert risk.meta["source"] == sess.meta["source"] == "registry"
+        assert sess.warmup_ms is not None
+
+
+def test_promotion_in_another_process_is_picked_up(monkeypatch):
+    p, uris = _registry_pool(monkeypatch)
+    monkeypatch.setattr(pool_mod, "POOL_REFRESH_S", 0.01)
+    p.load("injury_risk")
+    assert p.refresh("injury_risk") is False  # unchanged: no reload
+
+    _Registry.prod["injury_risk_logreg"] = _Version("4", "run-new")
+    import time
+    time.sleep(0.02)
+    with p.acquire("injury_risk") as old:
+        assert old.meta["model_version"] == "3"  # request keeps serving while the check runs
+    for _ in range(100):
+        if p.stats()["loaded"]["injury_risk"]["model_version"] == "4":
+            break
+        time.sleep(0.01)
+    with p.acquire("injury_risk") as new:
+        assert new.model.tag == "models:/injury_risk_logreg/4"
+
+
+def test_concurrent_first_use_loads_once(monkeypatch):
+    import threading
+    import time
+    loads = []
+
+    def slow_resolve(name):
+        loads.append(name)
+        time.sleep(0.05)
+        return _Model(name), {"run_id": "r", "model_version": "1", "source": "registry"}
+
+    monkeypatch.setattr(pool_mod, "_resolve_production", slow_resolve)
+    p = pool_mod.ModelPool(pool_mod.USE_CASES)
+
+    def use():
+        with p.acquire("injury_risk"):
+            pass
+
+    threads = [threading.Thread(target=use) for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert loads == ["injury_risk_logreg"]
+
+
+def test_promote_to_registry_uses_the_use_case_model_name(monkeypatch):
+    from app.pipelines.steps import deploy
+
+    calls = []
+
+    class _Client:
+        def get_registered_model(self, name):
+            calls.append(("get", name))
+
+        def search_model_versions(self, q):
+            calls.append(("search", q))
+            return [_Version("2", "run-x")]
+
+        def create_model_version(self, **kw):
+            raise AssertionError("version already registered by log_model")
+
+        def transition_model_version_stage(self, name, version, stage, archive_existing_versions):
+            calls.append(("stage", name, version, stage))
+
+    monkeypatch.setattr(deploy.mlflow.tracking, "MlflowClient", _Client)
+    out = deploy.promote_to_registry("run-x", model_name="session_quality_rf")
+    assert out == {"name": "session_quality_rf", "version": "2", "stage": "Production"}
+    assert ("stage", "session_quality_rf", "2", "Production") in calls
+
+
+def test_swap_listeners_run_on_every_load(monkeypatch):
+    p, _ = _pool(monkeypatch)
+    swaps = []
+    p.on_swap(lambda uc, entry: swaps.append((uc, entry.meta["run_id"])))
+    p.load("injury_risk")
+    p.load("injury_risk")
+    assert swaps == [("injury_risk", "r1"), ("injury_risk", "r2")]
+
+
+def test_load_measurement_leaves_tracemalloc_alone(monkeypatch):
+    import threading
+    import tracemalloc
+
+    seen = []
+    out, _, mem = pool_mod._load_measured(lambda: seen.append(tracemalloc.is_tracing()) or "m")
+    assert out == "m" and seen == [False] and (mem is None or mem >= 0)
+
+    # opt-in tracing: overlapping loads are measured one at a time
+    monkeypatch.setattr(pool_mod, "POOL_TRACE_ALLOC", True)
+    results = []
+
+    def load():
+        results.append(pool_mod._load_measured(lambda: bytearray(1 << 20))[2])
+
+    threads = [threading.Thread(target=load) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(results) == 4 and all(r >= 1 << 20 for r in results)
+    assert not tracemalloc.is_tracing()
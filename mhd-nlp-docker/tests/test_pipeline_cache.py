@@ -0,0 +1,75 @@
+import pandas as pd
+from app.pipelines import cache
+
+
+def _patch_storage(monkeypatch, mock_db):
+    blobs = {}
+    monkeypatch.setattr(cache, "step_cache", mock_db.pipeline_step_cache)
+    monkeypatch.setattr(cache, "put_processed", lambda k, b, content_type=None: blobs.__setitem__(k, b))
+    monkeypatch.setattr(cache, "get_bytes_processed", lambda k: blobs[k])
+    return blobs
+
+
+def test_run_step_reuses_artifact(monkeypatch, mock_db):
+    _patch_storage(monkeypatch, mock_db)
+    calls = []
+
+    def step(df, scale=1):
+        calls.append(1)
+        return df["a"].sum() * scale
+
+    df = pd.DataFrame({"a": [1, 2, 3]})
+    first = cache.run_step("sum", step, {"df": cache.fingerprint_df(df)}, df, scale=2)
+    second = cache.run_step("sum", step, {"df": cache.fingerprint_df(df)}, df, scale=2)
+
+    assert first.value == second.value == 12
+    assert (first.hit, second.hit) == (False, True)
+    assert first.key == second.key
+    assert len(calls) == 1
+
+
+def test_run_step_invalidates_on_input_change(monkeypatch, mock_db):
+    _patch_storage(monkeypatch, mock_db)
+    step = lambda df: len(df)
+
+    a = pd.DataFrame({"a": [1, 2, 3]})
+    b = pd.DataFrame({"a": [1, 2, 4]})
+    r1 = cache.run_step("len", step, {"df": cache.fingerprint_df(a)}, a)
+    r2 = cache.run_step("len", step, {"df": cache.fingerprint_df(b)}, b)
+    r3 = cache.run_step("len", step, {"df": cache.fingerprint_df(a)}, a, force=True)
+
+    assert r1.key != r2.key
+    assert not r2.hit
+    assert not r3.hit
+
+
+def test_run_step_survives_storage_errors(monkeypatch, mock_db):
+    monkeypatch.setattr(cache, "step_cache", mock_db.pipeline_step_cache)
+
+    def boom(*a, **k):
+        raise RuntimeError("storage down")
+
+    monkeypatch.setattr(cache, "put_processed", boom)
+    monkeypatch.setattr(cache, "get_bytes_processed", boom)
+
+    r = cache.run_step("const", lambda: 7, {})
+    assert r.value == 7 and not r.hit
+
+
+def test_code_version_covers_called_modules(monkeypatch):
+    import inspect
+    from app.jobs import sharded
+
+    before = cache.code_version(sharded.build_features_sharded)
+    real = inspect.getsource
+
+    def edited(obj):
+        src = real(obj)
+        return src + "\n# edited" if getattr(obj, "__name__", None) == "app.features.injury_risk" else src
+
+    monkeypatch.setattr(inspect, "getsource", edited)
+    cache.module_closure_hash.cache_clear()
+    try:
+        assert cache.code_version(sharded.build_features_sharded) != before
+    finally:
+        cache.module_closure_hash.cache_clear()
@@ -0,0 +1,70 @@
+import numpy as np
+import pandas as pd
+from app.serving.cache import PredictionCache, score_cached
+
+
+class _Loaded:
+    def __init__(self, run_id):
+        self.meta = {"run_id": run_id}
+        self.features = ["a", "b"]
+        self.scored = 0
+
+    def score(self, df):
+        self.scored += len(df)
+        return df["a"].to_numpy() + df["b"].to_numpy()
+
+
+def test_identical_rows_hit_cache():
+    cache = PredictionCache("t", use_redis=False)
+    loaded = _Loaded("run1")
+    df = pd.DataFrame({"b": [1.0, 2.0], "a": [0.5, -0.0]})
+
+    first = score_cached(cache, loaded, df)
+    second = score_cached(cache, loaded, df[["a", "b"]])
+
+    assert np.allclose(first, second) and first.tolist() == [1.5, 2.0]
+    assert loaded.scored == 2
+    assert cache.stats()["hit_ratio"] == 0.5
+
+
+def test_new_model_run_invalidates():
+    cache = PredictionCache("t", use_redis=False)
+    df = pd.DataFrame({"a": [1.0], "b": [1.0]})
+    score_cached(cache, _Loaded("run1"), df)
+
+    fresh = _Loaded("run2")
+    score_cached(cache, fresh, df)
+    assert fresh.scored == 1
+    assert cache.stats()["model"] == "run2"
+
+
+def test_lru_eviction_and_ttl():
+    cache = PredictionCache("t", maxsize=2, ttl_s=3600, use_redis=False)
+    keys = cache.keys_for(np.array([[1.0], [2.0], [3.0]]), "r")
+    cache.put_many(keys, [1, 2, 3], "r")
+    assert cache.get_many(keys, "r") == [None, 2.0, 3.0]
+
+    expired = PredictionCache("t", ttl_s=-1, use_redis=False)
+    expired.put_many(keys[:1], [1], "r")
+    assert expired.get_many(keys[:1], "r") == [None]
+
+
+def test_cache_keys_on_served_model_and_flushes_on_swap():
+    from app.serving import cache as cache_mod
+
+    df = pd.DataFrame({"a": [1.0], "b": [1.0]})
+    v1 = _Loaded("same-run")
+    v1.meta.update(model_uri="models:/m/1", model_version="1")
+    v2 = _Loaded("same-run")
+    v2.meta.update(model_uri="models:/m/2", model_version="2")
+
+    score_cached(cache_mod.risk_cache, v1, df)
+    score_cached(cache_mod.risk_cache, v2, df)
+    assert v2.scored == 1  # new version, same run_id: not served from cache
+
+    score_cached(cache_mod.risk_cache, v2, df)
+    assert v2.scored == 1
+    cache_mod.flush_on_swap("injury_risk")
+    assert cache_mod.risk_cache.stats()["size"] == 0
+    score_cached(cache_mod.risk_cache, v2, df)
+    assert v2.scored == 2
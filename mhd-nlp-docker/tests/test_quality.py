@@ -0,0 +1,47 @@
+import numpy as np
+import pandas as pd
+from app.pipelines.steps.quality import (
+    ColumnRule, validate_frame, basic_schema_check, session_schema_check, SESSION_RULES,
+)
+
+
+def test_validate_frame_counts_every_row():
+    df = pd.DataFrame({"rpe": np.r_[np.full(1000, 5.0), [11.0, -1.0, np.nan]], "kind": ["a"] * 1002 + ["z"]})
+    report = validate_frame(df, [
+        ColumnRule(column="rpe", nullable=False, ge=0, le=10),
+        ColumnRule(column="kind", allowed=["a", "b"]),
+        ColumnRule(column="missing"),
+    ])
+    by_rule = {(v["column"], v["rule"]): v for v in report["results"]}
+
+    assert not report["ok"]
+    assert by_rule[("rpe", "range")]["violations"] == 2
+    assert by_rule[("rpe", "not_null")]["violations"] == 1
+    assert by_rule[("kind", "allowed")]["sample"][0]["kind"] == "z"
+    assert ("missing", "required") in by_rule
+
+
+def test_basic_schema_check_flags_age_bounds():
+    ok = pd.DataFrame({"age": [20, 40], "bp": [120, 130], "hr": [60, 70], "target": [0, 1]})
+    bad = ok.assign(age=[20, 150])
+    assert basic_schema_check(ok)["ok"]
+    res = basic_schema_check(bad)
+    assert not res["ok"] and res["issues"] == ["age: 1 rows fail range"]
+
+
+def test_session_schema_check_reports_missing_columns():
+    res = session_schema_check(pd.DataFrame({"sets": [3], "reps": [10]}))
+    assert not res["ok"]
+    assert len(res["report"]["results"]) == len(SESSION_RULES) - 2
+
+
+def test_quality_report_never_opens_its_own_run(monkeypatch):
+    import mlflow
+    from app.pipelines.steps import quality
+
+    def no_runs(*a, **k):
+        raise AssertionError("standalone MLflow run")
+
+    monkeypatch.setattr(mlflow, "start_run", no_runs)
+    monkeypatch.setattr(mlflow, "active_run", lambda: None)
+    quality.log_quality_report(validate_frame(pd.DataFrame({"age": [1]}), []))
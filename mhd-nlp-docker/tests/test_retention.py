@@ -0,0 +1,41 @@
+from datetime import datetime, timedelta
+
+from app.jobs import retention
+
+
+def test_plain_index_replaced_by_ttl(mock_db, monkeypatch):
+    monkeypatch.setattr(retention, "db", mock_db)
+    mock_db.api_metrics.create_index("ts")
+
+    assert retention._ensure_index(mock_db.api_metrics, "ts", 30 * 86400) == "created"
+    ttl = [i for i in mock_db.api_metrics.index_information().values() if i["key"] == [("ts", 1)]]
+    assert len(ttl) == 1 and ttl[0]["expireAfterSeconds"] == 30 * 86400
+    assert retention._ensure_index(mock_db.api_metrics, "ts", 30 * 86400) == "ok"
+
+
+def test_ttl_seconds_from_env(monkeypatch):
+    monkeypatch.setenv("RETENTION_API_METRICS_DAYS", "0")
+    assert retention.ttl_seconds("api_metrics") is None
+    assert retention.ttl_seconds("revoked_tokens") == 0
+
+
+def test_rollups_are_daily_and_idempotent(mock_db, monkeypatch):
+    monkeypatch.setattr(retention, "db", mock_db)
+    monkeypatch.setattr(retention, "state", mock_db.retention_state)
+    d0 = datetime(2024, 3, 1, 10)
+    mock_db.api_metrics.insert_many([
+        {"ts": d0, "path": "/a", "method": "GET", "status": 200, "latency_ms": 10.0},
+        {"ts": d0 + timedelta(hours=1), "path": "/a", "method": "GET", "status": 200, "latency_ms": 30.0},
+        {"ts": d0 + timedelta(days=1), "endpoint": "/predict/session_score", "latency_ms": 5.0},
+    ])
+
+    now = datetime(2024, 3, 3, 1)
+    assert retention.run_rollups(now)["api_metrics"] == 2
+    assert retention.run_rollups(now)["api_metrics"] == 0  # nothing new to roll up
+
+    daily = {(r["day"].day, r["path"]): r for r in mock_db.api_metrics_daily.find()}
+    assert daily[(1, "/a")]["n"] == 2 and daily[(1, "/a")]["latency_ms_avg"] == 20.0
+    assert daily[(2, "/predict/session_score")]["latency_ms_max"] == 5.0
+
+    retention.rollup_day("api_metrics", d0)
+    assert mock_db.api_metrics_daily.count_documents({}) == 2
@@ -0,0 +1,46 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+from app.services import risk_latest
+
+
+@pytest.fixture
+def view(mock_db, monkeypatch):
+    coll = mock_db["athlete_risk_latest"]
+    coll.create_index("athlete_id", unique=True)
+    monkeypatch.setattr(risk_latest, "athlete_risk_latest", coll)
+    return coll
+
+
+def _pred(aid, score, ts, **meta):
+    return {"athlete_id": aid, "score": score, "ts": ts, "use_case": "injury_risk", "meta": meta}
+
+
+def test_upsert_keeps_newest_prediction(view):
+    now = datetime.now(timezone.utc)
+    risk_latest.record_risk_predictions([_pred("a1", 0.9, now), _pred("a1", 0.2, now - timedelta(hours=1))])
+    # an older prediction arriving later must not overwrite the newer one
+    risk_latest.record_risk_predictions([_pred("a1", 0.1, now - timedelta(days=1))])
+
+    doc = view.find_one({"athlete_id": "a1"})
+    assert view.count_documents({}) == 1
+    assert doc["score"] == 0.9 and doc["bucket"] == "high"
+
+    risk_latest.record_risk_predictions([_pred("a1", 0.6, now + timedelta(minutes=1))])
+    assert view.find_one({"athlete_id": "a1"})["bucket"] == "med"
+
+
+def test_readers(view):
+    now = datetime.now(timezone.utc)
+    risk_latest.record_risk_predictions([
+        _pred("a1", 0.95, now),
+        _pred("a2", 0.55, now),
+        _pred("a3", 0.10, now, recent_injury_flag=True),
+        _pred("a4", 0.85, now - timedelta(days=30)),
+    ])
+    since = now - timedelta(days=7)
+
+    assert [d["athlete_id"] for d in risk_latest.top_risk(2)] == ["a1", "a4"]
+    assert risk_latest.risk_bucket_counts(since) == {"high": 1, "med": 1, "low": 1}
+    needs = risk_latest.needs_clearance(since, exclude_ids={"a1"})
+    assert [d["athlete_id"] for d in needs] == ["a3"]
@@ -0,0 +1,43 @@
+import asyncio
+
+import app.routes.upload as upload
+
+
+def _body(resp):
+    async def collect():
+        return b"".join([c async for c in resp.body_iterator])
+    return asyncio.run(collect())
+
+
+def test_download_streams_range_from_storage(monkeypatch):
+    data = b"0123456789" * 100
+    monkeypatch.setattr(upload, "stat_raw", lambda key: {"size": len(data), "etag": "abc", "content_type": "text/plain"})
+    monkeypatch.setattr(upload, "open_raw", lambda key, off, n: iter([data[off:off + n]]))
+    meta = {"filename": "a.txt", "storage_key": "uploads/u/x/a.txt"}
+
+    full = asyncio.run(upload._serve_upload(meta, None))
+    assert full.status_code == 200 and _body(full) == data
+    assert full.headers["accept-ranges"] == "bytes"
+
+    part = asyncio.run(upload._serve_upload(meta, "bytes=10-19"))
+    assert part.status_code == 206
+    assert part.headers["content-range"] == f"bytes 10-19/{len(data)}"
+    assert _body(part) == data[10:20]
+
+    bad = asyncio.run(upload._serve_upload(meta, "bytes=5000-"))
+    assert bad.status_code == 416
+
+
+def test_download_non_ascii_and_quoted_filenames(monkeypatch):
+    monkeypatch.setattr(upload, "stat_raw", lambda key: {"size": 1})
+    monkeypatch.setattr(upload, "open_raw", lambda key, off, n: iter([b"x"]))
+
+    resp = asyncio.run(upload._serve_upload({"filename": "résumé – 日本.pdf", "storage_key": "k"}, None))
+    assert resp.status_code == 200
+    cd = resp.headers["content-disposition"]
+    assert "filename*=utf-8''r%C3%A9sum%C3%A9%20%E2%80%93%20%E6%97%A5%E6%9C%AC.pdf" in cd
+    cd.encode("latin-1")
+
+    cd = upload._content_disposition('a"b.txt')
+    assert cd == 'attachment; filename="a_b.txt"; filename*=utf-8\'\'a%22b.txt'
+    assert upload._content_disposition("a.txt") == 'attachment; filename="a.txt"'
@@ -0,0 +1,127 @@
+import datetime as dt
+
+import pytest
+
+from app.features import injury_risk as features_mod
+from app.labeling import injury_risk as labels_mod
+from app.jobs import sharded
+
+
+@pytest.fixture
+def shard_db(mock_db, monkeypatch):
+    for mod in (features_mod, labels_mod, sharded):
+        monkeypatch.setattr(mod, "db", mock_db)
+    monkeypatch.setattr(sharded, "shard_runs", mock_db["shard_runs"])
+    monkeypatch.setattr(sharded, "SHARD_POLL_S", 0.01)
+
+    now = dt.datetime.utcnow()
+    sessions = []
+    for a in range(12):
+        for d in range(5):
+            sessions.append({
+                "athlete_id": f"a{a}",
+                "ts": now - dt.timedelta(days=d),
+                "work.volume": 10.0 + a,
+                "work.intensity": 0.5,
+                "adherence": 0.9,
+                "nlp.sentiment": 0.1,
+                "nlp": {"topics": ["knee"] if a % 3 == 0 else []},
+            })
+    mock_db.sessions.insert_many(sessions)
+    mock_db.injuries.insert_many([
+        {"athlete_id": "a1", "onset_date": now - dt.timedelta(days=30)},
+        {"athlete_id": "a2", "onset_date": now + dt.timedelta(days=3)},
+    ])
+    return mock_db
+
+
+def _by_athlete(coll):
+    return {d["athlete_id"]: d["x"] for d in coll.find({}, {"_id": 0})}
+
+
+def test_sharded_matches_single_process(shard_db):
+    now = dt.datetime.utcnow()
+    assert features_mod.build_injury_risk_features(now=now) == 12
+    single = _by_athlete(shard_db.features)
+    shard_db.features.delete_many({})
+
+    out = sharded.map_reduce("features", n_shards=4, dispatch="inline", now=now)
+    assert out["athletes"] == 12 and out["written"] == 12 and out["shards"] == 4
+    assert _by_athlete(shard_db.features) == single
+    assert single["a1"]["prior_injury_90d"] == 1
+
+    labels = sharded.map_reduce("labels", n_shards=3, dispatch="inline", horizon_days=14)
+    assert labels["written"] == 12
+    ys = {d["athlete_id"]: d["y"] for d in shard_db.labels.find()}
+    assert len(ys) == 12 and ys["a2"] == 1 and ys["a1"] == 0
+
+
+def test_shards_are_stable_and_claimed_once(shard_db):
+    ids = [f"a{i}" for i in range(50)]
+    parts = sharded.partition(ids, 5)
+    assert sorted(a for p in parts for a in p) == sorted(ids)
+    assert [sorted(p) for p in parts] == [sorted(p) for p in sharded.partition(ids[::-1], 5)]
+
+    out = sharded.map_reduce("features", n_shards=2, dispatch="inline")
+    # a late RQ delivery (or retry) of a finished shard is a no-op
+    assert sharded.run_shard(out["run_id"], 0) is None
+    rows = list(shard_db.shard_runs.find({"run_id": out["run_id"]}))
+    assert [r["attempts"] for r in rows] == [1, 1]
+
+
+def test_failing_shard_fails_the_run(shard_db, monkeypatch):
+    calls = []
+
+    def boom(**kw):
+        calls.append(kw["athlete_ids"])
+        raise RuntimeError("mongo went away")
+
+    monkeypatch.setitem(sharded.TASKS, "features", boom)
+    with pytest.raises(RuntimeError, match="failed 3 times"):
+        sharded.map_reduce("features", n_shards=2, dispatch="inline")
+    assert len(calls) == 3  # first shard exhausted its attempts
+
+
+def test_verify_reports_missing_athletes(shard_db, monkeypatch):
+    real = features_mod.build_injury_risk_features
+
+    def drops_one(athlete_ids=None, **kw):
+        return real(athlete_ids=[a for a in athlete_ids if a != "a5"], **kw)
+
+    monkeypatch.setitem(sharded.TASKS, "features", drops_one)
+    with pytest.raises(RuntimeError, match="incomplete features output"):
+        sharded.map_reduce("features", n_shards=3, dispatch="inline")
+
+
+def test_running_shard_keeps_its_lease_and_dead_ones_are_reclaimed(shard_db, monkeypatch):
+    import threading
+    import time
+
+    monkeypatch.setattr(sharded, "SHARD_LEASE_S", 0.3)
+    shard_db.shard_runs.insert_many([
+        {"run_id": "r", "shard": i, "task": "features", "params": {"now": dt.datetime.utcnow()},
+         "athlete_ids": [], "status": "queued", "attempts": 0}
+        for i in range(2)
+    ])
+    release = threading.Event()
+    monkeypatch.setitem(sharded.TASKS, "features", lambda **kw: release.wait(5) and 0)
+
+    live = sharded._claim("r", 0)
+    t = threading.Thread(target=sharded._run_claimed, args=(live,))
+    t.start()
+    dead = sharded._claim("r", 1)  # claimed, then its worker "crashes"
+    time.sleep(1.0)  # > 3 leases
+    try:
+        assert sharded._claim("r", 0) is None  # heartbeat kept it
+        again = sharded._claim("r", 1)
+        assert again is not None and again["attempts"] == 2 and again["lease"] != dead["lease"]
+    finally:
+        release.set()
+        t.join()
+    assert shard_db.shard_runs.find_one({"run_id": "r", "shard": 0})["status"] == "done"
+
+
+def test_map_reduce_accepts_iso_now_from_job_params(shard_db):
+    now = dt.datetime.utcnow()
+    out = sharded.map_reduce("features", n_shards=2, dispatch="inline", now=now.isoformat())
+    assert out["athletes"] == 12 and out["written"] == 12
@@ -0,0 +1,89 @@
+import io
+
+import pytest
+
+import app.db.storage as storage
+
+
+@pytest.fixture(params=["memory", "localfs"])
+def backend(request, monkeypatch, tmp_path):
+    if request.param == "localfs":
+        monkeypatch.setitem(storage._BACKENDS, "localfs", storage.LocalFSBackend(root=str(tmp_path)))
+    else:
+        monkeypatch.setitem(storage._BACKENDS, "memory", storage.MemoryBackend())
+    monkeypatch.setattr(storage, "BACKEND", request.param)
+    monkeypatch.setattr(storage, "STORAGE_READ_CHUNK", 4)
+    storage.storage_startup()
+    storage.ensure_buckets()
+    return request.param
+
+
+def test_roundtrip_and_ranges(backend):
+    storage.put_raw("a/b.csv", b"x,y\n1,2\n", content_type="text/csv")
+    assert storage.get_bytes_raw("a/b.csv") == b"x,y\n1,2\n"
+    assert b"".join(storage.open_raw("a/b.csv")) == b"x,y\n1,2\n"
+    assert b"".join(storage.open_raw("a/b.csv", 2, 3)) == b"y\n1"
+
+    st = storage.stat_raw("a/b.csv")
+    assert st["size"] == 8 and st["etag"] and st["content_type"] == "text/csv"
+
+    # raw and processed are separate namespaces
+    with pytest.raises(storage.ObjectNotFound):
+        storage.get_bytes_processed("a/b.csv")
+
+
+def test_stream_put_and_empty_objects(backend):
+    storage.put_processed_stream("big.bin", iter([b"ab", b"cd", b"e"]))
+    assert storage.get_bytes_processed("big.bin") == b"abcde"
+    storage.put_raw_stream("big.bin", io.BytesIO(b"abcde"))
+    assert storage.open_raw_file("big.bin").read() == b"abcde"
+
+    storage.put_raw_stream("empty", io.BytesIO(b""))
+    assert storage.get_bytes_raw("empty") == b""
+    assert list(storage.open_raw("empty")) == []
+
+
+def test_missing_is_not_found_for_bulk(backend):
+    storage.put_many([("k1", b"1"), ("k2", b"22")])
+    out = storage.exists_many(["k1", "k2", "nope"])
+    assert out["results"] == {"k1": True, "k2": True, "nope": False}
+    assert storage.get_many(["k2"])["results"] == {"k2": b"22"}
+
+
+def test_etag_changes_on_overwrite(backend):
+    storage.put_raw("k", b"one")
+    first = storage.stat_raw("k")["etag"]
+    storage.put_raw("k", b"two!")
+    assert storage.stat_raw("k")["etag"] != first
+
+
+def test_localfs_rejects_escaping_keys(tmp_path):
+    fs = storage.LocalFSBackend(root=str(tmp_path))
+    with pytest.raises(ValueError):
+        fs.put("mhd-raw", "../../etc/x", b"")
+
+
+def test_localfs_relative_root(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    fs = storage.LocalFSBackend(root="./data")
+    fs.put("mhd-raw", "a.csv", b"x")
+    fs.put("mhd-raw", "nested/b.csv", b"y")
+    assert fs.get("mhd-raw", "a.csv") == b"x"
+    assert (tmp_path / "data" / "mhd-raw" / "nested" / "b.csv").read_bytes() == b"y"
+    with pytest.raises(ValueError):
+        fs.put("mhd-raw", "../mhd-processed/x", b"")
+
+
+def test_partial_backend_fails_at_construction():
+    class PutOnly(storage.StorageBackend):
+        def put(self, bucket, key, data, content_type=None):
+            pass
+
+    with pytest.raises(TypeError):
+        PutOnly()
+
+
+def test_unknown_backend(monkeypatch):
+    monkeypatch.setattr(storage, "BACKEND", "nfs")
+    with pytest.raises(RuntimeError):
+        storage.storage_startup()
@@ -0,0 +1,95 @@
+import threading
+
+import app.db.storage as storage
+
+
+class NotFound(Exception):
+    code = "NoSuchKey"
+
+
+class Throttled(Exception):
+    status_code = 503
+
+
+def _use(monkeypatch, backend):
+    monkeypatch.setitem(storage._BACKENDS, "fake", backend)
+    monkeypatch.setattr(storage, "BACKEND", "fake")
+    monkeypatch.setattr(storage, "STORAGE_RETRY_BACKOFF_S", 0)
+
+
+def test_put_many_bounded_retries_and_reports(monkeypatch):
+    store, calls = {}, {}
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    class Backend(storage.MemoryBackend):
+        def put(self, bucket, key, data, content_type=None):
+            with lock:
+                calls[key] = calls.get(key, 0) + 1
+                active[0] += 1
+                peak[0] = max(peak[0], active[0])
+            try:
+                if key == "flaky" and calls[key] < 3:
+                    raise ConnectionError("reset")
+                if key == "bad":
+                    raise ValueError("rejected")
+                store[key] = (data, content_type)
+            finally:
+                with lock:
+                    active[0] -= 1
+
+    _use(monkeypatch, Backend())
+
+    items = ((f"k{i}", b"x" * 10) for i in range(40))
+    out = storage.put_many(list(items) + [("flaky", b"yy", "text/plain"), ("bad", b"z")], workers=4, retries=2)
+
+    assert out["ops"] == 42 and len(out["results"]) == 41
+    assert out["bytes"] == 40 * 10 + 2
+    assert store["flaky"] == (b"yy", "text/plain") and calls["flaky"] == 3
+    assert "ValueError" in out["failed"]["bad"] and calls["bad"] == 1  # not transient: no retry
+    assert peak[0] <= 4
+    assert out["ops_per_s"] > 0
+
+
+def test_get_and_exists_many(monkeypatch):
+    blobs = {"a": b"1", "b": b"22"}
+    calls = []
+
+    class Backend(storage.MemoryBackend):
+        def get(self, bucket, key):
+            return blobs[key]
+
+        def stat(self, bucket, key):
+            calls.append(key)
+            if key not in blobs:
+                raise NotFound(key)
+            return {"size": len(blobs[key]), "etag": "e", "content_type": None}
+
+    _use(monkeypatch, Backend())
+
+    got = storage.get_many(["a", "b"])
+    assert got["results"] == blobs and got["bytes"] == 3
+
+    ex = storage.exists_many(["a", "missing"])
+    assert ex["results"] == {"a": True, "missing": False}
+    assert calls.count("missing") == 1  # not-found is never retried
+
+
+def test_only_transient_errors_are_retried(monkeypatch):
+    attempts = []
+
+    def flaky(exc):
+        def fn():
+            attempts.append(exc)
+            raise exc
+        return fn
+
+    monkeypatch.setattr(storage, "STORAGE_RETRY_BACKOFF_S", 0)
+    for exc, n in [(TimeoutError("read"), 3), (Throttled(), 3), (ConnectionResetError(), 3),
+                   (PermissionError("denied"), 1), (NotFound("k"), 1), (KeyError("k"), 1)]:
+        attempts.clear()
+        try:
+            storage._retry(flaky(exc), retries=2)
+        except Exception as e:
+            assert e is exc
+        assert len(attempts) == n, exc
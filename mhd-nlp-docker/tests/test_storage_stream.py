@@ -0,0 +1,244 @@
+import asyncio
+import hashlib
+import io
+
+import pytest
+
+import app.db.storage as storage
+
+
+def test_iter_reader_rechunks():
+    r = storage._IterReader(iter([b"ab", b"cde", b"", b"f"]))
+    assert r.read(4) == b"abcd"
+    assert r.read(4) == b"ef"
+    assert r.read(4) == b""
+
+
+def test_put_raw_stream_s3_uses_multipart(monkeypatch):
+    calls = {}
+
+    class FakeMinio:
+        def put_object(self, **kw):
+            calls.update(kw)
+            calls["body"] = kw["data"].read()
+
+    monkeypatch.setattr(storage, "BACKEND", "s3")
+    monkeypatch.setattr(storage, "s3_stream", FakeMinio())
+    storage.put_raw_stream("k", iter([b"x" * 10, b"y" * 5]), content_type="text/csv")
+
+    assert calls["body"] == b"x" * 10 + b"y" * 5
+    assert calls["length"] == -1
+    assert calls["part_size"] == storage.STORAGE_PART_SIZE
+    assert calls["num_parallel_uploads"] == storage.STORAGE_UPLOAD_CONCURRENCY
+
+
+def test_aput_raw_stream_bridges_async_chunks(monkeypatch):
+    got = {}
+
+    def fake_put(key, data, content_type=None, length=None):
+        got[key] = storage._as_stream(data).read()
+        return "ok"
+
+    monkeypatch.setattr(storage, "put_raw_stream", fake_put)
+
+    async def chunks():
+        for i in range(50):
+            yield bytes([i % 256]) * 100
+
+    assert asyncio.run(storage.aput_raw_stream("k", chunks())) == "ok"
+    assert got["k"] == b"".join(bytes([i]) * 100 for i in range(50))
+
+
+def test_aput_stream_surfaces_uploader_failure(monkeypatch):
+    def failing_put(key, data, content_type=None, length=None):
+        storage._as_stream(data).read(10)
+        raise IOError("backend down")
+
+    monkeypatch.setattr(storage, "put_raw_stream", failing_put)
+
+    async def chunks():
+        for _ in range(200):  # far more than the hand-off queue holds
+            yield b"x" * 10
+
+    async def run():
+        return await asyncio.wait_for(storage.aput_raw_stream("k", chunks()), timeout=10)
+
+    with pytest.raises(IOError, match="backend down"):
+        asyncio.run(run())
+
+
+def test_aput_stream_aborts_upload_when_source_fails(monkeypatch):
+    seen = {}
+
+    def put(key, data, content_type=None, length=None):
+        try:
+            storage._as_stream(data).read()
+        except IOError as e:
+            seen["err"] = str(e)
+            raise
+
+    monkeypatch.setattr(storage, "put_raw_stream", put)
+
+    async def chunks():
+        yield b"abc"
+        raise ValueError("client disconnected")
+
+    async def run():
+        with pytest.raises(ValueError):
+            await storage.aput_raw_stream("k", chunks())
+        for _ in range(50):
+            if "err" in seen:
+                break
+            await asyncio.sleep(0.05)
+
+    asyncio.run(run())
+    assert "aborted" in seen["err"]
+
+
+def test_put_raw_stream_accepts_file_objects(monkeypatch):
+    seen = {}
+
+    class FakeMinio:
+        def put_object(self, **kw):
+            seen["body"] = kw["data"].read()
+            seen["length"] = kw["length"]
+
+    monkeypatch.setattr(storage, "BACKEND", "s3")
+    monkeypatch.setattr(storage, "s3_stream", FakeMinio())
+    storage.put_raw_stream("k", io.BytesIO(b"hello"), length=5)
+    assert seen == {"body": b"hello", "length": 5}
+
+
+def test_parse_range_forms():
+    assert storage.parse_range(None, 100) is None
+    assert storage.parse_range("bytes=0-9", 100) == (0, 9)
+    assert storage.parse_range("bytes=90-", 100) == (90, 99)
+    assert storage.parse_range("bytes=-10", 100) == (90, 99)
+    assert storage.parse_range("bytes=50-500", 100) == (50, 99)
+    assert storage.parse_range("bytes=0-1,5-6", 100) is None  # multi-range -> whole object
+    for bad in ("bytes=100-", "bytes=9-3", "bytes=-0"):
+        try:
+            storage.parse_range(bad, 100)
+            assert False, bad
+        except ValueError:
+            pass
+
+
+class _FakeResp:
+    def __init__(self, body):
+        self.body = body
+        self.released = False
+
+    def stream(self, n):
+        for i in range(0, len(self.body), n):
+            yield self.body[i:i + n]
+
+    def close(self):
+        pass
+
+    def release_conn(self):
+        self.released = True
+
+
+def test_open_raw_s3_range_and_release(monkeypatch):
+    body = bytes(range(256)) * 10
+    seen = {}
+
+    class FakeMinio:
+        def get_object(self, bucket, key, offset=0, length=0):
+            seen.update(offset=offset, length=length)
+            seen["resp"] = _FakeResp(body[offset:offset + length] if length else body[offset:])
+            return seen["resp"]
+
+    monkeypatch.setattr(storage, "BACKEND", "s3")
+    monkeypatch.setattr(storage, "s3", FakeMinio())
+    monkeypatch.setattr(storage, "STORAGE_READ_CHUNK", 100)
+
+    out = b"".join(storage.open_raw("k", 10, 500))
+    assert out == body[10:510]
+    assert seen["offset"] == 10 and seen["length"] == 500
+    assert seen["resp"].released
+
+
+def test_open_raw_file_feeds_pandas_incrementally(monkeypatch):
+    from app.routes.pipeline_ingest import _read_csv_stream
+
+    body = b"a,b\n" + b"".join(b"%d,%d\n" % (i, 2 * i) for i in range(5000))
+    reads = []
+
+    def fake_open(key, offset=0, length=None):
+        for i in range(0, len(body), 4096):
+            reads.append(i)
+            yield body[i:i + 4096]
+
+    monkeypatch.setattr(storage, "open_raw", fake_open)
+    df, sha = _read_csv_stream(storage.open_raw_file("k"))
+
+    assert len(df) == 5000 and int(df["b"].sum()) == 2 * sum(range(5000))
+    assert sha == hashlib.sha256(body).hexdigest()
+    assert len(reads) > 1
+
+
+def test_s3_stream_upload_retries_a_transient_part_failure(monkeypatch):
+    import threading
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+    puts, stored = [], {}
+
+    class FakeS3(BaseHTTPRequestHandler):
+        def log_message(self, *a):
+            pass
+
+        def _reply(self, code, body=b"", headers=None):
+            self.send_response(code)
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_GET(self):  # bucket region lookup
+            self._reply(200, b'<LocationConstraint xmlns="http://s3.amazonaws.com/doc/2006-03-01/"></LocationConstraint>',
+                        {"Content-Type": "application/xml"})
+
+        def do_PUT(self):
+            body = self.rfile.read(int(self.headers.get("Content-Length") or 0))
+            puts.append(self.path)
+            if len(puts) == 1:
+                return self._reply(503)  # throttled once
+            stored[self.path.split("?")[0]] = body
+            self._reply(200, headers={"ETag": '"abc"'})
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), FakeS3)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        monkeypatch.setattr(storage, "BACKEND", "s3")
+        monkeypatch.setattr(storage, "s3", None)
+        monkeypatch.setattr(storage, "s3_stream", None)
+        monkeypatch.setattr(storage, "S3_ENDPOINT", f"http://127.0.0.1:{server.server_port}")
+        monkeypatch.setattr(storage, "STORAGE_RETRY_BACKOFF_S", 0)
+        storage.storage_startup()
+        storage.put_raw_stream("k.csv", iter([b"a,b\n", b"1,2\n"]))
+    finally:
+        server.shutdown()
+        server.server_close()
+
+    assert len(puts) == 2
+    assert stored[f"/{storage.S3_BUCKET_RAW}/k.csv"] == b"a,b\n1,2\n"
+
+
+def test_azure_stream_upload_keeps_per_block_retries(monkeypatch):
+    seen = {}
+
+    class Blob:
+        def upload_blob(self, data, **kw):
+            seen.update(kw)
+
+    class Service:
+        def get_blob_client(self, container, blob):
+            return Blob()
+
+    monkeypatch.setattr(storage, "BACKEND", "azure")
+    monkeypatch.setattr(storage, "blob_service", Service())
+    storage.put_raw_stream("k", io.BytesIO(b"x"))
+    assert seen["retry_total"] == storage.STORAGE_RETRIES
@@ -0,0 +1,32 @@
+from datetime import datetime, timedelta
+
+from app.routes import trainer_dashboard as td
+
+
+def test_facets_match_python_kpis(mock_db):
+    coll = mock_db["predictions"]
+    # mongomock hands back naive datetimes; keep the test in naive UTC
+    now = datetime.utcnow()
+    since = now - timedelta(days=7)
+
+    coll.insert_many([
+        {"use_case": "injury_risk", "athlete_id": "a1", "score": 0.9, "ts": now - timedelta(days=1)},
+        {"use_case": "injury_risk", "athlete_id": "a1", "score": 0.85, "ts": now - timedelta(days=2)},
+        {"use_case": "injury_risk", "athlete_id": "a2", "score": 0.3, "ts": now - timedelta(days=1)},
+        {"use_case": "injury_risk", "score": 0.95, "ts": now - timedelta(days=1)},
+        {"use_case": "injury_risk", "athlete_id": "a3", "score": 0.1, "ts": now - timedelta(days=10)},
+        {"use_case": "session_quality", "athlete_id": "a1", "score": 4.0, "ts": now - timedelta(days=1)},
+        {"use_case": "session_quality", "athlete_id": "a2", "score": 2.0, "ts": now - timedelta(days=3)},
+    ])
+
+    agg = td._shape_facets(next(coll.aggregate(td._facet_pipeline(now, since))))
+
+    assert agg["total_predictions"] == 4
+    assert agg["total_athletes"] == 2
+    assert [(p.get("athlete_id"), p["score"]) for p in agg["top_high"]] == [(None, 0.95), ("a1", 0.9)]
+    assert agg["session_count"] == 2 and agg["avg_session_score"] == 3.0
+    assert [s["athlete_id"] for s in agg["sessions"]] == ["a1", "a2"]
+
+    drift = agg["drift"]
+    assert drift["recent_count"] == 4 and drift["prev_count"] == 1
+    assert abs(drift["recent_avg"] - 0.75) < 1e-9 and drift["direction"] == "up"